@@ -0,0 +1,91 @@
+"""Module for BackgroundLoader-class."""
+
+import concurrent.futures
+import threading
+
+
+class BackgroundLoader():
+    """Runs loading functions in background and hands results to GUI.
+
+    Several loading jobs may be run in parallel. Tk-widgets can't be used
+    from other threads, so the loader polls jobs by root.after: it shows
+    their progress in ControlsManager and calls on_done in Tk-thread when
+    all of them are finished. Loading functions must accept keyword
+    arguments progress and cancel_event (see dataloadingutil).
+    If some job raises exception, on_done isn't called, on_error(message)
+    is called instead and the loader is ready for new jobs.
+    """
+
+    POLL_INTERVAL_MS = 50
+
+    def __init__(self, root, controls, on_error, max_workers=2):
+        """Create loader. Executor is created on first use."""
+        self.__root = root
+        self.__controls = controls
+        self.__on_error = on_error
+        self.__max_workers = max_workers
+        self.__executor = None
+        self.__cancel_event = threading.Event()
+        self.__futures = []
+        self.__progress = []  # last reported progress of each job
+        self.__on_done = None
+        self.__label = None
+        controls.set_cancel_button_callback(self.cancel)
+
+    def is_busy(self):
+        """Return True if some jobs are not finished yet."""
+        return bool(self.__futures)
+
+    def load(self, jobs, on_done, label='Loading'):
+        """Start jobs - list of [function, args].
+
+        on_done(results) is called in Tk-thread, results - list of values
+        returned by jobs (in the same order). label is shown with progress.
+        """
+        assert not self.is_busy()
+        if self.__executor is None:
+            self.__executor = concurrent.futures.ThreadPoolExecutor(
+                self.__max_workers)
+        self.__cancel_event.clear()
+        self.__progress = [0.0] * len(jobs)
+        self.__on_done = on_done
+        self.__label = label
+        for idx, [func, args] in enumerate(jobs):
+            def progress(fraction, idx=idx):
+                self.__progress[idx] = fraction
+            future = self.__executor.submit(
+                func, *args, progress=progress,
+                cancel_event=self.__cancel_event)
+            self.__futures.append(future)
+        self.__controls.set_busy(True)
+        self.__root.after(self.POLL_INTERVAL_MS, self.__poll)
+
+    def cancel(self):
+        """Ask all running jobs to stop."""
+        self.__cancel_event.set()
+
+    def shutdown(self):
+        """Cancel jobs and stop executor."""
+        self.cancel()
+        if self.__executor is not None:
+            self.__executor.shutdown(wait=False)
+
+    def __poll(self):
+        progress = sum(self.__progress) / max(len(self.__progress), 1)
+        self.__controls.set_progress(progress, self.__label)
+        if not all(future.done() for future in self.__futures):
+            self.__root.after(self.POLL_INTERVAL_MS, self.__poll)
+            return
+        futures, self.__futures = self.__futures, []
+        self.__controls.set_busy(False)
+        results = []
+        errors = []
+        for future in futures:
+            try:
+                results.append(future.result())
+            except Exception as e:
+                errors.append('{}: {}'.format(type(e).__name__, e))
+        if errors:
+            self.__on_error('Background job failed: ' + '; '.join(errors))
+            return
+        self.__on_done(results)
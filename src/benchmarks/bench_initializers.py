@@ -0,0 +1,75 @@
+"""Benchmark of weights initializers: iterations to target loss.
+
+Network is trained by NeuralNetwork.train (mini-batch SGD on shuffled
+epochs) on the example train data, number of iterations (mini-batches)
+required to reach target loss is reported for each initializer (median
+over several seeds). Loss is checked on each iteration, weights aren't
+written to report. Run from repository root:
+    python src/benchmarks/bench_initializers.py
+"""
+
+import pathlib
+import statistics
+import sys
+
+SRC_DIR = pathlib.Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(SRC_DIR))
+
+import dataloadingutil  # noqa: E402
+from network import initializers  # noqa: E402
+from network.neuralnetwork import NeuralNetwork  # noqa: E402
+
+HIDDEN_UNITS = [16, 16]
+TARGET_MEAN_ERROR = 2.0e-4  # error function divided by number of samples
+MAX_ITER = 20000
+BATCH_SIZE = 8
+STEP = 0.05
+SEEDS = range(5)
+
+
+def get_config(initializer, seed):
+    """Return configuration of network with certain initializer."""
+    layers_info = [{'NumberOfUnits': units, 'ActivationFunction': 'tanh',
+                    'Initializer': initializer}
+                   for units in HIDDEN_UNITS]
+    layers_info.append({'NumberOfUnits': 1, 'ActivationFunction': 'linear',
+                        'Initializer': initializer})
+    return {'NumberOfInputUnits': 1, 'LayersInfo': layers_info,
+            'Seed': seed}
+
+
+def iterations_to_target(config, data):
+    """Return number of iterations to reach target (or None)."""
+    net = NeuralNetwork(config)
+    reached = []
+
+    def on_iteration(iteration, train_loss, validation_loss):
+        if train_loss <= TARGET_MEAN_ERROR:
+            reached.append(iteration + 1)
+            return True
+        return False
+
+    net.train(data, batch_size=BATCH_SIZE, step=STEP, max_iter_num=MAX_ITER,
+              seed=config['Seed'], progress=on_iteration, loss_stride=1,
+              full_report=False)
+    return reached[0] if reached else None
+
+
+def main():
+    """Run all initializers and print results."""
+    path = SRC_DIR / 'examples' / 'train_data.json'
+    error, data = dataloadingutil.load_train_data(str(path), 'float64')
+    assert error is None
+    print('{:<16} {:>12} {:>8}'.format(
+        'initializer', 'median iter', 'reached'))
+    for name in initializers.INITIALIZERS:
+        results = [iterations_to_target(get_config(name, seed), data)
+                   for seed in SEEDS]
+        reached = [r for r in results if r is not None]
+        median = statistics.median(reached) if reached else float('nan')
+        print('{:<16} {:>12} {:>8}'.format(
+            name, median, '{}/{}'.format(len(reached), len(results))))
+
+
+if __name__ == '__main__':
+    main()
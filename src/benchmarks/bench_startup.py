@@ -0,0 +1,42 @@
+"""Benchmark of application startup (import time of entry points).
+
+Each module is imported in a fresh interpreter several times, minimal and
+median times are reported. Run from repository root:
+    python src/benchmarks/bench_startup.py
+"""
+
+import pathlib
+import statistics
+import subprocess
+import sys
+import time
+
+SRC_DIR = pathlib.Path(__file__).resolve().parent.parent
+REPEATS = 7
+CASES = [('interpreter', 'pass'),
+         ('GUI entry point (main)', 'import main'),
+         ('headless entry point (cli)', 'import cli'),
+         ('network', 'import network.neuralnetwork')]
+
+
+def measure(code):
+    """Return list of wall times (in ms) of running code in new process."""
+    times = []
+    for _ in range(REPEATS):
+        begin = time.perf_counter()
+        subprocess.run([sys.executable, '-c', code], cwd=SRC_DIR, check=True)
+        times.append((time.perf_counter() - begin) * 1000.0)
+    return times
+
+
+def main():
+    """Run all cases and print results."""
+    print('{:<30} {:>10} {:>10}'.format('case', 'min, ms', 'median, ms'))
+    for name, code in CASES:
+        times = measure(code)
+        print('{:<30} {:>10.1f} {:>10.1f}'.format(
+            name, min(times), statistics.median(times)))
+
+
+if __name__ == '__main__':
+    main()
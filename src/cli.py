@@ -0,0 +1,426 @@
+"""Headless entry point for perceptron_1.
+
+It allows to use network without GUI, for instance:
+    python src/cli.py train --data src/examples/train_data.json
+
+Heavy subsystems (numpy, network) are imported only by commands which
+require them, so start of this module is fast.
+"""
+
+import argparse
+import contextlib
+import sys
+import globals
+
+
+def __load(args):
+    """Load train data and configuration, return [error, data, config]."""
+    import dataloadingutil
+    error, data = dataloadingutil.load_train_data(args.data)
+    if error:
+        return error, None, None
+    error, config = dataloadingutil.load_configuration(args.config)
+    if error:
+        return error, None, None
+    return None, data, config
+
+
+def __load_in_budget(args, budget, phase):
+    """Like __load, but train data is loaded to fit into memory budget.
+
+    Configuration is loaded first to get precision of network, then data
+    is loaded as list or streamed into array or memmap (see
+    dataloadingutil.load_train_data). Returns [error, data, config].
+    """
+    import dataloadingutil
+    from network import memory
+    with phase('load configuration'):
+        error, config = dataloadingutil.load_configuration(args.config)
+    if error:
+        return error, None, None
+    precision = config.get('Precision')
+    error, estimate = dataloadingutil.estimate_train_data(args.data,
+                                                          precision)
+    if error:
+        return error, None, None
+    mode = dataloadingutil.choose_loading_mode(estimate, budget)
+    if estimate[mode] > budget:
+        return 'Train data do not fit memory budget ({} are required)'.format(
+            memory.format_bytes(estimate[mode])), None, None
+    if mode != 'list':
+        print('Train data is loaded into {} to fit memory budget'.format(
+            'numpy array' if mode == 'array' else 'memory-mapped file'))
+    with phase('load data', estimate[mode]):
+        error, data = dataloadingutil.load_train_data(
+            args.data, precision, memory_budget=budget)
+    if error:
+        return error, None, None
+    return None, data, config
+
+
+def __train(args):
+    monitor = None
+    budget = None
+    if args.memory_budget is not None:
+        budget = int(args.memory_budget * 2**20)
+    if args.memory_report:  # tracing of allocations slows down training
+        from network import memory
+        monitor = memory.MemoryMonitor()
+    try:
+        return __train_monitored(args, budget, monitor)
+    finally:
+        if monitor is not None:
+            print(monitor.get_report(), end='')
+            monitor.stop()
+
+
+def __train_monitored(args, budget, monitor):
+    from network import tracing
+    from network.neuralnetwork import NeuralNetwork
+
+    def phase(name, estimate=None):
+        if monitor is None:
+            return contextlib.nullcontext()
+        return monitor.phase(name, estimate)
+
+    if budget is not None:
+        error, data, config = __load_in_budget(args, budget, phase)
+    else:
+        with phase('load data and configuration'):
+            error, data, config = __load(args)
+    if error:
+        print(error, file=sys.stderr)
+        return 1
+    from network import sparse
+    is_sparse = sparse.is_sparse(config)
+    if is_sparse and (args.init or args.optimizer != 'sgd'):
+        print('Sparse network supports only SGD without --init',
+              file=sys.stderr)
+        return 1
+    with phase('construct network'), \
+            tracing.span('construct network', 'network'):
+        if is_sparse:
+            net = sparse.SparseNetwork(config)
+        else:
+            net = NeuralNetwork(config)
+    if args.init:
+        error = __warm_start(net, args.init)
+        if error:
+            print(error, file=sys.stderr)
+            return 1
+    error, estimate = __estimate_training(args, net, data, budget)
+    if error:
+        print(error, file=sys.stderr)
+        return 1
+    with phase('train', estimate):
+        if is_sparse:
+            report = net.train(data, None, args.batch_size, seed=args.seed,
+                               max_iter_num=args.max_iter,
+                               memory_budget=budget)
+        else:
+            report = net.train(data, args.optimizer, args.batch_size,
+                               max_iter_num=args.max_iter, seed=args.seed,
+                               memory_budget=budget)
+    if args.report:
+        with open(args.report, 'w', encoding='utf-8') as f:
+            f.write(report)
+    with phase('general error'):
+        g_err = __get_general_error(args, net, data, budget)
+    if is_sparse:
+        print('Sparse network ({} weights) was successfully trained. '
+              'General error={:.6f}'.format(net.get_weights_num(), g_err))
+        net = net.to_network()  # the same outputs, it's saved as usual
+    else:
+        print('Network was successfully trained. '
+              'General error={:.6f}'.format(g_err))
+    if args.save:
+        net.save(args.save)
+    if args.lut:
+        from network import lookuptable
+        if config['NumberOfInputUnits'] != 1:
+            print('Lookup table requires network with one input',
+                  file=sys.stderr)
+            return 1
+        table = lookuptable.tabulate(net, args.lut_points)
+        table.save(args.lut)
+        print('Lookup table was saved (max error={:.3e})'.format(
+            table.get_max_error()))
+    return 0
+
+
+def __estimate_training(args, net, data, budget):
+    """Return error-string and estimated bytes of training.
+
+    Estimate is made for the same fallbacks (shortened report and chunks
+    of general error), which training uses for budget.
+    """
+    from network import memory
+    from network import sparse
+    from network import weightstructure as ws
+    config = net.get_configure()
+    # data, loaded for budget, are already array of network precision:
+    copy_data = getattr(data, 'dtype', None) != ws.get_dtype(config)
+    if sparse.is_sparse(config):
+        chunk = None
+        if budget is not None:
+            chunk = memory.fit_sparse_training(
+                config, net.get_weights_num(), len(data), budget,
+                args.batch_size)
+        estimate = memory.estimate_sparse_training(
+            config, net.get_weights_num(), len(data), args.batch_size,
+            chunk, copy_data)['total']
+    else:
+        full_report, chunk = True, None
+        if budget is not None:
+            full_report, chunk = memory.fit_training(
+                config, len(data), budget, args.batch_size, args.max_iter)
+        estimate = memory.estimate_training(
+            config, len(data), args.batch_size, args.max_iter, chunk,
+            full_report, copy_data)['total']
+    if budget is not None and estimate > budget:
+        return 'Training does not fit memory budget ({} are required)'.format(
+            memory.format_bytes(estimate)), None
+    return None, estimate
+
+
+def __get_general_error(args, net, data, budget):
+    """Return general error, samples are evaluated by chunks for budget."""
+    from network import layermath as lm
+    from network import memory
+    from network import sparse
+    from network import weightstructure as ws
+    config = net.get_configure()
+    if sparse.is_sparse(config):
+        chunk = None
+        if budget is not None:
+            chunk = memory.fit_sparse_training(
+                config, net.get_weights_num(), len(data), budget,
+                args.batch_size)
+        return net.general_error_function(data, chunk)
+    X, T = lm.split_samples(data, config['NumberOfInputUnits'],
+                            ws.get_dtype(config))
+    chunk = None
+    if budget is not None:
+        chunk = memory.get_error_chunk_size(config, len(X), budget,
+                                            args.batch_size, args.max_iter,
+                                            full_report=False)
+    return lm.error(net.get_weights().get_layer_matrices(),
+                    lm.get_afunc_names(config), X, T, chunk)
+
+
+def __warm_start(net, path):
+    """Initialize net from saved model, return error-string or None."""
+    import dataloadingutil
+    from network import warmstart
+    error, model = dataloadingutil.load_model(path)
+    if error:
+        return error
+    config, weights = model
+    return warmstart.warm_start(net, config, weights)
+
+
+def __serve(args):
+    import inferenceserver
+    error, models = inferenceserver.load_models(args.models)
+    if error:
+        print(error, file=sys.stderr)
+        return 1
+    inferenceserver.serve(models, args.host, args.port, args.max_batch,
+                          args.max_latency_ms, args.max_body_size)
+    return 0
+
+
+def __compress(args):
+    import dataloadingutil
+    from network import compression
+    from network.neuralnetwork import NeuralNetwork
+    error, model = dataloadingutil.load_model(args.model)
+    if not error:
+        error, held_out = dataloadingutil.load_train_data(args.held_out)
+    if error:
+        print(error, file=sys.stderr)
+        return 1
+    config, weights = model
+    original = NeuralNetwork(config)
+    original.get_weights().set_values(weights)
+    net = NeuralNetwork(config)
+    net.get_weights().set_values(weights)
+    if args.sparsity > 0.0:
+        masks = compression.prune(net, args.sparsity)
+        if args.data:
+            error, data = dataloadingutil.load_train_data(args.data)
+            if error:
+                print(error, file=sys.stderr)
+                return 1
+            compression.fine_tune(net, masks, data, args.fine_tune_iter)
+        net = compression.shrink(net)
+    quantized = compression.quantize(net)
+    quantized.save(args.output)
+    result = compression.compare(original, quantized, held_out)
+    print('Size: {} -> {} bytes'.format(
+        original.get_weights().get_values().nbytes, quantized.get_size()))
+    print('Held-out error: {original_error:.6f} -> {compressed_error:.6f} '
+          '(delta={error_delta:+.6f}, max output delta='
+          '{max_output_delta:.3e})'.format(**result))
+    return 0
+
+
+def __cross_validate(args):
+    from network import crossvalidation
+    error, data, config = __load(args)
+    if error:
+        print(error, file=sys.stderr)
+        return 1
+    result = crossvalidation.cross_validate(
+        config, data, args.folds, args.workers, args.seed,
+        batch_size=args.batch_size, max_iter_num=args.max_iter)
+    print(crossvalidation.get_report(result), end='')
+    return 0
+
+
+def __export(args):
+    import dataloadingutil
+    from network import export
+    from network.neuralnetwork import NeuralNetwork
+    error, model = dataloadingutil.load_model(args.model)
+    if error:
+        print(error, file=sys.stderr)
+        return 1
+    config, weights = model
+    net = NeuralNetwork(config)
+    net.get_weights().set_values(weights)
+    module_path, weights_path = export.export(net, args.output, args.name,
+                                              args.backend)
+    print('Scoring module was saved: {}, {}'.format(
+        module_path, weights_path))
+    return 0
+
+
+def __get_points_num(text):
+    """Convert argument of number of table nodes."""
+    points_num = int(text)
+    if points_num < 2:
+        raise argparse.ArgumentTypeError('must be at least 2')
+    return points_num
+
+
+def __add_data_arguments(parser):
+    parser.add_argument('--data', default=globals.DEFAULT_DATA_PATH,
+                        help='path to file with train data')
+    parser.add_argument('--config', default=globals.DEFAULT_CONFIG_PATH,
+                        help='path to file with network configuration')
+
+
+def main(argv=None):
+    """Parse command line and execute command. Returns exit code."""
+    parser = argparse.ArgumentParser(prog='perceptron_1')
+    parser.add_argument('--trace', help='path for Chrome trace (JSON) of '
+                        'execution, it can be opened in ui.perfetto.dev')
+    parser.add_argument('--trace-stride', type=int, default=100,
+                        help='trace each N-th iteration of training')
+    subparsers = parser.add_subparsers(dest='command')
+    subparsers.required = True
+
+    train_parser = subparsers.add_parser('train', help='train network')
+    __add_data_arguments(train_parser)
+    train_parser.add_argument('--optimizer', default='sgd',
+                              choices=['sgd', 'lm', 'lbfgs'],
+                              help='sgd, Levenberg-Marquardt or L-BFGS')
+    train_parser.add_argument('--batch-size', type=int, default=1,
+                              help='number of samples in SGD mini-batch')
+    train_parser.add_argument('--max-iter', type=int, default=50000,
+                              help='max number of SGD iterations '
+                              '(mini-batches)')
+    train_parser.add_argument('--seed', type=int,
+                              help='seed of shuffling of samples')
+    train_parser.add_argument('--report', help='path for training report')
+    train_parser.add_argument('--lut', help='path for lookup-table surrogate '
+                              'of trained network (.npz)')
+    train_parser.add_argument('--lut-points', type=__get_points_num,
+                              default=4097, help='number of table nodes '
+                              '(at least 2)')
+    train_parser.add_argument('--init', help='path to saved model for warm '
+                              'start (network may be wider or deeper)')
+    train_parser.add_argument('--save', help='path for trained model, '
+                              'it can be served by command serve')
+    train_parser.add_argument('--memory-budget', type=float, metavar='MB',
+                              help='memory budget of loading and training, '
+                              'data is streamed and report is shortened to '
+                              'fit it')
+    train_parser.add_argument('--memory-report', action='store_true',
+                              help='print estimated and peak memory of '
+                              'phases')
+    train_parser.set_defaults(func=__train)
+
+    serve_parser = subparsers.add_parser(
+        'serve', help='serve saved models through HTTP')
+    serve_parser.add_argument('models', nargs='+', metavar='MODEL',
+                              help='path to saved model, its name in '
+                              'requests is name of file without suffix')
+    serve_parser.add_argument('--host', default='127.0.0.1')
+    serve_parser.add_argument('--port', type=int, default=8000)
+    serve_parser.add_argument('--max-batch', type=int, default=64,
+                              help='max number of samples in batch')
+    serve_parser.add_argument('--max-latency-ms', type=float, default=2.0,
+                              help='max time of waiting for batch')
+    serve_parser.add_argument('--max-body-size', type=int, default=65536,
+                              help='max size of request body in bytes, '
+                              'larger requests get 413')
+    serve_parser.set_defaults(func=__serve)
+
+    cv_parser = subparsers.add_parser(
+        'cv', help='k-fold cross-validation of configuration')
+    __add_data_arguments(cv_parser)
+    cv_parser.add_argument('--folds', type=int, default=5)
+    cv_parser.add_argument('--workers', type=int,
+                           help='number of processes (default - CPU number)')
+    cv_parser.add_argument('--seed', type=int,
+                           help='seed of division into folds')
+    cv_parser.add_argument('--batch-size', type=int, default=1,
+                           help='number of samples in SGD mini-batch')
+    cv_parser.add_argument('--max-iter', type=int, default=50000,
+                           help='max number of SGD iterations')
+    cv_parser.set_defaults(func=__cross_validate)
+
+    compress_parser = subparsers.add_parser(
+        'compress', help='prune and quantize saved model')
+    compress_parser.add_argument('model', help='path to saved model')
+    compress_parser.add_argument('--held-out', required=True,
+                                 help='path to data for evaluation')
+    compress_parser.add_argument('--output', required=True,
+                                 help='path for compressed model (.npz)')
+    compress_parser.add_argument('--sparsity', type=float, default=0.0,
+                                 help='share of pruned weights of layer')
+    compress_parser.add_argument('--data', help='path to train data for '
+                                 'fine-tuning after pruning')
+    compress_parser.add_argument('--fine-tune-iter', type=int, default=2000)
+    compress_parser.set_defaults(func=__compress)
+
+    export_parser = subparsers.add_parser(
+        'export', help='export saved model into standalone scoring module')
+    export_parser.add_argument('model', help='path to saved model')
+    export_parser.add_argument('--output', required=True,
+                               help='directory for module and weights')
+    export_parser.add_argument('--name', default='model',
+                               help='name of module (python identifier)')
+    export_parser.add_argument('--backend', default='numpy',
+                               choices=['numpy', 'stdlib'],
+                               help='dependency of module: numpy or only '
+                               'standard library')
+    export_parser.set_defaults(func=__export)
+
+    args = parser.parse_args(argv)
+    if args.trace is None:
+        return args.func(args)
+    from network import tracing
+    tracer = tracing.start(args.trace_stride)
+    try:
+        with tracing.span(args.command, 'cli'):
+            return args.func(args)
+    finally:
+        tracing.stop()
+        tracer.save(args.trace)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
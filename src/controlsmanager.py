@@ -15,6 +15,8 @@ class ControlsManager():
     __config_path_widget = None
     __load_button = None
     __launch_button = None
+    __cancel_button = None
+    __progress_label = None
 
     def __init__(self, parent_frame):
         """Create controls."""
@@ -55,10 +57,20 @@ class ControlsManager():
         launch_button.grid(row=3, column=0, columnspan=2,
                            sticky='W', pady=(0, 10))
 
+        cancel_button = tk.Button(inner_frame, text="Cancel", width=15,
+                                  state=tk.DISABLED)
+        cancel_button.grid(row=4, column=0, columnspan=2,
+                           sticky='W', pady=(0, 10))
+
+        progress_label = tk.Label(inner_frame, text="", bg=globals.BG_COLOR)
+        progress_label.grid(row=5, column=0, columnspan=2, sticky='W')
+
         self.__data_path_widget = data_entry
         self.__config_path_widget = config_entry
         self.__load_button = load_button
         self.__launch_button = launch_button
+        self.__cancel_button = cancel_button
+        self.__progress_label = progress_label
 
     def get_data_path(self):
         """Return path for data-file."""
@@ -75,3 +87,26 @@ class ControlsManager():
     def set_launch_button_callback(self, cbk):
         """No."""
         self.__launch_button.config(command=cbk)
+
+    def set_cancel_button_callback(self, cbk):
+        """No."""
+        self.__cancel_button.config(command=cbk)
+
+    def set_busy(self, busy):
+        """Switch controls between 'loading in progress' and usual mode.
+
+        While loading is in progress only cancel button is enabled.
+        """
+        state, cancel_state = tk.NORMAL, tk.DISABLED
+        if busy:
+            state, cancel_state = tk.DISABLED, tk.NORMAL
+        self.__load_button.config(state=state)
+        self.__launch_button.config(state=state)
+        self.__cancel_button.config(state=cancel_state)
+        if not busy:
+            self.__progress_label.config(text='')
+
+    def set_progress(self, fraction, label='Loading'):
+        """Show progress of job (fraction in [0;1]) with label."""
+        self.__progress_label.config(
+            text='{}: {:.0f}%'.format(label, 100.0 * fraction))
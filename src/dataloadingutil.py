@@ -1,42 +1,183 @@
-"""Module, for utility functions for loading data from file."""
+"""Module, for utility functions for loading data from file.
+
+Loading functions may be called from background thread. They can report
+progress through callback progress(fraction), where fraction is in [0;1],
+and can be cancelled through threading.Event cancel_event.
+"""
 
 import json
 import pathlib
-
-
-def load_train_data(str_path):
+import re
+import sys
+import tempfile
+from network import tracing
+
+PRECISIONS = ('float64', 'float32')
+# must correspond with network.initializers (it isn't imported to keep
+# loading light):
+INITIALIZERS = ('legacy', 'uniform', 'normal', 'xavier_uniform',
+                'xavier_normal', 'he_uniform', 'he_normal')
+CANCELLED_ERROR = 'Loading was cancelled'
+CHUNK_SIZE = 1 << 20  # size of chunks (in chars) for reading of file
+CHECK_STRIDE = 10000  # number of samples checked between progress reports
+LOADING_MODES = ('list', 'array', 'memmap')
+# strings and structural chars of JSON, lone quote - incomplete string:
+JSON_TOKEN = re.compile(r'"(?:[^"\\]|\\.)*"|[{}\[\]:,"]')
+
+
+def load_train_data(str_path, precision=None, progress=None,
+                    cancel_event=None, memory_budget=None):
     """Load train_data from file, give out checked object.
 
     This functions check path, file and data-object.
     Returns error-string and checked data-object.
+    If precision ('float64' or 'float32') is given, data-object is
+    numpy-array of corresponding type, otherwise - list of lists.
+    If memory_budget (bytes) is given and usual loading doesn't fit into
+    it (see estimate_train_data), samples are parsed one by one into
+    numpy-array (of precision or float64), or into numpy.memmap over
+    temporary file, if array doesn't fit as well.
     """
-    load_err, loaded_obj = __load_object(str_path)
+    if memory_budget is not None:
+        estimate_err, estimate = estimate_train_data(str_path, precision)
+        if estimate_err:
+            return estimate_err, []
+        mode = choose_loading_mode(estimate, memory_budget)
+        if mode != 'list':
+            return __stream_train_data(pathlib.Path(str_path),
+                                       precision or 'float64',
+                                       mode == 'memmap', progress,
+                                       cancel_event)
+
+    def reading_progress(fraction): __report(progress, 0.5 * fraction)
+    load_err, loaded_obj = __load_object(str_path, reading_progress,
+                                         cancel_event)
     if load_err:
         return load_err, []
 
-    data_err, data = __check_data(loaded_obj)
+    def checking_progress(fraction): __report(progress, 0.5 + 0.5 * fraction)
+    with tracing.span('validate data', 'loading'):
+        data_err, data = __check_data(loaded_obj, checking_progress,
+                                      cancel_event)
     if data_err:
         return data_err, []
+    if precision is not None:
+        import numpy  # it isn't required for usual loading
+        assert precision in PRECISIONS
+        with tracing.span('convert data', 'loading'):
+            data = numpy.array(data, dtype=precision)
     return None, data
 
 
-def load_configuration(str_path):
+def estimate_train_data(str_path, precision=None):
+    """Estimate number of samples and memory for loading of train_data.
+
+    Number of samples is estimated by the first chunk of list "Data", so
+    it's exact only for files with uniform formatting.
+    Returns error-string and dict with 'samples_num' and peak bytes of
+    loading modes: 'list' - usual loading (with conversion to precision,
+    if it's given), 'array' - streaming into numpy-array, 'memmap' -
+    streaming into numpy.memmap (pages of file aren't counted).
+    """
+    pathlib_path = pathlib.Path(str_path)
+    path_err = __check_path(pathlib_path)
+    if path_err:
+        return path_err, {}
+    size = pathlib_path.stat().st_size
+    scan_state = __get_scan_state()
+    chunk = ''
+    with open(pathlib_path) as f:
+        while True:  # text before "Data" is read fully
+            part = f.read(CHUNK_SIZE)
+            chunk += part
+            begin = __find_data_list(chunk, scan_state) - 1
+            if begin >= 0 or not part:
+                break
+        if begin >= 0:
+            chunk += f.read(CHUNK_SIZE)
+    if begin < 0:
+        return 'The file has no "Data"', {}
+    # each sample has its own brackets, "Data" has one more:
+    brackets_num = chunk.count('[', begin) - 1
+    if brackets_num > 0:
+        chars_per_sample = (len(chunk) - begin) / brackets_num
+        samples_num = int((size - begin) / chars_per_sample)
+    else:
+        samples_num = 0
+    # objects of list of [float, float] and pointers of list:
+    sample_bytes = (sys.getsizeof([0.0, 0.0]) + 2 * sys.getsizeof(0.0)
+                    + sys.getsizeof(0))
+    objects = samples_num * sample_bytes
+    itemsize = 4 if precision == 'float32' else 8
+    array = 2 * samples_num * itemsize
+    # text of file and its chunks, then loaded and checked objects (and
+    # read buffer of estimation):
+    list_peak = max(2 * size + objects, 2 * objects)
+    if precision is not None:
+        list_peak = max(list_peak, 2 * objects + array)
+    list_peak += CHUNK_SIZE
+    # read buffer (f.read(CHUNK_SIZE) allocates it even for small file),
+    # chunks, their concatenation and objects of JSON-parser:
+    buffer = CHUNK_SIZE + 4 * min(CHUNK_SIZE, size)
+    return None, {'samples_num': samples_num, 'list': list_peak,
+                  'array': array + buffer, 'memmap': buffer}
+
+
+def choose_loading_mode(estimate, memory_budget):
+    """Return the first of LOADING_MODES, which fits into budget."""
+    for mode in LOADING_MODES[:-1]:
+        if estimate[mode] <= memory_budget:
+            return mode
+    return LOADING_MODES[-1]
+
+
+def load_configuration(str_path, progress=None, cancel_event=None):
     """Load configuration_data from file, give out checked object.
 
     This functions check path, file and structure of object.
     Returns error-string and checked object.
     """
-    load_err, loaded_obj = __load_object(str_path)
+    load_err, loaded_obj = __load_object(str_path, progress, cancel_event)
     if load_err:
         return load_err, {}
 
-    config_err, config = __check_configuration(loaded_obj)
+    with tracing.span('validate configuration', 'loading'):
+        config_err, config = __check_configuration(loaded_obj)
     if config_err:
         return config_err, {}
+    __report(progress, 1.0)
     return None, config
 
 
-def __load_object(str_path):
+def load_model(str_path, progress=None, cancel_event=None):
+    """Load saved model (see NeuralNetwork.save), give out checked object.
+
+    Model file is a configuration file with additional list "Weights".
+    Returns error-string and [configuration, weights].
+    """
+    load_err, loaded_obj = __load_object(str_path, progress, cancel_event)
+    if load_err:
+        return load_err, []
+
+    config_err, config = __check_configuration(loaded_obj)
+    if config_err:
+        return config_err, []
+    weights_err, weights = __check_weights(loaded_obj, config)
+    if weights_err:
+        return weights_err, []
+    return None, [config, weights]
+
+
+def __report(progress, fraction):
+    if progress is not None:
+        progress(fraction)
+
+
+def __cancelled(cancel_event):
+    return cancel_event is not None and cancel_event.is_set()
+
+
+def __load_object(str_path, progress=None, cancel_event=None):
     """Load data-object from file, give out data-object.
 
     This functions check path and decode json-file.
@@ -48,7 +189,8 @@ def __load_object(str_path):
     if path_err:
         return path_err, []
 
-    load_err, loaded_obj = __load_data_from_json(pathlib_path)
+    load_err, loaded_obj = __load_data_from_json(pathlib_path, progress,
+                                                 cancel_event)
     if load_err:
         return load_err, []
     return None, loaded_obj
@@ -68,40 +210,213 @@ def __check_path(pathlib_path):
     return None
 
 
-def __load_data_from_json(pathlib_path):
+def __load_data_from_json(pathlib_path, progress=None, cancel_event=None):
     try:
-        with open(pathlib_path) as f:
-            loaded_obj_out = json.load(f)
+        # file is read by chunks to report progress and check cancellation:
+        size = max(pathlib_path.stat().st_size, 1)
+        chunks = []
+        read_size = 0
+        with tracing.span('read file', 'loading',
+                          path=str(pathlib_path)), open(pathlib_path) as f:
+            while True:
+                if __cancelled(cancel_event):
+                    return CANCELLED_ERROR, {}
+                chunk = f.read(CHUNK_SIZE)
+                if not chunk:
+                    break
+                chunks.append(chunk)
+                read_size += len(chunk)
+                __report(progress, min(read_size / size, 1.0))
+        with tracing.span('parse json', 'loading'):
+            loaded_obj_out = json.loads(''.join(chunks))
         return None, loaded_obj_out
     except json.decoder.JSONDecodeError:
         return 'The file is corrupted', {}
 
 
-def __check_data(loaded_obj):
+def __check_data(loaded_obj, progress=None, cancel_event=None):
     if 'Data' not in loaded_obj:
         return 'The file has no "Data"', []
     data = loaded_obj['Data']
     if type(data) is not list:
         return 'The file has no "Data"', []
 
+    for i, sample in enumerate(data):
+        if i % CHECK_STRIDE == 0:
+            if __cancelled(cancel_event):
+                return CANCELLED_ERROR, []
+            __report(progress, i / len(data))
+        sample_err = __check_sample(sample, i)
+        if sample_err:
+            return sample_err, []
+    __report(progress, 1.0)
+    return None, [[float(sample[0]), float(sample[1])] for sample in data]
+
+
+def __check_sample(sample, i):
     def valid(x): return (x >= -1.0 and x <= 1.0)
 
-    for i, sample in enumerate(data):
-        if (len(sample) != 2):
-            return 'Wrong number of elements in sample ' + str(i), []
-        if (type(sample[0]) != float) or (type(sample[1]) != float):
-            return 'Wrong type of element in sample ' + str(i), []
-        if not valid(sample[0]) or not valid(sample[1]):
-            return 'Wrong range of element in sample ' + str(i), []
+    # integer values (like 0 or 1) are valid numbers in json as well:
+    def number(x): return type(x) in (float, int)
+
+    if type(sample) is not list or len(sample) != 2:
+        return 'Wrong number of elements in sample ' + str(i)
+    if not number(sample[0]) or not number(sample[1]):
+        return 'Wrong type of element in sample ' + str(i)
+    if not valid(sample[0]) or not valid(sample[1]):
+        return 'Wrong range of element in sample ' + str(i)
+    return None
+
+
+def __stream_train_data(pathlib_path, precision, to_memmap, progress=None,
+                        cancel_event=None):
+    """Parse samples one by one into numpy-array (or numpy.memmap).
+
+    The first pass checks samples and counts them, the second one fills
+    array, so list of all samples is never created.
+    """
+    import numpy  # it isn't required for usual loading
+
+    def counting_progress(fraction): __report(progress, 0.5 * fraction)
+    samples_num = 0
+    with tracing.span('validate data', 'loading', streaming=True):
+        for sample in __iterate_samples(pathlib_path, counting_progress,
+                                        cancel_event):
+            if type(sample) is str:  # error
+                return sample, []
+            sample_err = __check_sample(sample, samples_num)
+            if sample_err:
+                return sample_err, []
+            samples_num += 1
+    if samples_num == 0:
+        return None, numpy.zeros((0, 2), dtype=precision)
+
+    if to_memmap:
+        data = numpy.memmap(tempfile.TemporaryFile(), dtype=precision,
+                            mode='w+', shape=(samples_num, 2))
+    else:
+        data = numpy.empty((samples_num, 2), dtype=precision)
+
+    def filling_progress(fraction): __report(progress, 0.5 + 0.5 * fraction)
+    with tracing.span('convert data', 'loading', streaming=True):
+        for i, sample in enumerate(__iterate_samples(
+                pathlib_path, filling_progress, cancel_event)):
+            if type(sample) is str:  # file may be changed between passes
+                return sample, []
+            data[i] = sample
     return None, data
 
 
+def __iterate_samples(pathlib_path, progress=None, cancel_event=None):
+    """Yield samples of "Data" list from file, which is read by chunks.
+
+    Errors are yielded as strings (and iteration stops).
+    """
+    decoder = json.JSONDecoder()
+    size = max(pathlib_path.stat().st_size, 1)
+    read_size = 0
+    with open(pathlib_path) as f:
+        def read():
+            nonlocal read_size
+            if __cancelled(cancel_event):
+                return None
+            chunk = f.read(CHUNK_SIZE)
+            read_size += len(chunk)
+            __report(progress, min(read_size / size, 1.0))
+            return chunk
+
+        buffer = ''
+        scan_state = __get_scan_state()
+        # find beginning of list "Data":
+        while True:
+            chunk = read()
+            if chunk is None:
+                yield CANCELLED_ERROR
+                return
+            buffer += chunk
+            pos = __find_data_list(buffer, scan_state)
+            if pos >= 0:
+                break
+            if not chunk:
+                yield 'The file has no "Data"'
+                return
+
+        eof = False
+        while True:
+            while pos < len(buffer) and buffer[pos] in ' \t\r\n,':
+                pos += 1
+            if pos < len(buffer) and buffer[pos] == ']':
+                return
+            try:
+                sample, end = decoder.raw_decode(buffer, pos)
+                if end == len(buffer) and not eof:
+                    # number at the end of buffer may be incomplete
+                    raise json.decoder.JSONDecodeError('', buffer, end)
+            except json.decoder.JSONDecodeError:
+                if eof:
+                    yield 'The file is corrupted'
+                    return
+                chunk = read()
+                if chunk is None:
+                    yield CANCELLED_ERROR
+                    return
+                eof = not chunk
+                buffer = buffer[pos:] + chunk
+                pos = 0
+                continue
+            yield sample
+            pos = end
+
+
+def __get_scan_state():
+    """Return initial state for __find_data_list."""
+    return {'pos': 0, 'depth': 0, 'key': None, 'colon': False}
+
+
+def __find_data_list(text, state):
+    """Return position after bracket of top-level list "Data" or -1.
+
+    Text is scanned by tokens from state['pos'], so the same growing text
+    may be given again with the same state. Key "Data" is found only in
+    the top-level object, not in strings and nested objects.
+    """
+    for match in JSON_TOKEN.finditer(text, state['pos']):
+        token = match.group()
+        if token == '"':  # the end of string isn't read yet
+            state['pos'] = match.start()
+            return -1
+        is_data = state['colon'] and state['key'] == '"Data"'
+        state['colon'] = False
+        if token == ':':
+            state['colon'] = state['depth'] == 1
+            continue
+        if token == '[' and is_data:
+            return match.end()
+        state['key'] = None
+        if token in '{[':
+            state['depth'] += 1
+        elif token in '}]':
+            state['depth'] -= 1
+        elif token.startswith('"') and state['depth'] == 1:
+            state['key'] = token
+    state['pos'] = len(text)
+    return -1
+
+
 def __check_configuration(loaded_obj):
     CONFIG = 'Configuration'
     NUM_OF_INPUTS = 'NumberOfInputUnits'
     LAYERS_INFO = 'LayersInfo'
     NUM_OF_UNITS = 'NumberOfUnits'
     ACTIV_FUNC = 'ActivationFunction'
+    PRECISION = 'Precision'
+    INITIALIZER = 'Initializer'
+    INIT_SCALE = 'InitScale'
+    ZERO_BIASES = 'ZeroBiases'
+    CONNECTIVITY = 'Connectivity'
+    FAN_IN = 'FanIn'
+    CONNECTIONS = 'Connections'
+    SEED = 'Seed'
 
     if CONFIG not in loaded_obj:
         return 'The file has no "' + CONFIG + '"', {}
@@ -135,10 +450,70 @@ def __check_configuration(loaded_obj):
             return False
         if num_of_units <= 0:
             return False
+        return True
+
+    def initialization_is_valid(info):
+        # all keys of initialization are optional:
+        if INITIALIZER in info and info[INITIALIZER] not in INITIALIZERS:
+            return False
+        if INIT_SCALE in info:
+            scale = info[INIT_SCALE]
+            if type(scale) not in (float, int) or scale <= 0:
+                return False
+        if ZERO_BIASES in info and type(info[ZERO_BIASES]) is not bool:
+            return False
+        return True
+
+    def connectivity_is_valid(info, prev_units_num):
+        # connectivity is optional, layer is fully connected by default:
+        if CONNECTIVITY not in info:
+            return True
+        connectivity = info[CONNECTIVITY]
+        if type(connectivity) is not dict or len(connectivity) != 1:
+            return False
+        if FAN_IN in connectivity:
+            fan_in = connectivity[FAN_IN]
+            return type(fan_in) is int and fan_in > 0
+        connections = connectivity.get(CONNECTIONS)
+        if type(connections) is not list or \
+                len(connections) != info[NUM_OF_UNITS]:
+            return False
+        return all(type(unit) is list and all(
+            type(g) is int and 1 <= g <= prev_units_num for g in unit)
+            for unit in connections)
 
+    prev_units_num = num_of_iputs
     for i, info in enumerate(layers_info):
-        if not activ_func_is_valid(info) or num_of_units_is_valid(info):
+        if not activ_func_is_valid(info) or not num_of_units_is_valid(info) \
+                or not initialization_is_valid(info) \
+                or not connectivity_is_valid(info, prev_units_num):
             return 'Layer info is not valid for layer with index ' + str(i), {}
+        prev_units_num = info[NUM_OF_UNITS]
+
+    # precision is optional, float64 is used by default:
+    if PRECISION in config and config[PRECISION] not in PRECISIONS:
+        return '"' + PRECISION + '" has wrong value', {}
+    if SEED in config and (type(config[SEED]) is not int or config[SEED] < 0):
+        return '"' + SEED + '" has wrong value', {}
     return None, config
 
+
+def __check_weights(loaded_obj, config):
+    WEIGHTS = 'Weights'
+    if WEIGHTS not in loaded_obj or type(loaded_obj[WEIGHTS]) is not list:
+        return 'The file has no "' + WEIGHTS + '"', []
+    weights = loaded_obj[WEIGHTS]
+
+    weights_num = 0
+    prev_units_num = config['NumberOfInputUnits']
+    for info in config['LayersInfo']:
+        weights_num += info['NumberOfUnits'] * (prev_units_num + 1)
+        prev_units_num = info['NumberOfUnits']
+    if len(weights) != weights_num:
+        return 'Wrong number of weights', []
+    for w in weights:
+        if type(w) not in (float, int):
+            return 'Wrong type of weight', []
+    return None, weights
+
 # todo: consider using json-schema
@@ -1,6 +1,22 @@
 """File for global constants."""
 
+import os
+
 FRAME_PAD = 10
 BG_COLOR = '#888888'
 DEFAULT_DATA_PATH = 'src/examples/train_data.json'
 DEFAULT_CONFIG_PATH = 'src/examples/network_config.json'
+# Full log of all sessions is appended to this file (None - no file):
+LOG_PATH = os.path.join(os.path.expanduser('~'), 'perceptron_1.log')
+LOG_MAX_LINES = 5000
+LOG_FLUSH_INTERVAL_MS = 100
+# Chrome trace of GUI session is written to this path, if it's not None
+# (see network.tracing):
+TRACE_PATH = None
+TRACE_STRIDE = 100
+# Loss-curve panel (see LossWindow):
+LOSS_WINDOW_RELHEIGHT = 0.4
+LOSS_FRAME_INTERVAL_MS = 100
+LOSS_MAX_BUCKETS = 512
+# Share of train data held out for validation loss in GUI:
+VALIDATION_SHARE = 0.2
@@ -7,47 +7,18 @@ import tkinter as tk
 class GraphWindow():
     """The class incapsulated all logic for graph window.
 
-    It creates GUI-elements, draw and redraw data
+    It creates GUI-elements, draw and redraw data.
+    Canvas items are created only when data is changed. On resize existing
+    items are moved (Canvas.scale/coords), not recreated. Large point sets
+    are drawn as one density image instead of separate circles, so time of
+    redrawing doesn't depend on number of points.
     """
 
-    __graph_canvas = None
-    __points = None
-    __line = None
-
-    def __redraw(self):
-        """Redraw all in graph window."""
-        w = self.__graph_canvas.winfo_width()
-        h = self.__graph_canvas.winfo_height()
-
-        # sx & sy - means screen coordinates
-        def sx(x): return 0.5 * w * (1 + x)
-        def sy(y): return 0.5 * h * (1 - y)
-
-        self.__graph_canvas.delete('axis')
-        self.__graph_canvas.delete('points')
-        self.__graph_canvas.delete('line')
-
-        # draw axis
-        self.__graph_canvas.create_line(sx(-1), sy(0), sx(1), sy(0),
-                                        tags='axis', fill='blue')
-        self.__graph_canvas.create_line(sx(0), sy(-1), sx(0), sy(1),
-                                        tags='axis', fill='red')
-        # draw points
-        if self.__points is not None:
-            for pt in self.__points:
-                x, y = sx(pt[0]), sy(pt[1])
-                sh = 4  # shift
-                self.__graph_canvas.create_oval((x-sh, y-sh, x+sh, y+sh),
-                                                tags='points', fill='green',
-                                                outline='green')
-
-        # draw line
-        if self.__line is not None:
-            for i in range(1, len(self.__line)):
-                x0, x1 = sx(self.__line[i-1][0]), sx(self.__line[i][0])
-                y0, y1 = sy(self.__line[i-1][1]), sy(self.__line[i][1])
-                self.__graph_canvas.create_line(x0, y0, x1, y1, width=2,
-                                                tags='line', fill='black')
+    # Max number of points drawn as separate circles:
+    MAX_POINT_ITEMS = 2000
+    # Resolution of density grid for large point sets:
+    DENSITY_GRID_SIZE = 256
+    POINT_RADIUS = 4
 
     def __init__(self, parent_frame):
         """Create GUI-elements and attach them to parent."""
@@ -65,7 +36,103 @@ class GraphWindow():
         self.__graph_canvas['highlightthickness'] = 0
         self.__graph_canvas.place(anchor='nw', relwidth=1.0, relheight=1.0)
 
-        self.__graph_canvas.bind('<Configure>', lambda e: self.__redraw())
+        self.__points = None
+        self.__point_items = []  # circle for each point (for small sets)
+        self.__density = None  # density grid (for large sets)
+        self.__density_image = None
+        self.__line = None
+        self.__size = None  # size of canvas for which items are drawn
+
+        self.__graph_canvas.bind('<Configure>', lambda e: self.__on_resize())
+
+    def __get_size(self):
+        return (self.__graph_canvas.winfo_width(),
+                self.__graph_canvas.winfo_height())
+
+    def __sx(self, x):
+        """Return screen coordinate for x."""
+        return 0.5 * self.__size[0] * (1 + x)
+
+    def __sy(self, y):
+        """Return screen coordinate for y."""
+        return 0.5 * self.__size[1] * (1 - y)
+
+    def __on_resize(self):
+        """Fit existing items to new size of canvas."""
+        old_size = self.__size
+        self.__size = self.__get_size()
+        if old_size is None or min(old_size) <= 0:
+            self.__redraw()
+            return
+        fx = self.__size[0] / old_size[0]
+        fy = self.__size[1] / old_size[1]
+        # lines can be scaled, but circles must keep their radius:
+        self.__graph_canvas.scale('axis', 0, 0, fx, fy)
+        self.__graph_canvas.scale('line', 0, 0, fx, fy)
+        if self.__density is not None:
+            self.__draw_density()
+        else:
+            sh = self.POINT_RADIUS
+            for item, pt in zip(self.__point_items, self.__points):
+                x, y = self.__sx(pt[0]), self.__sy(pt[1])
+                self.__graph_canvas.coords(item, x-sh, y-sh, x+sh, y+sh)
+
+    def __redraw(self):
+        """Redraw all in graph window."""
+        self.__size = self.__get_size()
+        sx, sy = self.__sx, self.__sy
+        self.__graph_canvas.delete('axis')
+        self.__graph_canvas.create_line(sx(-1), sy(0), sx(1), sy(0),
+                                        tags='axis', fill='blue')
+        self.__graph_canvas.create_line(sx(0), sy(-1), sx(0), sy(1),
+                                        tags='axis', fill='red')
+        self.__draw_points()
+        self.__draw_line()
+
+    def __draw_points(self):
+        """Recreate items for points."""
+        self.__graph_canvas.delete('points')
+        self.__point_items = []
+        self.__density = None
+        if self.__points is None or len(self.__points) == 0:
+            return
+        if len(self.__points) > self.MAX_POINT_ITEMS:
+            self.__density = _get_density_grid(self.__points,
+                                               self.DENSITY_GRID_SIZE)
+            self.__draw_density()
+            return
+        sh = self.POINT_RADIUS
+        for pt in self.__points:
+            x, y = self.__sx(pt[0]), self.__sy(pt[1])
+            item = self.__graph_canvas.create_oval(
+                (x-sh, y-sh, x+sh, y+sh), tags='points', fill='green',
+                outline='green')
+            self.__point_items.append(item)
+        self.__graph_canvas.tag_raise('line')
+
+    def __draw_density(self):
+        """Draw density grid as one image stretched over canvas."""
+        w, h = self.__size
+        self.__graph_canvas.delete('points')
+        if w <= 0 or h <= 0:
+            return
+        ppm = _get_density_ppm(self.__density, w, h)
+        self.__density_image = tk.PhotoImage(data=ppm, format='PPM')
+        self.__graph_canvas.create_image(0, 0, anchor='nw', tags='points',
+                                         image=self.__density_image)
+        # image is opaque, so it must be under axis:
+        self.__graph_canvas.tag_lower('points')
+
+    def __draw_line(self):
+        """Recreate item for line (one polyline)."""
+        self.__graph_canvas.delete('line')
+        if self.__line is None or len(self.__line) < 2:
+            return
+        coords = []
+        for pt in self.__line:
+            coords += [self.__sx(pt[0]), self.__sy(pt[1])]
+        self.__graph_canvas.create_line(*coords, width=2, tags='line',
+                                        fill='black')
 
     def set_points(self, points_array):
         """Set 2d-array of points.
@@ -74,7 +141,10 @@ class GraphWindow():
         All coordinates must be in the nterval [-1;1]
         """
         self.__points = points_array
-        self.__redraw()
+        if self.__size is None:
+            self.__redraw()
+        else:
+            self.__draw_points()
 
     def set_line(self, line_array):
         """Set 2d-array of points for line.
@@ -83,4 +153,39 @@ class GraphWindow():
         All coordinates must be in the nterval [-1;1]
         """
         self.__line = line_array
-        self.__redraw()
+        if self.__size is None:
+            self.__redraw()
+        else:
+            self.__draw_line()
+
+
+def _get_density_grid(points, grid_size):
+    """Return normalized 2d-histogram [row][column] of points.
+
+    Row 0 corresponds with y = 1 (top of screen).
+    """
+    import numpy  # it's imported only when large point set is drawn
+    pts = numpy.asarray(points, dtype=float)
+    grid, _, _ = numpy.histogram2d(-pts[:, 1], pts[:, 0], bins=grid_size,
+                                   range=[[-1.0, 1.0], [-1.0, 1.0]])
+    # logarithmic scale keeps sparse areas visible near dense ones:
+    grid = numpy.log1p(grid)
+    return grid / grid.max()
+
+
+def _get_density_ppm(density, width, height):
+    """Return binary PPM-image width x height with density of points.
+
+    Empty cells are white, the densest ones - green (as circles).
+    """
+    import numpy
+    rows = (numpy.arange(height) * density.shape[0]) // height
+    columns = (numpy.arange(width) * density.shape[1]) // width
+    d = density[rows][:, columns][:, :, None]
+    white = numpy.array([255.0, 255.0, 255.0])
+    green = numpy.array([0.0, 128.0, 0.0])
+    # any nonempty cell is at least half colored to be visible:
+    d = numpy.where(d > 0, 0.5 + 0.5 * d, 0.0)
+    pixels = (white + (green - white) * d).astype(numpy.uint8)
+    header = 'P6 {} {} 255\n'.format(width, height).encode('ascii')
+    return header + pixels.tobytes()
@@ -0,0 +1,260 @@
+"""Local inference server with micro-batching.
+
+Server gives access to saved models (see NeuralNetwork.save) through HTTP
+on local port:
+- POST /predict/<model> with body {"x": [f,...]} returns {"y": [f,...]};
+- GET /models returns list of names of models;
+- GET /stats returns number of requests and batches and percentiles of
+  latency of predictions (in milliseconds), rejected requests aren't
+  counted.
+
+Concurrent requests to one model are coalesced into micro-batches: batch
+is collected until it has max_batch_size samples or the oldest request
+waits max_latency_ms. Each batch is processed by one call of
+NeuralNetwork.process_batch in thread pool, so event loop never blocks.
+Models are frozen, so batches of different models run in parallel.
+Request with wrong Content-Length gets 400, with body larger than
+max_body_size - 413, with request line or header line longer than limit
+of stream (64 KB) - 400 or 431, and connection is closed (body isn't
+read).
+"""
+
+import asyncio
+import collections
+import json
+import time
+
+HTTP_REASONS = {200: 'OK', 400: 'Bad Request', 404: 'Not Found',
+                405: 'Method Not Allowed', 413: 'Payload Too Large',
+                431: 'Request Header Fields Too Large'}
+LATENCY_HISTORY = 100000  # number of last requests used for percentiles
+MAX_BODY_SIZE = 65536  # bytes, default limit of body of request
+
+
+class InferenceServer():
+    """Asyncio HTTP-server coalescing requests into micro-batches."""
+
+    def __init__(self, models, max_batch_size=64, max_latency_ms=2.0,
+                 max_body_size=MAX_BODY_SIZE):
+        """Create server for models - dict {name: NeuralNetwork}."""
+        self.__models = models
+        self.__max_body_size = max_body_size
+        for net in models.values():
+            if not net.is_frozen():
+                net.freeze()
+        self.__max_batch_size = max_batch_size
+        self.__max_latency = max_latency_ms / 1000.0
+        self.__queues = {}
+        self.__batchers = []
+        self.__server = None
+        self.__latencies = collections.deque(maxlen=LATENCY_HISTORY)
+        self.__requests_num = 0
+        self.__batches_num = 0
+
+    async def start(self, host='127.0.0.1', port=0):
+        """Start listening. Returns [host, port] (port 0 - any free one)."""
+        for name in self.__models:
+            self.__queues[name] = asyncio.Queue()
+            self.__batchers.append(asyncio.ensure_future(
+                self.__run_batcher(name)))
+        self.__server = await asyncio.start_server(self.__handle_connection,
+                                                   host, port)
+        return self.__server.sockets[0].getsockname()[:2]
+
+    async def serve_forever(self):
+        """Serve until cancelled."""
+        async with self.__server:
+            await self.__server.serve_forever()
+
+    async def stop(self):
+        """Stop listening and batching."""
+        self.__server.close()
+        await self.__server.wait_closed()
+        for batcher in self.__batchers:
+            batcher.cancel()
+        await asyncio.gather(*self.__batchers, return_exceptions=True)
+        self.__batchers = []
+
+    async def predict(self, name, x):
+        """Return output of model for x (list), through micro-batching."""
+        future = asyncio.get_event_loop().create_future()
+        await self.__queues[name].put((x, future))
+        return await future
+
+    def get_stats(self):
+        """Return dict with statistics of server."""
+        stats = {'requests': self.__requests_num,
+                 'batches': self.__batches_num, 'latency_ms': {}}
+        latencies = sorted(self.__latencies)
+        for p in (50, 90, 99, 99.9):
+            if latencies:
+                idx = min(int(len(latencies) * p / 100.0), len(latencies) - 1)
+                stats['latency_ms']['p{}'.format(p)] = latencies[idx] * 1e3
+        return stats
+
+    async def __run_batcher(self, name):
+        queue = self.__queues[name]
+        net = self.__models[name]
+        loop = asyncio.get_event_loop()
+        while True:
+            batch = [await queue.get()]
+            deadline = loop.time() + self.__max_latency
+            while len(batch) < self.__max_batch_size:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+            X = [x for x, _ in batch]
+            self.__batches_num += 1
+            try:
+                Y = await loop.run_in_executor(None, net.process_batch, X)
+            except Exception as e:  # error is given to each request
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+                continue
+            for [_, future], y in zip(batch, Y.tolist()):
+                if not future.done():
+                    future.set_result(y)
+
+    async def __handle_connection(self, reader, writer):
+        try:
+            while True:
+                request = await _read_request(reader, self.__max_body_size)
+                if request is None:
+                    break
+                method, path, body, keep_alive, error = request
+                if error is not None:
+                    _write_response(writer, error[0], {'error': error[1]},
+                                    False)
+                    await writer.drain()
+                    break
+                begin = time.perf_counter()
+                status, response = await self.__dispatch(method, path, body)
+                if method == 'POST' and status == 200:  # only predictions
+                    self.__latencies.append(time.perf_counter() - begin)
+                _write_response(writer, status, response, keep_alive)
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    async def __dispatch(self, method, path, body):
+        if path == '/stats' and method == 'GET':
+            return 200, self.get_stats()
+        if path == '/models' and method == 'GET':
+            return 200, sorted(self.__models)
+        if not path.startswith('/predict/'):
+            return 404, {'error': 'Unknown path'}
+        if method != 'POST':
+            return 405, {'error': 'POST is required'}
+        name = path[len('/predict/'):]
+        if name not in self.__models:
+            return 404, {'error': 'Unknown model'}
+        inputs_num = self.__models[name].get_configure()['NumberOfInputUnits']
+        try:
+            x = json.loads(body)['x']
+            valid = len(x) == inputs_num and all(
+                type(val) in (float, int) for val in x)
+        except (ValueError, TypeError, KeyError):
+            valid = False
+        if not valid:
+            return 400, {'error': 'Body must be {"x": [f,...]}'}
+        self.__requests_num += 1
+        return 200, {'y': await self.predict(name, x)}
+
+
+async def _read_request(reader, max_body_size):
+    """Read HTTP request. Returns [method, path, body, keep_alive, error].
+
+    error is [status, message] if request can't be read, otherwise None.
+    """
+    try:
+        line = await reader.readline()
+    except ValueError:  # line is longer than limit of stream
+        return None, None, None, False, [400, 'Request line is too long']
+    if not line:
+        return None
+    parts = line.decode('latin-1').split()
+    if len(parts) < 2:
+        return None
+    method, path = parts[0].upper(), parts[1]
+    version = parts[2] if len(parts) > 2 else 'HTTP/1.0'
+    headers = {}
+    while True:
+        try:
+            line = await reader.readline()
+        except ValueError:
+            return method, path, None, False, [431, 'Header is too long']
+        if line in (b'\r\n', b'\n', b''):
+            break
+        key, _, value = line.decode('latin-1').partition(':')
+        headers[key.strip().lower()] = value.strip()
+    connection = headers.get('connection', '').lower()
+    keep_alive = (connection == 'keep-alive' or
+                  (version == 'HTTP/1.1' and connection != 'close'))
+    try:
+        length = int(headers.get('content-length', '0'))
+    except ValueError:
+        length = -1
+    if length < 0:
+        return method, path, None, False, [400, 'Wrong Content-Length']
+    if length > max_body_size:
+        return method, path, None, False, [
+            413, 'Body is larger than {} bytes'.format(max_body_size)]
+    body = await reader.readexactly(length) if length else b''
+    return method, path, body, keep_alive, None
+
+
+def _write_response(writer, status, obj, keep_alive):
+    body = json.dumps(obj).encode('utf-8')
+    head = ('HTTP/1.1 {} {}\r\nContent-Type: application/json\r\n'
+            'Content-Length: {}\r\nConnection: {}\r\n\r\n').format(
+                status, HTTP_REASONS[status], len(body),
+                'keep-alive' if keep_alive else 'close')
+    writer.write(head.encode('latin-1') + body)
+
+
+def load_models(paths):
+    """Load saved models, name of model - name of file without suffix.
+
+    Returns error-string and dict {name: NeuralNetwork}.
+    """
+    import pathlib
+    import dataloadingutil
+    from network.neuralnetwork import NeuralNetwork
+    models = {}
+    for path in paths:
+        error, model = dataloadingutil.load_model(path)
+        if error:
+            return '{}: {}'.format(path, error), {}
+        config, weights = model
+        net = NeuralNetwork(config)
+        net.get_weights().set_values(weights)
+        models[pathlib.Path(path).stem] = net
+    return None, models
+
+
+def serve(models, host='127.0.0.1', port=8000, max_batch_size=64,
+          max_latency_ms=2.0, max_body_size=MAX_BODY_SIZE):
+    """Run server until interruption."""
+    async def run():
+        server = InferenceServer(models, max_batch_size, max_latency_ms,
+                                 max_body_size)
+        host_port = await server.start(host, port)
+        print('Serving {} on http://{}:{}'.format(
+            ', '.join(sorted(models)), *host_port))
+        try:
+            await server.serve_forever()
+        finally:
+            await server.stop()
+    try:
+        asyncio.run(run())
+    except KeyboardInterrupt:
+        pass
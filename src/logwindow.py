@@ -1,7 +1,10 @@
 """Module for LogWindow-class."""
 
+import collections
+import datetime
 import enum
 import globals
+import threading
 import tkinter as tk
 import tkinter.font as tkfont
 
@@ -18,19 +21,41 @@ class LogWindow():
     """This class incapsulates logic for work with log.
 
     It creates text area and scrollbars,
-    provides methods for work with content
+    provides methods for work with content.
+
+    Entries are not inserted in text area immediately: they are buffered
+    and flushed by timer, so thousands of entries per second cost one
+    insert per timer tick. Text area keeps only last max_lines lines (the
+    oldest text is trimmed), full log is appended to file log_path, so logs
+    of previous sessions are kept.
+    Entries may be added from any thread.
     """
 
-    __text_widget = None
-
-    def __init__(self, parent_frame):
+    def __init__(self, parent_frame, max_lines=globals.LOG_MAX_LINES,
+                 log_path=globals.LOG_PATH,
+                 flush_interval=globals.LOG_FLUSH_INTERVAL_MS):
         """Create text area and scrollbars."""
+        self.__max_lines = max_lines
+        self.__flush_interval = flush_interval
+        self.__lines_num = 0  # number of lines in text area
+        self.__pending = collections.deque()  # entries waiting for flush
+        self.__file_lock = threading.Lock()
+        self.__log_file = None
+        if log_path:
+            self.__log_file = open(log_path, 'a', encoding='utf-8')
+            self.__log_file.write('--- Session started {} ---\n'.format(
+                datetime.datetime.now().isoformat(sep=' ',
+                                                  timespec='seconds')))
+
         logs_frame = tk.Frame(parent_frame)
-        logs_frame.place(anchor='nw', relx=0.5, relwidth=0.5, relheight=1.0)
+        # loss-curve panel (LossWindow) is above the log:
+        logs_frame.place(anchor='nw', relx=0.5, relwidth=0.5,
+                         rely=globals.LOSS_WINDOW_RELHEIGHT,
+                         relheight=1.0 - globals.LOSS_WINDOW_RELHEIGHT)
         logs_frame_inner = tk.Frame(logs_frame)
         logs_frame_inner.pack(expand=True, fill='both',
                               padx=(globals.FRAME_PAD, 2*globals.FRAME_PAD),
-                              pady=(2*globals.FRAME_PAD, 2*globals.FRAME_PAD))
+                              pady=(globals.FRAME_PAD, 2*globals.FRAME_PAD))
         logs_frame['bg'] = globals.BG_COLOR
         logs_frame_inner['bg'] = globals.BG_COLOR
 
@@ -55,6 +80,7 @@ class LogWindow():
         logs_frame_inner.rowconfigure(1, weight=0)
 
         self.__text_widget.tag_config('ERROR', foreground="red")
+        self.__text_widget.after(self.__flush_interval, self.__on_timer)
 
     def add_entry(self, entry, entry_type=EntryType.INFO):
         """Add entry(text) in the end of log.
@@ -62,15 +88,67 @@ class LogWindow():
         Log window will be automatically scrolled down, if required
         """
         assert isinstance(EntryType.INFO, type(entry_type))
-        tags = []
+        tags = ()
         if entry_type is EntryType.ERROR:
-            tags.append('ERROR')
+            tags = ('ERROR',)
+        lines = entry.split('\n')
+        self.__pending.append((lines, tags))
+        if self.__log_file is not None:
+            with self.__file_lock:
+                self.__log_file.write(entry + '\n')
+
+    def __on_timer(self):
+        self.flush()
+        self.__text_widget.after(self.__flush_interval, self.__on_timer)
+
+    def flush(self):
+        """Insert all buffered entries in text area."""
+        batch = []  # [[lines, tags], ...] - adjacent entries with same tags
+        lines_num = 0
+        while self.__pending:
+            lines, tags = self.__pending.popleft()
+            lines_num += len(lines)
+            if batch and batch[-1][1] == tags:
+                batch[-1][0].extend(lines)
+            else:
+                batch.append([list(lines), tags])
+        if not batch:
+            return
+        if self.__log_file is not None:
+            with self.__file_lock:
+                self.__log_file.flush()
+
+        # lines, that would be trimmed right away, are not inserted:
+        excess = lines_num - self.__max_lines
+        while excess > 0:
+            lines = batch[0][0]
+            if len(lines) <= excess:
+                excess -= len(lines)
+                lines_num -= len(lines)
+                batch.pop(0)
+            else:
+                del lines[:excess]
+                lines_num -= excess
+                excess = 0
 
         self.__text_widget.config(state=tk.NORMAL)
-        self.__text_widget.insert(tk.END, entry + '\n', tags)
+        for lines, tags in batch:
+            self.__text_widget.insert(tk.END, '\n'.join(lines) + '\n', tags)
+        self.__lines_num += lines_num
+        if self.__lines_num > self.__max_lines:
+            trimmed = self.__lines_num - self.__max_lines
+            self.__text_widget.delete('1.0', '{}.0'.format(trimmed + 1))
+            self.__lines_num = self.__max_lines
         self.__text_widget.config(state=tk.DISABLED)
         self.__text_widget.yview_moveto(1.0)
 
+    def close(self):
+        """Close file with full log."""
+        if self.__log_file is not None:
+            with self.__file_lock:
+                self.__log_file.close()
+                self.__log_file = None
+
     def log_err(self, entry):
         """Just for brewity."""
         self.add_entry(entry, EntryType.ERROR)
@@ -80,7 +158,9 @@ class LogWindow():
 
         Previous content will be removed
         """
+        self.__pending.clear()
         self.__text_widget.config(state=tk.NORMAL)
-        self.__text_widget.delete('0.1', tk.END)
+        self.__text_widget.delete('1.0', tk.END)
         self.__text_widget.config(state=tk.DISABLED)
+        self.__lines_num = 0
         self.add_entry(content, EntryType.INFO)
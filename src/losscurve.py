@@ -0,0 +1,70 @@
+"""Module for DecimatedSeries-class."""
+
+import threading
+
+
+class DecimatedSeries():
+    """Series of (x, y) points with bounded memory, for plotting.
+
+    Points are grouped into buckets of equal number of consecutive points,
+    each bucket keeps only range of x and min and max of y (min/max
+    decimation keeps spikes visible). When number of buckets exceeds
+    max_buckets, neighbouring buckets are merged and bucket becomes twice
+    larger. So adding of point costs O(1) on average, and any number of
+    points is drawn by at most max_buckets vertical segments.
+    Points may be added from any thread.
+    """
+
+    def __init__(self, max_buckets=512):
+        """Create empty series."""
+        assert max_buckets >= 2
+        self.__max_buckets = max_buckets
+        self.__lock = threading.Lock()
+        self.clear()
+
+    def clear(self):
+        """Remove all points."""
+        with self.__lock:
+            self.__buckets = []  # [first x, last x, min y, max y]
+            self.__bucket_size = 1  # number of points in full bucket
+            self.__last_count = 0  # number of points in the last bucket
+            self.__version = 0
+
+    def add(self, x, y):
+        """Add point, x must increase."""
+        with self.__lock:
+            if self.__buckets and self.__last_count < self.__bucket_size:
+                bucket = self.__buckets[-1]
+                bucket[1] = x
+                bucket[2] = min(bucket[2], y)
+                bucket[3] = max(bucket[3], y)
+                self.__last_count += 1
+            else:
+                self.__buckets.append([x, x, y, y])
+                self.__last_count = 1
+                if len(self.__buckets) > self.__max_buckets:
+                    self.__merge()
+            self.__version += 1
+
+    def get_version(self):
+        """Return counter of changes (to find out if redrawing is needed)."""
+        return self.__version
+
+    def get_buckets(self):
+        """Return copy of buckets - list of [first x, last x, min y, max y]."""
+        with self.__lock:
+            return [list(bucket) for bucket in self.__buckets]
+
+    def __merge(self):
+        """Merge pairs of buckets (the last one may stay alone)."""
+        buckets = self.__buckets
+        merged = []
+        for n in range(0, len(buckets) - 1, 2):
+            a, b = buckets[n], buckets[n+1]
+            merged.append([a[0], b[1], min(a[2], b[2]), max(a[3], b[3])])
+        if len(buckets) % 2:
+            merged.append(buckets[-1])
+        else:  # the last bucket is merged with full one
+            self.__last_count += self.__bucket_size
+        self.__bucket_size *= 2
+        self.__buckets = merged
@@ -0,0 +1,132 @@
+"""Module for LossWindow-class."""
+
+import math
+import globals
+import tkinter as tk
+from losscurve import DecimatedSeries
+
+
+class LossWindow():
+    """This class incapsulates logic for live plot of loss curves.
+
+    Losses of training and validation are added from any thread (for
+    instance, from training thread) into DecimatedSeries. Window redraws
+    curves by timer with fixed frame rate and only if they were changed,
+    so adding of losses costs almost nothing for training loop. Infinite
+    and NaN losses (of diverging training) are not drawn. Each curve
+    is one canvas polyline through min/max of its buckets, so number of
+    canvas items doesn't depend on number of iterations. Y-axis is
+    logarithmic, if all losses are positive.
+    """
+
+    MARGIN = 40  # space for labels of axes
+    COLORS = {'train': 'blue', 'validation': 'orange'}
+
+    def __init__(self, parent_frame,
+                 frame_interval=globals.LOSS_FRAME_INTERVAL_MS,
+                 max_buckets=globals.LOSS_MAX_BUCKETS):
+        """Create canvas and start timer of redrawing."""
+        loss_frame = tk.Frame(parent_frame)
+        loss_frame.place(anchor='nw', relx=0.5, relwidth=0.5,
+                         relheight=globals.LOSS_WINDOW_RELHEIGHT)
+        loss_frame_inner = tk.Frame(loss_frame)
+        loss_frame_inner.pack(expand=True, fill='both',
+                              padx=(globals.FRAME_PAD, 2*globals.FRAME_PAD),
+                              pady=(2*globals.FRAME_PAD, globals.FRAME_PAD))
+        loss_frame['bg'] = globals.BG_COLOR
+        loss_frame_inner['bg'] = globals.BG_COLOR
+
+        self.__canvas = tk.Canvas(loss_frame_inner)
+        self.__canvas['bg'] = 'white'
+        self.__canvas['highlightthickness'] = 0
+        self.__canvas.place(anchor='nw', relwidth=1.0, relheight=1.0)
+
+        self.__series = {name: DecimatedSeries(max_buckets)
+                         for name in self.COLORS}
+        self.__drawn_versions = None
+        self.__frame_interval = frame_interval
+        self.__canvas.bind('<Configure>', lambda e: self.__redraw())
+        self.__canvas.after(frame_interval, self.__on_timer)
+
+    def reset(self):
+        """Remove all curves (before new training)."""
+        for series in self.__series.values():
+            series.clear()
+
+    def add_train_loss(self, iteration, loss):
+        """Add loss on train data (may be called from any thread)."""
+        if math.isfinite(loss):
+            self.__series['train'].add(iteration, loss)
+
+    def add_validation_loss(self, iteration, loss):
+        """Add loss on validation data (may be called from any thread)."""
+        if math.isfinite(loss):
+            self.__series['validation'].add(iteration, loss)
+
+    def __on_timer(self):
+        try:
+            versions = [series.get_version()
+                        for series in self.__series.values()]
+            if versions != self.__drawn_versions:
+                self.__redraw()
+        finally:
+            # plot must be updated after any error:
+            self.__canvas.after(self.__frame_interval, self.__on_timer)
+
+    def __redraw(self):
+        """Recreate all items of plot."""
+        self.__drawn_versions = [series.get_version()
+                                 for series in self.__series.values()]
+        self.__canvas.delete('all')
+        width = self.__canvas.winfo_width()
+        height = self.__canvas.winfo_height()
+        m = self.MARGIN
+        if width <= 2 * m or height <= 2 * m:
+            return
+        buckets = {name: series.get_buckets()
+                   for name, series in self.__series.items()}
+        all_buckets = [b for name in buckets for b in buckets[name]]
+        if not all_buckets:
+            return
+        x_min = min(b[0] for b in all_buckets)
+        x_max = max(max(b[1] for b in all_buckets), x_min + 1)
+        y_min = min(b[2] for b in all_buckets)
+        y_max = max(b[3] for b in all_buckets)
+        log_scale = y_min > 0.0
+        if log_scale:
+            y_min, y_max = math.log10(y_min), math.log10(y_max)
+        if y_max - y_min < 1e-12:
+            y_min, y_max = y_min - 1.0, y_max + 1.0
+
+        def sx(x):
+            return m + (width - 2 * m) * (x - x_min) / (x_max - x_min)
+
+        def sy(y):
+            if log_scale:
+                y = math.log10(y)
+            return height - m - (height - 2 * m) * (y - y_min) / (
+                y_max - y_min)
+
+        self.__canvas.create_rectangle(m, m, width - m, height - m,
+                                       outline='gray')
+        for name, series_buckets in buckets.items():
+            coords = []
+            for first_x, last_x, low, high in series_buckets:
+                x = sx(0.5 * (first_x + last_x))
+                coords += [x, sy(high), x, sy(low)]
+            if coords:
+                self.__canvas.create_line(*coords, fill=self.COLORS[name])
+        y_label = '{:.3g}'
+        bottom, top = y_min, y_max
+        if log_scale:
+            bottom, top = 10**y_min, 10**y_max
+        self.__canvas.create_text(m - 2, m, anchor='ne',
+                                  text=y_label.format(top))
+        self.__canvas.create_text(m - 2, height - m, anchor='se',
+                                  text=y_label.format(bottom))
+        self.__canvas.create_text(width - m, height - m + 2, anchor='ne',
+                                  text='iteration {}'.format(x_max))
+        legend_y = m / 2
+        for n, [name, color] in enumerate(self.COLORS.items()):
+            self.__canvas.create_text(m + 100 * n, legend_y, anchor='w',
+                                      text=name + ' loss', fill=color)
@@ -1,57 +1,150 @@
 """Main module for perceptron_1.
 
-This module consists all logic of top level
+This module consists all logic of top level.
+
+Only GUI modules are imported at start. Data and network subsystems
+(and numpy) are imported in background after the window appears, or on
+first use if they are required earlier.
 """
 
+import random
+import threading
 import tkinter as tk
-import numpy
+import globals
+from network import tracing
 from graphwindow import GraphWindow
 from logwindow import LogWindow, EntryType
+from losswindow import LossWindow
 from controlsmanager import ControlsManager
-import dataloadingutil
-from network.neuralnetwork import NeuralNetwork
+from backgroundloader import BackgroundLoader
 
+LINE_POINTS_NUM = 40  # number of points for drawing of network output
 
-def __load_points(controls, graph, log):
-    path = controls.get_data_path()
-    error, data = dataloadingutil.load_train_data(path)
+
+def __preload_subsystems():
+    """Import subsystems, that are not required for the window."""
+    import dataloadingutil  # noqa: F401
+    import network.neuralnetwork  # noqa: F401
+
+
+def __show_points(error, data, graph, log):
+    """Show loaded train data. Returns True if data is valid."""
     if error:
         log.log_err(error)
-        return error, data
-    else:
-        graph.set_points(data)
-        graph.set_line([])
-        log.add_entry('Train data was successfully loaded ' +
-                      '(number of points: ' + str(len(data)) + ')')
-        return error, data
+        return False
+    graph.set_points(data)
+    graph.set_line([])
+    log.add_entry('Train data was successfully loaded ' +
+                  '(number of points: ' + str(len(data)) + ')')
+    return True
 
 
-def __launch(controls, graph, log):
-    data_error, data = __load_points(controls, graph, log)
-    if data_error:
-        return  # error already logged
+def __load_points(controls, graph, log, loader):
+    import dataloadingutil
+    path = controls.get_data_path()
 
-    config_path = controls.get_configuration_path()
-    config_error, config = dataloadingutil.load_configuration(config_path)
-    if config_error:
-        log.log_err(config_error)
-        return
+    def on_done(results):
+        error, data = results[0]
+        __show_points(error, data, graph, log)
+
+    loader.load([[dataloadingutil.load_train_data, [path]]], on_done)
 
-    net = NeuralNetwork(config)
-    train_report = net.train(data)  # not implemented
-    log.add_entry(train_report)
 
-    x_arr = numpy.linspace(-1.0, 1.0, 40)
-    line_res = []
-    for x in x_arr:
-        y = net.process([x])[0]
-        line_res.append([x, y])
-    log.add_entry('Network was successfully trained.')
-    graph.set_line(line_res)
+def __launch(controls, graph, log, losses, loader):
+    import dataloadingutil
+    data_path = controls.get_data_path()
+    config_path = controls.get_configuration_path()
+
+    def on_done(results):
+        [data_error, data], [config_error, config] = results
+        with tracing.span('show points', 'gui'):
+            valid = __show_points(data_error, data, graph, log)
+        if not valid:
+            return
+        if config_error:
+            log.log_err(config_error)
+            return
+        from network import sparse
+        if sparse.is_sparse(config):
+            log.log_err('Network with sparse layers (Connectivity) can be '
+                        'trained only by cli.py')
+            return
+        __train(data, config, graph, log, losses, loader)
+
+    # data and configuration are loaded in parallel:
+    loader.load([[dataloadingutil.load_train_data, [data_path]],
+                 [dataloadingutil.load_configuration, [config_path]]],
+                on_done)
+
+
+def __split_validation(data):
+    """Return train and validation parts of data (see VALIDATION_SHARE)."""
+    indices = list(range(len(data)))
+    random.Random(0).shuffle(indices)
+    validation_num = int(len(data) * globals.VALIDATION_SHARE)
+    if validation_num == 0 or validation_num == len(data):
+        return data, []
+    return ([data[n] for n in indices[validation_num:]],
+            [data[n] for n in indices[:validation_num]])
+
+
+def __train_network(data, config, losses, progress=None,
+                    cancel_event=None):
+    """Train network in background thread.
+
+    Returns [net, report, cancelled], cancelled is True if training was
+    stopped by cancel_event. Losses are shown by LossWindow during training.
+    """
+    from network.neuralnetwork import NeuralNetwork
+    MAX_ITER_NUM = 50000
+    train_data, validation_data = __split_validation(data)
+    with tracing.span('construct network', 'network'):
+        net = NeuralNetwork(config)
+    cancelled = [False]
+
+    def on_iteration(iteration, train_loss, validation_loss):
+        losses.add_train_loss(iteration, train_loss)
+        if validation_loss is not None:
+            losses.add_validation_loss(iteration, validation_loss)
+        progress(iteration / MAX_ITER_NUM)
+        cancelled[0] = cancel_event.is_set()
+        return cancelled[0]
+
+    with tracing.span('train', 'training'):
+        report = net.train(train_data, max_iter_num=MAX_ITER_NUM,
+                           progress=on_iteration,
+                           validation_data=validation_data)
+    return net, report, cancelled[0]
+
+
+def __train(data, config, graph, log, losses, loader):
+    def on_done(results):
+        net, train_report, cancelled = results[0]
+        with tracing.span('log report', 'gui'):
+            log.add_entry(train_report)
+
+        step = 2.0 / (LINE_POINTS_NUM - 1)
+        x_arr = [-1.0 + n * step for n in range(LINE_POINTS_NUM)]
+        line_res = []
+        for x in x_arr:
+            y = net.process([x])[0]
+            line_res.append([x, y])
+        if cancelled:
+            log.add_entry('Training was cancelled.')
+        else:
+            log.add_entry('Network was successfully trained.')
+        with tracing.span('draw line', 'gui'):
+            graph.set_line(line_res)
+
+    losses.reset()
+    loader.load([[__train_network, [data, config, losses]]], on_done,
+                'Training')
 
 
 def main():
     """Start application."""
+    if globals.TRACE_PATH is not None:
+        tracing.start(globals.TRACE_STRIDE)
     root = tk.Tk()
 
     root.wm_iconbitmap('src/images/window.ico')
@@ -61,15 +154,24 @@ def main():
 
     graph = GraphWindow(root)
     log = LogWindow(root)
+    losses = LossWindow(root)
     controls = ControlsManager(root)
+    loader = BackgroundLoader(root, controls, log.log_err)
 
     controls.set_load_button_callback(
-        lambda: __load_points(controls, graph, log))
+        lambda: __load_points(controls, graph, log, loader))
 
     controls.set_launch_button_callback(
-        lambda: __launch(controls, graph, log))
+        lambda: __launch(controls, graph, log, losses, loader))
 
+    root.after_idle(lambda: threading.Thread(
+        target=__preload_subsystems, daemon=True).start())
     root.mainloop()
+    loader.shutdown()
+    log.close()
+    tracer = tracing.stop()
+    if tracer is not None:
+        tracer.save(globals.TRACE_PATH)
 
 
 if __name__ == '__main__':
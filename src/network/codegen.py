@@ -0,0 +1,273 @@
+"""Generation of specialized kernels for certain network configuration.
+
+Generic code of NeuralNetwork works with any configuration, so it spends
+most of time on index lookups and dispatch of activation functions. For
+fixed configuration (numbers of units and activation functions) this
+module generates source code of two functions:
+- forward(w, x) - returns output of network (list) for input x;
+- gradient(w, x, t) - returns gradient of error function for sample [x, t]
+  as flat sequence in order of WeightStructure.
+w - flat array of weights (WeightStructure.get_values()).
+
+For small networks code is fully unrolled: each unit and each weight is a
+separate local variable, calculations are done with Python floats. For
+large networks code is layer-fused: each layer is one numpy expression
+(matmul, bias and activation) with all offsets and shapes baked in.
+
+Generated kernels are cached in memory by hash of configuration. If
+cache directory is given, compiled kernels are also kept there (like .pyc
+files), so other processes load them without generation and compilation.
+Such file has a header with magic number of Python version, hash of
+configuration and SHA-256 of content, it's used only if all of them match,
+otherwise kernels are generated again and the file is rewritten. Source
+is kept near as python module, so tracebacks and profilers show real
+lines of kernels. Cache directory must be writable only by its owner,
+because code from it is executed.
+"""
+
+import hashlib
+import importlib.util
+import json
+import marshal
+import math
+import os
+import pathlib
+import tempfile
+import threading
+import numpy
+
+CODEGEN_VERSION = 2  # must be changed with any change of generated code
+# Networks with not more weights than this are unrolled:
+UNROLL_MAX_WEIGHTS = 256
+
+_kernels_cache = {}
+_cache_lock = threading.Lock()
+
+_SCALAR_AFUNCS = {'tanh': 'tanh({})',
+                  'sigmoid': '1.0 / (1.0 + exp(-{}))',
+                  'linear': '{}'}
+_SCALAR_AFUNC_DERIVS = {'tanh': '(1.0 - {0} * {0})',
+                        'sigmoid': '{0} * (1.0 - {0})',
+                        'linear': '1.0'}
+_VECTOR_AFUNCS = {'tanh': 'numpy.tanh({})',
+                  'sigmoid': '1.0 / (1.0 + numpy.exp(-{}))',
+                  'linear': '{}'}
+_VECTOR_AFUNC_DERIVS = {'tanh': '(1.0 - {0} * {0})',
+                        'sigmoid': '{0} * (1.0 - {0})',
+                        'linear': '1.0'}
+
+
+class Kernels():
+    """Compiled forward and gradient functions for one configuration."""
+
+    def __init__(self, key, source, unrolled, filename='<kernels>',
+                 code=None):
+        """Compile source of kernels, if code isn't given."""
+        if code is None:
+            code = compile(source, filename, 'exec')
+        namespace = {'tanh': math.tanh, 'exp': math.exp, 'numpy': numpy}
+        exec(code, namespace)
+        self.key = key
+        self.source = source
+        self.unrolled = unrolled
+        self.code = code
+        self.forward = namespace['forward']
+        self.gradient = namespace['gradient']
+
+
+def get_configuration_key(configuration, unrolled):
+    """Return hash of everything that defines generated code."""
+    description = {'version': CODEGEN_VERSION,
+                   'inputs': configuration['NumberOfInputUnits'],
+                   'layers': [[info['NumberOfUnits'],
+                               info['ActivationFunction']]
+                              for info in configuration['LayersInfo']],
+                   'precision': configuration.get('Precision', 'float64'),
+                   'unrolled': unrolled}
+    text = json.dumps(description, sort_keys=True)
+    return hashlib.sha256(text.encode('utf-8')).hexdigest()[:32]
+
+
+def get_kernels(configuration, cache_dir=None, unrolled=None):
+    """Return Kernels for configuration, generate them if required.
+
+    unrolled - type of code (see module description), if it's None, type
+    is chosen by number of weights.
+    """
+    layers, offsets = __get_layout(configuration)
+    if unrolled is None:
+        unrolled = offsets[-1] <= UNROLL_MAX_WEIGHTS
+    key = get_configuration_key(configuration, unrolled)
+    path = None
+    if cache_dir is not None:
+        path = pathlib.Path(cache_dir) / 'kernels_{}.bin'.format(key)
+    with _cache_lock:
+        kernels = _kernels_cache.get(key)
+    save = path is not None and (kernels is None or not path.is_file())
+    if kernels is None and path is not None:
+        kernels = __load(path, key, unrolled)
+        save = kernels is None  # absent or wrong file is rewritten
+
+    if kernels is None:
+        afunc_names = [None]
+        afunc_names += [info['ActivationFunction']
+                        for info in configuration['LayersInfo']]
+        if unrolled:
+            source = __generate_unrolled(layers, offsets, afunc_names)
+        else:
+            source = __generate_fused(layers, offsets, afunc_names)
+        filename = '<kernels>'
+        if path is not None:
+            filename = str(path.with_suffix('.py'))
+        kernels = Kernels(key, source, unrolled, filename)
+    with _cache_lock:
+        kernels = _kernels_cache.setdefault(key, kernels)
+    if save:
+        __save(path, kernels)
+    return kernels
+
+
+def __get_header(key, content):
+    """Return header of file with compiled kernels."""
+    return (importlib.util.MAGIC_NUMBER + key.encode('ascii') +
+            hashlib.sha256(content).digest())
+
+
+def __load(path, key, unrolled):
+    """Return Kernels from file or None, if file is absent or wrong."""
+    try:
+        data = path.read_bytes()
+    except OSError:
+        return None
+    header_size = len(__get_header(key, b''))
+    content = data[header_size:]
+    if data[:header_size] != __get_header(key, content):
+        return None
+    try:
+        source, code = marshal.loads(content)
+    except (EOFError, ValueError, TypeError):
+        return None
+    return Kernels(key, source, unrolled, code=code)
+
+
+def __save(path, kernels):
+    """Save compiled kernels to path and their source near."""
+    content = marshal.dumps([kernels.source, kernels.code])
+    __write_atomically(path.with_suffix('.py'),
+                       kernels.source.encode('utf-8'))
+    __write_atomically(path, __get_header(kernels.key, content) + content)
+
+
+def __write_atomically(path, data):
+    """Write data to path, other processes never see partial file."""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with tempfile.NamedTemporaryFile('wb', dir=path.parent,
+                                     prefix=path.stem, suffix='.tmp',
+                                     delete=False) as f:
+        f.write(data)
+    try:
+        os.replace(f.name, path)
+    except OSError:
+        os.remove(f.name)
+        raise
+
+
+def __get_layout(configuration):
+    """Return numbers of units on layers and offsets of layers weights.
+
+    The same layout as in WeightStructure.
+    """
+    layers = [configuration['NumberOfInputUnits']]
+    layers += [info['NumberOfUnits'] for info in configuration['LayersInfo']]
+    offsets = [0, 0]
+    for i in range(1, len(layers)):
+        offsets.append(offsets[-1] + layers[i] * (layers[i-1] + 1))
+    return layers, offsets
+
+
+def __generate_unrolled(layers, offsets, afunc_names):
+    N = len(layers) - 1
+
+    def w(i, j, g): return 'w[{}]'.format(
+        offsets[i] + (j - 1) * (layers[i-1] + 1) + g)
+
+    def z(i, j): return 'z_{}_{}'.format(i, j)
+
+    def b(i, j): return 'b_{}_{}'.format(i, j)
+
+    forward = []
+    for j in range(1, layers[0] + 1):
+        forward.append('{} = x[{}]'.format(z(0, j), j - 1))
+    for i in range(1, N + 1):
+        for j in range(1, layers[i] + 1):
+            terms = [w(i, j, 0)]
+            for g in range(1, layers[i-1] + 1):
+                terms.append('{} * {}'.format(w(i, j, g), z(i-1, g)))
+            a = '(' + ' + '.join(terms) + ')'
+            forward.append('{} = {}'.format(
+                z(i, j), _SCALAR_AFUNCS[afunc_names[i]].format(a)))
+
+    lines = ['def forward(w, x):', '    w = w.tolist()']
+    lines += ['    ' + line for line in forward]
+    outputs = [z(N, k) for k in range(1, layers[N] + 1)]
+    lines.append('    return [{}]'.format(', '.join(outputs)))
+    lines.append('')
+    lines.append('')
+
+    lines += ['def gradient(w, x, t):', '    w = w.tolist()']
+    lines += ['    ' + line for line in forward]
+    for k in range(1, layers[N] + 1):
+        deriv = _SCALAR_AFUNC_DERIVS[afunc_names[N]].format(z(N, k))
+        lines.append('    {} = ({} - t[{}]) * {}'.format(
+            b(N, k), z(N, k), k - 1, deriv))
+    for i in range(N - 1, 0, -1):
+        for j in range(1, layers[i] + 1):
+            terms = ['{} * {}'.format(w(i+1, q, j), b(i+1, q))
+                     for q in range(1, layers[i+1] + 1)]
+            deriv = _SCALAR_AFUNC_DERIVS[afunc_names[i]].format(z(i, j))
+            lines.append('    {} = {} * ({})'.format(
+                b(i, j), deriv, ' + '.join(terms)))
+    derivs = []
+    for i in range(1, N + 1):
+        for j in range(1, layers[i] + 1):
+            derivs.append(b(i, j))
+            for g in range(1, layers[i-1] + 1):
+                derivs.append('{} * {}'.format(b(i, j), z(i-1, g)))
+    lines.append('    return [{}]'.format(',\n            '.join(derivs)))
+    return '\n'.join(lines) + '\n'
+
+
+def __generate_fused(layers, offsets, afunc_names):
+    N = len(layers) - 1
+    lines = ['def forward(w, x):',
+             '    z_0 = numpy.asarray(x, dtype=w.dtype)']
+    body = []
+    for i in range(1, N + 1):
+        body.append('M_{0} = w[{1}:{2}].reshape({3}, {4})'.format(
+            i, offsets[i], offsets[i+1], layers[i], layers[i-1] + 1))
+        a = '(numpy.dot(M_{0}[:, 1:], z_{1}) + M_{0}[:, 0])'.format(i, i-1)
+        body.append('z_{} = {}'.format(
+            i, _VECTOR_AFUNCS[afunc_names[i]].format(a)))
+    lines += ['    ' + line for line in body]
+    lines.append('    return z_{}.tolist()'.format(N))
+    lines.append('')
+    lines.append('')
+
+    lines += ['def gradient(w, x, t):',
+              '    z_0 = numpy.asarray(x, dtype=w.dtype)']
+    lines += ['    ' + line for line in body]
+    lines.append('    grad = numpy.empty_like(w)')
+    lines.append('    b = (z_{0} - numpy.asarray(t)) * {1}'.format(
+        N, _VECTOR_AFUNC_DERIVS[afunc_names[N]].format('z_{}'.format(N))))
+    for i in range(N, 0, -1):
+        lines.append('    G = grad[{}:{}].reshape({}, {})'.format(
+            offsets[i], offsets[i+1], layers[i], layers[i-1] + 1))
+        lines.append('    G[:, 0] = b')
+        lines.append('    G[:, 1:] = numpy.outer(b, z_{})'.format(i-1))
+        if i > 1:
+            deriv = _VECTOR_AFUNC_DERIVS[afunc_names[i-1]].format(
+                'z_{}'.format(i-1))
+            lines.append('    b = numpy.dot(b, M_{}[:, 1:]) * {}'.format(
+                i, deriv))
+    lines.append('    return grad')
+    return '\n'.join(lines) + '\n'
@@ -0,0 +1,198 @@
+"""Compression of trained networks: pruning and int8 quantization.
+
+Compression is performed in several stages:
+1. prune - weights of connections with the smallest magnitude are set to
+   zero (separately on each layer, biases are not pruned). Pruned network
+   may be fine-tuned by fine_tune, which trains it by SGD with masks, so
+   pruned weights stay equal to zero on each iteration.
+2. shrink - hidden units which don't influence output (all outgoing
+   weights are zero) are removed, and units with constant value (all
+   incoming weights are zero) are folded into biases of next layer. So
+   pruning really decreases the amount of calculations.
+3. quantize - weights of each layer are converted to int8 with one scale
+   per layer: w = q * scale, scale = max|w| / 127. Biases stay float32.
+   QuantizedNetwork keeps int8 weights (model size is 8 times less than
+   float64) and calculates in float32.
+compare gives errors of original and compressed networks on held-out set.
+"""
+
+import copy
+import json
+import numpy
+from . import layermath as lm
+from .neuralnetwork import NeuralNetwork
+
+INT8_MAX = 127
+
+
+def prune(net, sparsity):
+    """Set to zero share sparsity of weights with the smallest magnitude.
+
+    Returns masks - list of bool matrices (True - weight is kept) for each
+    layer, element with index 0 is None.
+    """
+    assert 0.0 <= sparsity < 1.0
+    masks = [None]
+    for M in net.get_weights().get_layer_matrices()[1:]:
+        magnitudes = numpy.abs(M[:, 1:])
+        pruned_num = int(magnitudes.size * sparsity)
+        kept = numpy.ones(magnitudes.size, dtype=bool)
+        order = numpy.argsort(magnitudes, axis=None, kind='stable')
+        kept[order[:pruned_num]] = False
+        mask = numpy.ones(M.shape, dtype=bool)
+        mask[:, 1:] = kept.reshape(magnitudes.shape)
+        masks.append(mask)
+    apply_masks(net, masks)
+    return masks
+
+
+def apply_masks(net, masks):
+    """Set to zero weights which are not kept by masks."""
+    W = net.get_weights()
+    for M, mask in zip(W.get_layer_matrices()[1:], masks[1:]):
+        M[~mask] = 0.0
+    W.mark_changed()
+
+
+def fine_tune(net, masks, train_data, max_iter_num=2000, **train_args):
+    """Train pruned network, keeping pruned weights equal to zero.
+
+    train_args are passed to NeuralNetwork.train. Returns report.
+    """
+    return net.train(train_data, max_iter_num=max_iter_num, masks=masks,
+                     **train_args)
+
+
+def shrink(net):
+    """Return new network without useless hidden units (see above)."""
+    config = copy.deepcopy(net.get_configure())
+    names = lm.get_afunc_names(config)
+    matrices = [None] + [M.astype(numpy.float64) for M in
+                         net.get_weights().get_layer_matrices()[1:]]
+    changed = True
+    while changed:  # removal of units may make other units useless
+        changed = False
+        for i in range(1, len(matrices) - 1):
+            M, M_next = matrices[i], matrices[i+1]
+            # units with constant value are folded into biases of next
+            # layer:
+            constant = ~M[:, 1:].any(axis=1)
+            z = lm.AFUNCS[names[i]](M[constant, 0])
+            M_next[:, 0] += numpy.dot(M_next[:, 1:][:, constant], z)
+            # units without outgoing connections are useless as well:
+            keep = ~constant & M_next[:, 1:].any(axis=0)
+            if not keep.any():
+                keep[0] = True  # layer can't be empty
+                M[0] = 0.0
+                M_next[:, 1] = 0.0
+            if keep.all():
+                continue
+            changed = True
+            matrices[i] = M[keep]
+            matrices[i+1] = M_next[:, numpy.concatenate([[True], keep])]
+            config['LayersInfo'][i-1]['NumberOfUnits'] = int(keep.sum())
+    shrunk = NeuralNetwork(config)
+    W = shrunk.get_weights()
+    for M, M_new in zip(W.get_layer_matrices()[1:], matrices[1:]):
+        M[:] = M_new
+    W.mark_changed()
+    return shrunk
+
+
+class QuantizedNetwork():
+    """Network with int8 weights and per-layer scales."""
+
+    def __init__(self, configuration, weights, scales, biases):
+        """Create network from int8 matrices [j-1][g-1] and float biases."""
+        self.__configuration = copy.deepcopy(configuration)
+        self.__afunc_names = lm.get_afunc_names(configuration)
+        self.__weights = [None] + [numpy.asarray(Q, dtype=numpy.int8)
+                                   for Q in weights[1:]]
+        self.__scales = [None] + [float(s) for s in scales[1:]]
+        self.__biases = [None] + [numpy.asarray(b, dtype=numpy.float32)
+                                  for b in biases[1:]]
+        # int8 is expanded to float32 once, transposed for matmul:
+        self.__compute_matrices = [None] + [
+            numpy.ascontiguousarray(Q.T, dtype=numpy.float32)
+            for Q in self.__weights[1:]]
+
+    def process_batch(self, X):
+        """Return outputs [n][k] for batch of inputs X [n][k]."""
+        Z = numpy.asarray(X, dtype=numpy.float32)
+        for i in range(1, len(self.__weights)):
+            A = numpy.matmul(Z, self.__compute_matrices[i])
+            A *= numpy.float32(self.__scales[i])
+            A += self.__biases[i]
+            Z = lm.AFUNCS[self.__afunc_names[i]](A)
+        return Z
+
+    def process(self, x):
+        """Return output (list) for one input x (list)."""
+        return self.process_batch([x])[0].tolist()
+
+    def get_configure(self):
+        """Return configuration of network."""
+        return self.__configuration
+
+    def get_size(self):
+        """Return size of weights, scales and biases in bytes."""
+        size = 0
+        for i in range(1, len(self.__weights)):
+            size += self.__weights[i].nbytes + self.__biases[i].nbytes + 4
+        return size
+
+    def save(self, path):
+        """Save network to file (numpy .npz format)."""
+        arrays = {}
+        for i in range(1, len(self.__weights)):
+            arrays['weights_{}'.format(i)] = self.__weights[i]
+            arrays['bias_{}'.format(i)] = self.__biases[i]
+        with open(path, 'wb') as f:
+            numpy.savez(f, scales=numpy.array(self.__scales[1:]),
+                        configuration=json.dumps(self.__configuration),
+                        **arrays)
+
+
+def quantize(net):
+    """Return QuantizedNetwork for network."""
+    weights, scales, biases = [None], [None], [None]
+    for M in net.get_weights().get_layer_matrices()[1:]:
+        M = M.astype(numpy.float64)
+        max_abs = numpy.abs(M[:, 1:]).max()
+        scale = max_abs / INT8_MAX if max_abs > 0.0 else 1.0
+        Q = numpy.clip(numpy.rint(M[:, 1:] / scale), -INT8_MAX, INT8_MAX)
+        weights.append(Q.astype(numpy.int8))
+        scales.append(scale)
+        biases.append(M[:, 0])
+    return QuantizedNetwork(net.get_configure(), weights, scales, biases)
+
+
+def load_quantized(path):
+    """Load QuantizedNetwork saved by QuantizedNetwork.save."""
+    with numpy.load(path) as data:
+        configuration = json.loads(str(data['configuration']))
+        layers_num = len(configuration['LayersInfo'])
+        weights = [None] + [data['weights_{}'.format(i)]
+                            for i in range(1, layers_num + 1)]
+        biases = [None] + [data['bias_{}'.format(i)]
+                           for i in range(1, layers_num + 1)]
+        scales = [None] + data['scales'].tolist()
+    return QuantizedNetwork(configuration, weights, scales, biases)
+
+
+def compare(original, compressed, held_out_data):
+    """Compare networks on held-out data [[f,...],...].
+
+    Returns dict with mean squared errors of both networks, their
+    difference and max difference of outputs.
+    """
+    inputs_num = original.get_configure()['NumberOfInputUnits']
+    X, T = lm.split_samples(held_out_data, inputs_num)
+    Y_orig = numpy.asarray(original.process_batch(X), dtype=numpy.float64)
+    Y_comp = numpy.asarray(compressed.process_batch(X), dtype=numpy.float64)
+    orig_error = float(numpy.mean((Y_orig - T)**2))
+    comp_error = float(numpy.mean((Y_comp - T)**2))
+    return {'original_error': orig_error,
+            'compressed_error': comp_error,
+            'error_delta': comp_error - orig_error,
+            'max_output_delta': float(numpy.abs(Y_comp - Y_orig).max())}
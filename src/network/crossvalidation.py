@@ -0,0 +1,127 @@
+"""Parallel k-fold cross-validation.
+
+Samples are shuffled once and placed into multiprocessing.shared_memory
+buffer, after that folds are contiguous ranges of the buffer. Worker
+processes attach the buffer read-only, so data are not copied to each of
+them. Each fold is trained by separate task of process pool: network is
+created from configuration, trained on all other folds by
+NeuralNetwork.train and evaluated on its fold. Other folds are given to
+train as array of indices (sample_indices), mini-batches are gathered
+from the shared buffer, so train part isn't copied.
+
+Errors are given per sample (error function of NeuralNetwork divided by
+number of samples), so folds of different size may be compared.
+"""
+
+import math
+import multiprocessing
+from multiprocessing import shared_memory
+import time
+import numpy
+from . import layermath as lm
+from . import weightstructure as ws
+
+# State of worker process, filled by _init_worker:
+_worker = {}
+
+
+def cross_validate(configuration, train_data, folds=5, workers=None,
+                   seed=None, **train_args):
+    """Train and evaluate configuration on folds in parallel.
+
+    train_data must have format [[f,...], ...], train_args are passed to
+    NeuralNetwork.train. seed defines division into folds and, if
+    train_args has no seed, order of samples in training. Reports of
+    training aren't used, so they are short by default (full_report is
+    False). Returns dict with keys 'folds' (list of dicts with results of
+    each fold), 'mean_validation_error', 'std_validation_error' and 'time'
+    (seconds).
+    """
+    begin_time = time.perf_counter()
+    train_args.setdefault('seed', seed)
+    train_args.setdefault('full_report', False)
+    dtype = ws.get_dtype(configuration)
+    data = numpy.asarray(train_data, dtype=dtype)
+    assert 2 <= folds <= len(data)
+    if workers is None:
+        workers = multiprocessing.cpu_count()
+    workers = max(1, min(workers, folds))
+    bounds = numpy.linspace(0, len(data), folds + 1).astype(int)
+
+    shm = shared_memory.SharedMemory(create=True, size=data.nbytes)
+    try:
+        shared_data = numpy.ndarray(data.shape, dtype, buffer=shm.buf)
+        permutation = numpy.random.default_rng(seed).permutation(len(data))
+        numpy.take(data, permutation, axis=0, out=shared_data)
+        del shared_data
+        init_args = (configuration, shm.name, data.shape, dtype.str)
+        tasks = [(n, bounds[n], bounds[n+1], train_args)
+                 for n in range(folds)]
+        with multiprocessing.Pool(workers, initializer=_init_worker,
+                                  initargs=init_args) as pool:
+            results = pool.map(_run_fold, tasks)
+            pool.close()
+            pool.join()
+    finally:
+        shm.close()
+        shm.unlink()
+
+    errors = [result['validation_error'] for result in results]
+    mean_error = sum(errors) / len(errors)
+    variance = sum((e - mean_error)**2 for e in errors) / len(errors)
+    return {'folds': results,
+            'mean_validation_error': mean_error,
+            'std_validation_error': math.sqrt(variance),
+            'time': time.perf_counter() - begin_time}
+
+
+def get_report(result):
+    """Return text table with results of cross_validate."""
+    report = 'Fold  Train  Valid  Train error  Valid error  Time, s\n'
+    for fold in result['folds']:
+        report += '{fold:4d} {train_size:6d} {validation_size:6d} ' \
+                  '{train_error:12.6f} {validation_error:12.6f} ' \
+                  '{time:8.2f}\n'.format(**fold)
+    report += 'Validation error: {:.6f} +- {:.6f}\n'.format(
+        result['mean_validation_error'], result['std_validation_error'])
+    report += 'Total time: {:.2f} s\n'.format(result['time'])
+    return report
+
+
+def _init_worker(configuration, d_name, data_shape, dtype):
+    """Attach worker process to shared data."""
+    shm = shared_memory.SharedMemory(name=d_name)
+    data = numpy.ndarray(data_shape, numpy.dtype(dtype), buffer=shm.buf)
+    data.flags.writeable = False
+    _worker['shm'] = shm
+    _worker['config'] = configuration
+    _worker['data'] = data
+
+
+def _run_fold(task):
+    """Train network without fold and evaluate it on the fold."""
+    from .neuralnetwork import NeuralNetwork
+    fold_idx, begin, end, train_args = task
+    begin_time = time.perf_counter()
+    data = _worker['data']
+    train_indices = numpy.concatenate([numpy.arange(begin),
+                                       numpy.arange(end, len(data))])
+    validation_data = data[begin:end]
+
+    net = NeuralNetwork(_worker['config'])
+    net.train(data, sample_indices=train_indices, **train_args)
+    return {'fold': fold_idx,
+            'train_size': len(train_indices),
+            'validation_size': len(validation_data),
+            'train_error': __get_error(net, data, train_indices),
+            'validation_error': __get_error(net, validation_data),
+            'time': time.perf_counter() - begin_time}
+
+
+def __get_error(net, data, indices=None):
+    inputs_num = net.get_configure()['NumberOfInputUnits']
+    matrices = net.get_weights().get_layer_matrices()
+    names = lm.get_afunc_names(net.get_configure())
+    X, T = data[:, :inputs_num], data[:, inputs_num:]
+    samples_num = len(data) if indices is None else len(indices)
+    return lm.error(matrices, names, X, T, indices=indices) / samples_num
@@ -0,0 +1,114 @@
+"""Input pipeline for training: shuffled mini-batches with prefetching.
+
+Samples are visited by epochs: at the beginning of each epoch indices of
+all samples are shuffled once, then they are split into mini-batches, so
+each sample is used exactly once per epoch (sampling without
+replacement). Samples of mini-batch are gathered into contiguous arrays.
+
+Gathering is done by background thread, which prepares next batches while
+current one is used for training. It's important when data are not in
+memory (numpy.memmap or other array-like object with slow reading), but
+even for memory arrays training loop doesn't wait for copying. Indices
+inside of batch are sorted, so reading of memory-mapped file goes forward.
+"""
+
+import queue
+import threading
+import numpy
+
+DEFAULT_PREFETCH = 2  # number of batches prepared in advance
+_END = object()  # marker of the end of data in queue
+
+
+class BatchPipeline():
+    """Iterator over [epoch, X, T] - shuffled mini-batches of samples.
+
+    X and T - arrays [n][...] with inputs and outputs of samples. If
+    indices (array of indices of samples) is given, only these samples are
+    visited, so subset of data is used without copying. If epochs is None,
+    batches are given infinitely, then pipeline must be closed (close or
+    with-statement).
+    """
+
+    def __init__(self, X, T, batch_size=32, epochs=1, seed=None,
+                 prefetch=DEFAULT_PREFETCH, indices=None):
+        """Create pipeline and start background thread."""
+        assert len(X) == len(T) and len(X) > 0
+        assert batch_size > 0 and prefetch > 0
+        if indices is None:
+            indices = numpy.arange(len(X))
+        assert len(indices) > 0
+        self.__X = X
+        self.__T = T
+        self.__indices = numpy.asarray(indices)
+        self.__batch_size = batch_size
+        self.__epochs = epochs
+        self.__rng = numpy.random.default_rng(seed)
+        self.__queue = queue.Queue(prefetch)
+        self.__stop_event = threading.Event()
+        self.__thread = threading.Thread(target=self.__produce, daemon=True)
+        self.__thread.start()
+
+    def __iter__(self):
+        """Return self, batches are given by __next__."""
+        return self
+
+    def __next__(self):
+        """Return next [epoch, X, T], wait if it isn't ready yet."""
+        item = self.__queue.get()
+        if item is _END:
+            self.__queue.put(_END)  # for next calls
+            raise StopIteration
+        if isinstance(item, BaseException):
+            self.__queue.put(_END)
+            raise item
+        return item
+
+    def __enter__(self):
+        """Return self."""
+        return self
+
+    def __exit__(self, *exc_info):
+        """Close pipeline."""
+        self.close()
+
+    def get_batches_per_epoch(self):
+        """Return number of batches in one epoch."""
+        return -(-len(self.__indices) // self.__batch_size)
+
+    def close(self):
+        """Stop background thread."""
+        self.__stop_event.set()
+        while self.__thread.is_alive():
+            try:  # free place in queue, if thread waits for it
+                self.__queue.get_nowait()
+            except queue.Empty:
+                pass
+            self.__thread.join(0.01)
+
+    def __produce(self):
+        epoch = 0
+        try:
+            while self.__epochs is None or epoch < self.__epochs:
+                permutation = self.__rng.permutation(self.__indices)
+                for begin in range(0, len(permutation), self.__batch_size):
+                    indices = numpy.sort(
+                        permutation[begin:begin + self.__batch_size])
+                    batch = [epoch, numpy.take(self.__X, indices, axis=0),
+                             numpy.take(self.__T, indices, axis=0)]
+                    if not self.__put(batch):
+                        return
+                epoch += 1
+            self.__put(_END)
+        except Exception as e:  # error is raised in consumer thread
+            self.__put(e)
+
+    def __put(self, item):
+        """Put item into queue. Returns False if pipeline is closed."""
+        while not self.__stop_event.is_set():
+            try:
+                self.__queue.put(item, timeout=0.05)
+                return True
+            except queue.Full:
+                pass
+        return False
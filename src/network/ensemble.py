@@ -0,0 +1,154 @@
+"""Ensemble of networks with the same topology.
+
+Weights of K members are stored as stacked layer tensors M[i] with shape
+[K][units on layer i][units on layer i-1 + 1] (the same layout of each
+member as in WeightStructure.get_layer_matrix). So inference and training
+of all members are performed by batched numpy operations over all of them
+at once: cost of ensemble is close to cost of one network with K times
+wider layers, instead of K separate networks.
+
+Members differ by initialization (each has its own seed). In training all
+members see the same mini-batches.
+"""
+
+import copy
+import numpy
+from . import datapipeline as dp
+from . import initializers
+from . import layermath as lm
+from . import weightstructure as ws
+
+
+class Ensemble():
+    """K networks of one configuration with stacked weights."""
+
+    def __init__(self, configuration, members_num, seed=None):
+        """Create ensemble, members are initialized by initializers.
+
+        Member k is initialized with seed + k (if seed is given).
+        """
+        assert members_num > 0
+        self.__configuration = copy.deepcopy(configuration)
+        self.__afunc_names = lm.get_afunc_names(configuration)
+        if seed is None:
+            seed = configuration.get('Seed')
+        W = ws.WeightStructure(configuration)
+        self.__tensors = [None] + [
+            numpy.empty((members_num,) + M.shape, dtype=W.get_dtype())
+            for M in W.get_layer_matrices()[1:]]
+        for k in range(members_num):
+            initializers.initialize(
+                W, configuration, None if seed is None else seed + k)
+            self.set_member_weights(k, W)
+
+    @classmethod
+    def from_networks(cls, nets):
+        """Create ensemble from trained networks of the same topology."""
+        ensemble = cls(nets[0].get_configure(), len(nets))
+        for k, net in enumerate(nets):
+            ensemble.set_member_weights(k, net.get_weights())
+        return ensemble
+
+    def get_members_num(self):
+        """Return number of members."""
+        return len(self.__tensors[1])
+
+    def get_configure(self):
+        """Return configuration of members."""
+        return self.__configuration
+
+    def get_layer_tensors(self):
+        """Return stacked weights [K][j-1][g] of layers (not copy)."""
+        return self.__tensors
+
+    def set_member_weights(self, k, weights):
+        """Set weights of member k from WeightStructure."""
+        for T, M in zip(self.__tensors[1:], weights.get_layer_matrices()[1:]):
+            T[k] = M
+
+    def get_member(self, k):
+        """Return member k as NeuralNetwork (copy of weights)."""
+        from .neuralnetwork import NeuralNetwork
+        net = NeuralNetwork(self.__configuration)
+        W = net.get_weights()
+        for T, M in zip(self.__tensors[1:], W.get_layer_matrices()[1:]):
+            M[:] = T[k]
+        W.mark_changed()
+        return net
+
+    def predict_members(self, X):
+        """Return outputs of all members [K][n][k] for batch X [n][k]."""
+        return self.__forward(self.__as_batch(X))[-1]
+
+    def process_batch(self, X):
+        """Return mean prediction of members [n][k]."""
+        return self.predict_members(X).mean(axis=0)
+
+    def process(self, x):
+        """Return mean prediction (list) for one input x (list)."""
+        return self.process_batch([x])[0].tolist()
+
+    def predict_with_spread(self, X):
+        """Return mean and standard deviation of predictions of members."""
+        Y = self.predict_members(X)
+        return Y.mean(axis=0), Y.std(axis=0)
+
+    def get_errors(self, data):
+        """Return array with error function of each member on data."""
+        X, T = lm.split_samples(data, self.__configuration[
+            'NumberOfInputUnits'], self.__tensors[1].dtype)
+        Y = self.predict_members(X)
+        return 0.5 * numpy.sum((Y - T)**2, axis=(1, 2), dtype=numpy.float64)
+
+    def train(self, train_data, epochs=100, batch_size=32, step=0.1,
+              seed=None):
+        """Train all members by SGD at once. Returns report.
+
+        Gradient of mini-batch is averaged over its samples (as in
+        NeuralNetwork.train).
+        """
+        X, T = lm.split_samples(train_data, self.__configuration[
+            'NumberOfInputUnits'], self.__tensors[1].dtype)
+        report = 'Ensemble training by SGD ({} members):\n'.format(
+            self.get_members_num())
+        report += 'Initial errors: {}\n'.format(self.get_errors(train_data))
+        grads = [None] + [numpy.empty_like(M) for M in self.__tensors[1:]]
+        with dp.BatchPipeline(X, T, batch_size, epochs, seed) as pipeline:
+            for _, X_batch, T_batch in pipeline:
+                Z = self.__forward(X_batch)
+                self.__backward(Z, T_batch, grads)
+                factor = step / len(X_batch)
+                for M, G in zip(self.__tensors[1:], grads[1:]):
+                    M -= G * factor
+        report += 'Final errors: {}\n'.format(self.get_errors(train_data))
+        return report
+
+    def __as_batch(self, X):
+        return numpy.asarray(X, dtype=self.__tensors[1].dtype)
+
+    def __forward(self, X):
+        """Return activations Z[i] [K][n][units], Z[0] is X [n][k]."""
+        Z = [X]
+        for i in range(1, len(self.__tensors)):
+            M = self.__tensors[i]
+            # [n][g] or [K][n][g] @ [K][g][j] -> [K][n][j]:
+            A = numpy.matmul(Z[-1], M[:, :, 1:].transpose(0, 2, 1))
+            A += M[:, None, :, 0]
+            Z.append(lm.AFUNCS[self.__afunc_names[i]](A))
+        return Z
+
+    def __backward(self, Z, T, grads):
+        """Write gradients summed over batch into grads."""
+        N = len(self.__tensors) - 1
+        names = self.__afunc_names
+        B = (Z[N] - T) * lm.AFUNC_DERIVS[names[N]](Z[N])
+        for i in range(N, 0, -1):
+            grads[i][:, :, 0] = B.sum(axis=1, dtype=numpy.float64)
+            Z_prev = Z[i-1]
+            if Z_prev.ndim == 2:  # inputs are common for all members
+                Z_prev = Z_prev[None]
+            numpy.matmul(B.transpose(0, 2, 1), Z_prev,
+                         out=grads[i][:, :, 1:])
+            if i > 1:
+                B = numpy.matmul(B, self.__tensors[i][:, :, 1:])
+                B *= lm.AFUNC_DERIVS[names[i-1]](Z[i-1])
@@ -0,0 +1,209 @@
+"""Export of trained network into standalone scoring module.
+
+Exported artifact is two files in one directory:
+- <name>.py - small generated module, which depends only on numpy
+  (backend 'numpy') or only on standard library (backend 'stdlib');
+- <name>.bin - raw little-endian weights in order of WeightStructure.
+Configuration (numbers of units, activation functions, precision) is
+baked into module, weights file is checked by its size and CRC-32.
+
+Module doesn't import anything from this project, so scoring service
+doesn't need GUI, loading utilities and training code. Weights are read
+by the first call of predict (or by explicit load), so import of module
+costs only import of numpy (or nothing for 'stdlib').
+
+Usage of exported module:
+    import model
+    Y = model.predict([[0.1], [0.5]])  # batch of samples
+"""
+
+import pathlib
+import string
+import zlib
+from . import layermath as lm
+
+BACKENDS = ('numpy', 'stdlib')
+WEIGHTS_SUFFIX = '.bin'
+
+_HEADER = '''"""Scoring module of perceptron_1 network (generated, don't edit).
+
+Configuration: $description.
+predict(X) returns outputs for batch X - sequence of samples, each sample
+is a sequence of INPUTS_NUM numbers. Weights are read from WEIGHTS_FILE
+by the first call of predict (or by load).
+"""
+
+'''
+
+_CONSTANTS = '''
+INPUTS_NUM = $inputs_num
+OUTPUTS_NUM = $outputs_num
+LAYERS = $layers
+ACTIVATIONS = $activations
+PRECISION = '$precision'
+WEIGHTS_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                            '$weights_file')
+WEIGHTS_SIZE = $weights_size
+WEIGHTS_CRC32 = $weights_crc32
+
+_layers = None
+
+
+def _read_weights(path):
+    with open(path, 'rb') as f:
+        raw = f.read()
+    if len(raw) != WEIGHTS_SIZE or zlib.crc32(raw) != WEIGHTS_CRC32:
+        raise ValueError('Weights file does not match module: ' + path)
+    return raw
+'''
+
+_NUMPY_BACKEND = '''import os
+import zlib
+import numpy
+''' + _CONSTANTS + '''
+
+def _sigmoid(a):
+    return 1.0 / (1.0 + numpy.exp(-a))
+
+
+def _linear(a):
+    return a
+
+
+_AFUNCS = {'tanh': numpy.tanh, 'sigmoid': _sigmoid, 'linear': _linear}
+
+
+def load(path=WEIGHTS_FILE):
+    """Read weights, it's called by predict if weights aren't loaded."""
+    global _layers
+    w = numpy.frombuffer(_read_weights(path),
+                         numpy.dtype(PRECISION).newbyteorder('<'))
+    layers = []
+    offset = 0
+    for i in range(1, len(LAYERS)):
+        size = LAYERS[i] * (LAYERS[i-1] + 1)
+        M = w[offset:offset + size].reshape(LAYERS[i], LAYERS[i-1] + 1)
+        # transposed weights for batch of samples in rows, and biases:
+        layers.append([M[:, 1:].T.astype(PRECISION),
+                       M[:, 0].astype(PRECISION), _AFUNCS[ACTIVATIONS[i]]])
+        offset += size
+    _layers = layers
+
+
+def predict(X):
+    """Return numpy-array of outputs [samples][OUTPUTS_NUM] for batch X."""
+    if _layers is None:
+        load()
+    Z = numpy.asarray(X, dtype=PRECISION)
+    if Z.size == 0:  # empty batch
+        Z = Z.reshape(0, INPUTS_NUM)
+    if Z.ndim != 2 or Z.shape[1] != INPUTS_NUM:
+        raise ValueError('X must have shape [samples][{}]'.format(
+            INPUTS_NUM))
+    for W, b, afunc in _layers:
+        Z = afunc(numpy.matmul(Z, W) + b)
+    return Z
+'''
+
+_STDLIB_BACKEND = '''import array
+import math
+import operator
+import os
+import sys
+import zlib
+''' + _CONSTANTS + '''
+
+def _sigmoid(a):
+    if a < -700.0:  # exp overflows
+        return 0.0
+    return 1.0 / (1.0 + math.exp(-a))
+
+
+def _linear(a):
+    return a
+
+
+_AFUNCS = {'tanh': math.tanh, 'sigmoid': _sigmoid, 'linear': _linear}
+
+
+def load(path=WEIGHTS_FILE):
+    """Read weights, it's called by predict if weights aren't loaded."""
+    global _layers
+    w = array.array('d' if PRECISION == 'float64' else 'f')
+    w.frombytes(_read_weights(path))
+    if sys.byteorder == 'big':
+        w.byteswap()
+    layers = []
+    offset = 0
+    for i in range(1, len(LAYERS)):
+        width = LAYERS[i-1] + 1
+        # [bias, weights] of each unit:
+        units = []
+        for j in range(LAYERS[i]):
+            row = w[offset + j * width:offset + (j + 1) * width].tolist()
+            units.append([row[0], row[1:]])
+        layers.append([units, _AFUNCS[ACTIVATIONS[i]]])
+        offset += LAYERS[i] * width
+    _layers = layers
+
+
+def predict(X):
+    """Return list of outputs [samples][OUTPUTS_NUM] for batch X.
+
+    Calculations are done with Python floats (double precision).
+    """
+    if _layers is None:
+        load()
+    mul = operator.mul
+    Y = []
+    for x in X:
+        z = [float(v) for v in x]
+        if len(z) != INPUTS_NUM:
+            raise ValueError('Sample must have {} inputs'.format(INPUTS_NUM))
+        for units, afunc in _layers:
+            z = [afunc(b + sum(map(mul, w, z))) for b, w in units]
+        Y.append(z)
+    return Y
+'''
+
+_BACKEND_SOURCES = {'numpy': _NUMPY_BACKEND, 'stdlib': _STDLIB_BACKEND}
+
+
+def export(net, directory, name='model', backend='numpy'):
+    """Write scoring module and weights of net into directory.
+
+    net - NeuralNetwork, name - name of module (must be identifier).
+    Returns [path of module, path of weights file].
+    """
+    assert backend in BACKENDS
+    assert name.isidentifier()
+    configuration = net.get_configure()
+    values = net.get_weights().get_values()
+    raw = values.astype(values.dtype.newbyteorder('<')).tobytes()
+
+    directory = pathlib.Path(directory)
+    directory.mkdir(parents=True, exist_ok=True)
+    module_path = directory / (name + '.py')
+    weights_path = directory / (name + WEIGHTS_SUFFIX)
+    weights_path.write_bytes(raw)
+    module_path.write_text(get_source(configuration, raw, weights_path.name,
+                                      backend), encoding='utf-8')
+    return module_path, weights_path
+
+
+def get_source(configuration, raw_weights, weights_file, backend='numpy'):
+    """Return source of scoring module for configuration and weights."""
+    layers = [configuration['NumberOfInputUnits']]
+    layers += [info['NumberOfUnits'] for info in configuration['LayersInfo']]
+    activations = lm.get_afunc_names(configuration)
+    description = '{} inputs, {}'.format(layers[0], ', '.join(
+        '{} {}'.format(units, afunc)
+        for units, afunc in zip(layers[1:], activations[1:])))
+    template = string.Template(_HEADER + _BACKEND_SOURCES[backend])
+    return template.substitute(
+        description=description, inputs_num=layers[0],
+        outputs_num=layers[-1], layers=repr(layers),
+        activations=repr(activations),
+        precision=configuration.get('Precision', 'float64'),
+        weights_file=weights_file, weights_size=len(raw_weights),
+        weights_crc32=zlib.crc32(raw_weights))
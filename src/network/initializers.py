@@ -0,0 +1,72 @@
+"""Strategies of weights initialization.
+
+Initializer is set for each layer in configuration (key 'Initializer' in
+LayersInfo), available values:
+- 'legacy' - uniform in [0; InitScale) (default, InitScale = 1);
+- 'uniform' - uniform in [-InitScale; InitScale);
+- 'normal' - normal with standard deviation InitScale;
+- 'xavier_uniform', 'xavier_normal' - Xavier/Glorot initialization,
+  variance 2 / (fan_in + fan_out), suits tanh, sigmoid and linear layers;
+- 'he_uniform', 'he_normal' - He initialization, variance 2 / fan_in.
+For xavier and he initializers InitScale multiplies the standard scale.
+If 'ZeroBiases' is true, weights of imagine units (biases) of layer are
+zero. Key 'Seed' of configuration makes initialization reproducible.
+
+Weights of each layer are generated by one vectorized call over the
+contiguous block of WeightStructure.
+"""
+
+import math
+import numpy
+
+INITIALIZERS = ('legacy', 'uniform', 'normal', 'xavier_uniform',
+                'xavier_normal', 'he_uniform', 'he_normal')
+DEFAULT_INITIALIZER = 'legacy'
+
+
+def initialize(weights, configuration, seed=None):
+    """Initialize weights (WeightStructure) according to configuration.
+
+    seed overrides key 'Seed' of configuration.
+    """
+    if seed is None:
+        seed = configuration.get('Seed')
+    rng = numpy.random.default_rng(seed)
+    fan_in = configuration['NumberOfInputUnits']
+    for i, info in enumerate(configuration['LayersInfo'], 1):
+        fan_out = info['NumberOfUnits']
+        M = weights.get_layer_matrix(i)
+        M[:] = generate(rng, info, fan_in, fan_out, M.shape)
+        if info.get('ZeroBiases', False):
+            M[:, 0] = 0.0
+        fan_in = fan_out
+    weights.mark_changed()
+
+
+def generate(rng, info, fan_in, fan_out, shape):
+    """Return random weights of given shape for layer with info.
+
+    info - element of LayersInfo (only keys of initialization are used).
+    """
+    return __generate(rng, info.get('Initializer', DEFAULT_INITIALIZER),
+                      info.get('InitScale', 1.0), fan_in, fan_out, shape)
+
+
+def __generate(rng, name, scale, fan_in, fan_out, shape):
+    if name == 'legacy':
+        return rng.random(shape) * scale
+    if name == 'uniform':
+        return rng.uniform(-scale, scale, shape)
+    if name == 'normal':
+        return rng.normal(0.0, scale, shape)
+
+    if name.startswith('xavier'):
+        std = scale * math.sqrt(2.0 / (fan_in + fan_out))
+    else:
+        assert name.startswith('he')
+        std = scale * math.sqrt(2.0 / fan_in)
+    if name.endswith('uniform'):
+        # uniform in [-a; a) has standard deviation a / sqrt(3):
+        limit = std * math.sqrt(3.0)
+        return rng.uniform(-limit, limit, shape)
+    return rng.normal(0.0, std, shape)
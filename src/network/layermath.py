@@ -0,0 +1,154 @@
+"""Vectorized calculations for multilayer perceptron.
+
+Functions of this module work with whole layers and whole batches of
+samples at once. Weights of layer i are given as matrix M[i] with shape
+[units on layer i][units on layer i-1 + 1], where column 0 contains weights
+of imagine unit (see WeightStructure.get_layer_matrix). Batch of samples is
+given as matrix X[n][k], where n - index of sample.
+
+Calculations are performed in precision of given matrices (float64 or
+float32), but sums over samples are accumulated in float64 for stability.
+
+All heavy work is done by numpy, which releases GIL, so these functions
+can be called from several threads simultaneously.
+"""
+
+import numpy
+
+# Default number of samples gathered at once by error with indices:
+INDEXED_CHUNK_SIZE = 4096
+
+
+def _sigmoid(a):
+    return 1.0 / (1.0 + numpy.exp(-a))
+
+
+def _linear(a):
+    return a
+
+
+# Derivatives are calculated through value of the activation function
+# (as in NeuralNetwork):
+AFUNCS = {'tanh': numpy.tanh,
+          'sigmoid': _sigmoid,
+          'linear': _linear}
+AFUNC_DERIVS = {'tanh': lambda z: 1 - z**2,
+                'sigmoid': lambda z: z * (1 - z),
+                'linear': numpy.ones_like}
+
+
+def get_afunc_names(configuration):
+    """Return list with names of activation functions for each layer.
+
+    Element with index 0 is None, because input layer has no function.
+    """
+    names = [None]
+    for info in configuration['LayersInfo']:
+        names.append(info['ActivationFunction'])
+    return names
+
+
+def forward(matrices, afunc_names, X):
+    """Return list of activations Z[i] for all layers.
+
+    Z[0] is X itself, Z[-1] - output of network. Imagine units are not
+    included into activations.
+    """
+    Z = [X]
+    for i in range(1, len(matrices)):
+        M = matrices[i]
+        A = numpy.matmul(Z[-1], M[:, 1:].T)
+        A += M[:, 0]
+        Z.append(AFUNCS[afunc_names[i]](A))
+    return Z
+
+
+def predict(matrices, afunc_names, X):
+    """Return output of network for batch X."""
+    return forward(matrices, afunc_names, X)[-1]
+
+
+def backward(matrices, afunc_names, Z, T, grads=None):
+    """Return gradients of error function for all layer matrices.
+
+    Z - activations given by forward, T - matrix with train outputs.
+    Error function is sum of errors for all samples in batch, so gradient
+    is summed as well. If grads is given (list of matrices with the same
+    shapes, for instance - views of WeightStructure), result is written
+    into it.
+    """
+    N = len(matrices) - 1
+    if grads is None:
+        grads = [None] + [numpy.empty_like(M) for M in matrices[1:]]
+    # B - backpropagation coefficients for all units of current layer:
+    B = (Z[N] - T) * AFUNC_DERIVS[afunc_names[N]](Z[N])
+    for i in range(N, 0, -1):
+        grads[i][:, 0] = B.sum(axis=0, dtype=numpy.float64)
+        numpy.matmul(B.T, Z[i-1], out=grads[i][:, 1:])
+        if i > 1:
+            B = numpy.matmul(B, matrices[i][:, 1:])
+            B *= AFUNC_DERIVS[afunc_names[i-1]](Z[i-1])
+    return grads
+
+
+def error(matrices, afunc_names, X, T, chunk_size=None, indices=None):
+    """Return error function (sum for all samples) for batch.
+
+    If chunk_size is given, samples are processed by chunks of such size,
+    so memory for activations doesn't depend on number of samples.
+    If indices are given, error is calculated only for these samples, they
+    are gathered by chunks (INDEXED_CHUNK_SIZE, if chunk_size is None).
+    """
+    if indices is None:
+        samples_num = len(X)
+    else:
+        samples_num = len(indices)
+        chunk_size = chunk_size or INDEXED_CHUNK_SIZE
+    if chunk_size is None:
+        chunk_size = max(samples_num, 1)
+    err = 0.0
+    for begin in range(0, samples_num, chunk_size):
+        end = begin + chunk_size
+        if indices is None:
+            X_chunk, T_chunk = X[begin:end], T[begin:end]
+        else:
+            X_chunk = numpy.take(X, indices[begin:end], axis=0)
+            T_chunk = numpy.take(T, indices[begin:end], axis=0)
+        Y = predict(matrices, afunc_names, X_chunk)
+        err += float(numpy.sum((Y - T_chunk)**2, dtype=numpy.float64))
+    return 0.5 * err
+
+
+def split_samples(train_data, inputs_num, dtype=numpy.float64):
+    """Convert train_data [[f,...],...] to matrices of inputs and outputs.
+
+    Each sample is a flat sequence, where the first inputs_num values are
+    inputs and the rest are outputs.
+    """
+    data = numpy.asarray(train_data, dtype=dtype)
+    return data[:, :inputs_num], data[:, inputs_num:]
+
+
+def jacobian(matrices, afunc_names, X):
+    """Return outputs Y and their Jacobian J by all weights.
+
+    J[n][k][p] - derivative of output k for sample n by weight p, where
+    weights are enumerated in order of WeightStructure.
+    """
+    N = len(matrices) - 1
+    Z = forward(matrices, afunc_names, X)
+    n, K = Z[N].shape
+    # B[n][k][j] - derivative of output k by weighted sum of unit j:
+    B = AFUNC_DERIVS[afunc_names[N]](Z[N])[:, :, None] * numpy.eye(K)
+    blocks = []
+    for i in range(N, 0, -1):
+        Z_prev = numpy.empty((n, Z[i-1].shape[1] + 1), dtype=Z[i-1].dtype)
+        Z_prev[:, 0] = 1.0  # imagine unit
+        Z_prev[:, 1:] = Z[i-1]
+        blocks.append((B[:, :, :, None] * Z_prev[:, None, None, :]).reshape(
+            n, K, -1))
+        if i > 1:
+            B = numpy.matmul(B, matrices[i][:, 1:])
+            B *= AFUNC_DERIVS[afunc_names[i-1]](Z[i-1])[:, None, :]
+    blocks.reverse()
+    return Z[N], numpy.concatenate(blocks, axis=2)
@@ -0,0 +1,95 @@
+"""Lookup-table surrogate for networks with one input.
+
+Trained network is tabulated on dense uniform grid over input domain
+(by default [-1;1], the domain of train data). Then predictions are given
+by linear interpolation between nodes of grid, which is a few vectorized
+numpy operations for whole batch. Inputs outside of domain are clipped to
+its bounds.
+
+Approximation error is measured during tabulation: network and table are
+compared on grid that is several times denser than table's grid.
+"""
+
+import numpy
+
+DEFAULT_POINTS_NUM = 4097
+ERROR_GRID_FACTOR = 4  # error grid is such times denser than table grid
+
+
+class LookupTable():
+    """Table of network outputs on uniform grid with interpolation."""
+
+    def __init__(self, lower, upper, values, max_error=None):
+        """Create table from values [n][k] on uniform grid [lower; upper]."""
+        values = numpy.asarray(values, dtype=float)
+        assert values.ndim == 2 and len(values) >= 2
+        assert lower < upper
+        self.__lower = float(lower)
+        self.__upper = float(upper)
+        self.__values = values
+        # differences between neighbouring nodes for interpolation:
+        self.__slopes = numpy.diff(values, axis=0)
+        self.__inv_step = (len(values) - 1) / (upper - lower)
+        self.__max_error = max_error
+
+    def predict(self, X):
+        """Return outputs [n][k] for inputs X - [n][1] or [n]."""
+        x = numpy.asarray(X, dtype=float).reshape(-1)
+        x = numpy.clip(x, self.__lower, self.__upper)
+        position = (x - self.__lower) * self.__inv_step
+        idx = numpy.minimum(position.astype(numpy.intp),
+                            len(self.__slopes) - 1)
+        frac = (position - idx)[:, None]
+        return self.__values[idx] + frac * self.__slopes[idx]
+
+    def process(self, x):
+        """Return output (list) for one input x (list), like NeuralNetwork."""
+        return self.predict([x[0]])[0].tolist()
+
+    def get_max_error(self):
+        """Return max absolute error against network (or None)."""
+        return self.__max_error
+
+    def get_domain(self):
+        """Return [lower, upper] bounds of input domain."""
+        return [self.__lower, self.__upper]
+
+    def get_points_num(self):
+        """Return number of nodes of grid."""
+        return len(self.__values)
+
+    def save(self, path):
+        """Save table to file (numpy .npz format)."""
+        max_error = numpy.nan if self.__max_error is None else self.__max_error
+        with open(path, 'wb') as f:
+            numpy.savez(f, domain=numpy.array(self.get_domain()),
+                        values=self.__values, max_error=max_error)
+
+
+def tabulate(net, points_num=DEFAULT_POINTS_NUM, lower=-1.0, upper=1.0):
+    """Return LookupTable for network with one input.
+
+    Raises ValueError if points_num is less than 2.
+    """
+    assert net.get_configure()['NumberOfInputUnits'] == 1
+    if points_num < 2:
+        raise ValueError('Table must have at least 2 points')
+    grid = numpy.linspace(lower, upper, points_num)
+    values = net.process_batch(grid[:, None]).astype(float)
+    table = LookupTable(lower, upper, values)
+
+    check_grid = numpy.linspace(lower, upper,
+                                ERROR_GRID_FACTOR * (points_num - 1) + 1)
+    expected = net.process_batch(check_grid[:, None]).astype(float)
+    max_error = float(numpy.abs(table.predict(check_grid) - expected).max())
+    return LookupTable(lower, upper, values, max_error)
+
+
+def load_lookup_table(path):
+    """Load LookupTable saved by LookupTable.save."""
+    with numpy.load(path) as data:
+        lower, upper = data['domain']
+        max_error = float(data['max_error'])
+        if numpy.isnan(max_error):
+            max_error = None
+        return LookupTable(lower, upper, data['values'], max_error)
@@ -0,0 +1,244 @@
+"""Estimation of memory footprint and accounting of its peak usage.
+
+Estimations are made before allocation from number of samples and sizes
+of layers, so budget may be checked up front:
+- estimate_training - memory of NeuralNetwork.train: data arrays,
+  weights and gradients, activations of mini-batch, activations for
+  evaluation of general error on all samples and report (report has two
+  strings of weights for each iteration, so for large networks it's the
+  largest part);
+- get_error_chunk_size - size of chunks of samples for evaluation of
+  general error, which fits into budget;
+- fit_training - the same fallbacks as NeuralNetwork.train uses for
+  budget (shortened report and chunks of general error);
+- estimate_sparse_training, fit_sparse_training - the same for
+  SparseNetwork (see network.sparse).
+Estimation of train data is given by dataloadingutil.estimate_train_data.
+
+MemoryMonitor measures real peak of memory allocated by Python and numpy
+(through tracemalloc) in named phases. tracemalloc slows down allocation
+of Python objects, so monitor is created only on demand.
+"""
+
+import sys
+import tracemalloc
+from . import weightstructure as ws
+
+MB = 2**20
+REPORT_CHARS_PER_WEIGHT = 50  # two strings of weights on each iteration
+REPORT_CHARS_PER_ITERATION = 30
+# New string objects of report on each iteration (full and short report)
+# and bytes of each of them without chars (object and pointer in list):
+REPORT_PARTS_FULL = 3
+REPORT_PARTS_SHORT = 1
+REPORT_BYTES_PER_PART = sys.getsizeof('') + 8
+MIN_ERROR_CHUNK = 256
+
+
+def __get_layers(configuration):
+    layers = [configuration['NumberOfInputUnits']]
+    layers += [info['NumberOfUnits'] for info in configuration['LayersInfo']]
+    return layers
+
+
+def estimate_training(configuration, samples_num, batch_size=1,
+                      max_iter_num=50000, error_chunk=None,
+                      full_report=True, copy_data=True):
+    """Return dict with estimated bytes of parts of training and 'total'.
+
+    error_chunk - number of samples in chunk for evaluation of general
+    error (None - all samples at once). copy_data - train data are
+    converted to array by training (they aren't array of precision of
+    network yet).
+    """
+    layers = __get_layers(configuration)
+    itemsize = ws.get_dtype(configuration).itemsize
+    weights_num = ws.get_weights_num(configuration)
+    units_num = sum(layers)
+    eval_num = samples_num
+    if error_chunk is not None:
+        eval_num = min(error_chunk, samples_num)
+    parts = {}
+    parts['data'] = 0
+    if copy_data:
+        parts['data'] = samples_num * (layers[0] + layers[-1]) * itemsize
+    # weights, gradient, gradient matrices and temporary of update:
+    parts['weights'] = 4 * weights_num * itemsize
+    # activations, backpropagation coefficients and temporary arrays:
+    parts['batch'] = 3 * batch_size * units_num * itemsize
+    parts['error'] = eval_num * (units_num + max(layers)) * itemsize
+    report_chars = REPORT_CHARS_PER_ITERATION
+    report_parts = REPORT_PARTS_SHORT
+    if full_report:
+        report_chars += REPORT_CHARS_PER_WEIGHT * weights_num
+        report_parts = REPORT_PARTS_FULL
+    # parts of report and the joined string:
+    parts['report'] = max_iter_num * (
+        2 * report_chars + report_parts * REPORT_BYTES_PER_PART)
+    parts['total'] = sum(parts.values())
+    return parts
+
+
+def get_error_chunk_size(configuration, samples_num, budget, batch_size=1,
+                         max_iter_num=50000, full_report=True):
+    """Return chunk size for general error to fit training into budget.
+
+    Returns None if all samples may be evaluated at once.
+    """
+    parts = estimate_training(configuration, samples_num, batch_size,
+                              max_iter_num, None, full_report)
+    return __get_chunk_size(parts, samples_num, budget)
+
+
+def __get_chunk_size(parts, samples_num, budget):
+    """Return chunk size of general error for estimated parts."""
+    if parts['total'] <= budget:
+        return None
+    rest = budget - (parts['total'] - parts['error'])
+    per_sample = parts['error'] / max(samples_num, 1)
+    return max(MIN_ERROR_CHUNK, int(rest / per_sample) if rest > 0 else 0)
+
+
+def fit_training(configuration, samples_num, budget, batch_size=1,
+                 max_iter_num=50000, full_report=True):
+    """Return [full_report, error_chunk] of training within budget.
+
+    Report is shortened if it doesn't fit even with chunks of general
+    error (or if full_report is False), error_chunk is None if all samples
+    fit at once.
+    """
+    if full_report:
+        full_report = estimate_training(
+            configuration, samples_num, batch_size, max_iter_num,
+            MIN_ERROR_CHUNK)['total'] <= budget
+    chunk = get_error_chunk_size(configuration, samples_num, budget,
+                                 batch_size, max_iter_num, full_report)
+    return full_report, chunk
+
+
+def estimate_sparse_training(configuration, weights_num, samples_num,
+                             batch_size=32, error_chunk=None,
+                             copy_data=True):
+    """Return dict like estimate_training for SparseNetwork.
+
+    weights_num - number of stored weights (biases and connections).
+    Inputs of sparse layer are gathered for each connection, so
+    activations are counted by weights. Report of training is short.
+    """
+    layers = __get_layers(configuration)
+    itemsize = ws.get_dtype(configuration).itemsize
+    units_num = sum(layers)
+    eval_num = samples_num
+    if error_chunk is not None:
+        eval_num = min(error_chunk, samples_num)
+    parts = {}
+    parts['data'] = 0
+    if copy_data:
+        parts['data'] = samples_num * (layers[0] + layers[-1]) * itemsize
+    # weights, gradient and temporary of update:
+    parts['weights'] = 3 * weights_num * itemsize
+    # activations, gathered inputs and their products:
+    parts['batch'] = batch_size * (3 * units_num + 2 * weights_num) * itemsize
+    parts['error'] = eval_num * (units_num + weights_num) * itemsize
+    parts['report'] = 0
+    parts['total'] = sum(parts.values())
+    return parts
+
+
+def fit_sparse_training(configuration, weights_num, samples_num, budget,
+                        batch_size=32):
+    """Return chunk size of error for SparseNetwork.train within budget.
+
+    Returns None if all samples may be evaluated at once.
+    """
+    parts = estimate_sparse_training(configuration, weights_num,
+                                     samples_num, batch_size)
+    return __get_chunk_size(parts, samples_num, budget)
+
+
+def format_bytes(size):
+    """Return size in human-readable form."""
+    for unit in ('B', 'KB', 'MB', 'GB'):
+        if abs(size) < 1024 or unit == 'GB':
+            break
+        size /= 1024.0
+    return '{:.1f} {}'.format(size, unit)
+
+
+class MemoryMonitor():
+    """Accounting of peak memory usage in phases.
+
+    Phases must not be nested. Peak of phase is given relative to memory
+    allocated at the beginning of phase.
+    """
+
+    def __init__(self):
+        """Start tracing of allocations."""
+        self.__own_tracing = not tracemalloc.is_tracing()
+        if self.__own_tracing:
+            tracemalloc.start()
+        self.__phases = []  # [name, estimate, peak]
+
+    def phase(self, name, estimate=None):
+        """Return context manager for phase, estimate - expected bytes."""
+        return _Phase(self, name, estimate)
+
+    def add_phase(self, name, estimate, peak):
+        """Add result of phase."""
+        self.__phases.append([name, estimate, peak])
+
+    def get_phases(self):
+        """Return list of [name, estimate, peak] (bytes)."""
+        return self.__phases
+
+    def get_report(self):
+        """Return text table with estimated and peak memory of phases."""
+        report = '{:<28}{:>14}{:>14}\n'.format('Phase', 'Estimate', 'Peak')
+        for name, estimate, peak in self.__phases:
+            estimate = '-' if estimate is None else format_bytes(estimate)
+            report += '{:<28}{:>14}{:>14}\n'.format(
+                name, estimate, format_bytes(peak))
+        max_rss = _get_max_rss()
+        if max_rss is not None:
+            report += 'Max resident set size: {}\n'.format(
+                format_bytes(max_rss))
+        return report
+
+    def stop(self):
+        """Stop tracing of allocations (if monitor has started it)."""
+        if self.__own_tracing and tracemalloc.is_tracing():
+            tracemalloc.stop()
+
+
+class _Phase():
+    """Context manager measuring peak of allocated memory."""
+
+    def __init__(self, monitor, name, estimate):
+        self.__monitor = monitor
+        self.__name = name
+        self.__estimate = estimate
+
+    def __enter__(self):
+        if hasattr(tracemalloc, 'reset_peak'):  # python 3.9+
+            tracemalloc.reset_peak()
+        else:  # traces of old allocations are lost, it's not important
+            tracemalloc.clear_traces()
+        self.__begin = tracemalloc.get_traced_memory()[0]
+        return self
+
+    def __exit__(self, *exc_info):
+        peak = tracemalloc.get_traced_memory()[1]
+        self.__monitor.add_phase(self.__name, self.__estimate,
+                                 max(peak - self.__begin, 0))
+        return False
+
+
+def _get_max_rss():
+    """Return max resident set size of process (bytes) or None."""
+    try:
+        import resource
+    except ImportError:  # Windows
+        return None
+    max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # bytes on macOS, kilobytes on other systems:
+    return max_rss if sys.platform == 'darwin' else max_rss * 1024
@@ -7,7 +7,8 @@ Multilayer Perceptron, that implemented here has next features:
 - All net groupped as sequence of layers.
   As zero layer - inputs, then - hidden layers and the last - output layer.
 - Each unit in the net (except input units) nas connection with each unit
-  on previous layer.
+  on previous layer (sparse connectivity of layers is implemented by
+  network.sparse, here key 'Connectivity' of configuration is ignored).
 - Each layer can have its own activation function (except input layer).
 
 Order of indexation:
@@ -43,24 +44,45 @@ b - backpropagation coefficient for unit
 
 import math
 import copy
-import random
+import json
+import numpy
+from . import datapipeline as dp
+from . import initializers
+from . import layermath as lm
+from . import tracing
 from . import weightstructure as ws
 from . import unitstructure as us
 
 
+# Activation functions and their derivatives are the same for all networks.
+# All derivatives may be calculated through value of the activation function
+# in this point, that's why derivative is given as function from itself.
+_AFUNCS = {'tanh': math.tanh,
+           'sigmoid': lambda x: 1/(1 + math.exp(-x)),
+           'linear': lambda x: x}
+_AFUNC_DERIVS = {'tanh': lambda x: 1 - x**2,
+                 'sigmoid': lambda x: x * (1 - x),
+                 'linear': lambda x: 1}
+
+
 class NeuralNetwork():
-    """Implementation of multilayer perceptron."""
+    """Implementation of multilayer perceptron.
+
+    All state of network belongs to the instance, so any number of networks
+    can coexist in one process and can be created from different threads.
 
-    __configuration = {}
-    __W = None
-    __layers = []  # info about num of units for each layer
-    __afuncs = []  # activation function for each layer
-    __afunc_derivs = []  # derivatives od afuncs for each layer
+    Trained network can be frozen (see freeze). Frozen network is read-only:
+    its inference doesn't change any shared data and is performed by numpy,
+    so it can be called from many threads at once.
+    """
 
     def __init__(self, configuration):
         """Create MultilayerPerceptron with certain configuration."""
-        self.__configuration = configuration
+        self.__configuration = copy.deepcopy(configuration)
         # Copy some data from __config for fast access:
+        self.__layers = []  # info about num of units for each layer
+        self.__afuncs = []  # activation function for each layer
+        self.__afunc_derivs = []  # derivatives od afuncs for each layer
         self.__layers.append(self.__configuration['NumberOfInputUnits'])
         self.__afuncs.append(None)
         self.__afunc_derivs.append(None)
@@ -71,8 +93,13 @@ class NeuralNetwork():
             self.__afuncs.append(afunc)
             afunc_deriv = self.__get_deriv_of_afunc(afunc_name)
             self.__afunc_derivs.append(afunc_deriv)
-        self.__W = ws.WeightStructure(configuration)
-        self.__W.random_initialization()
+        self.__afunc_names = lm.get_afunc_names(self.__configuration)
+        self.__W = ws.WeightStructure(self.__configuration)
+        initializers.initialize(self.__W, self.__configuration)
+        self.__frozen_matrices = None
+        self.__frozen_version = None
+        self.__kernels = None
+        self.__cache = None
 
     def process(self, x):
         """Calculate output of network for certain x.
@@ -80,27 +107,126 @@ class NeuralNetwork():
         x must be a list, and y must be a list. Length must correspond with
         configuration of net.
         """
+        if self.__cache is None:
+            return self.__process(x)
+        version = self.__get_model_version()
+        key = self.__cache.get_key(x)
+        y = self.__cache.get(version, key)
+        if y is None:
+            y = self.__process(x)
+            self.__cache.put(version, key, y)
+        return y
+
+    def __process(self, x):
+        if self.__frozen_matrices is not None:
+            X = numpy.array([x], dtype=self.__W.get_dtype())
+            Y = lm.predict(self.__frozen_matrices, self.__afunc_names, X)
+            return Y[0].tolist()
+        if self.__kernels is not None:
+            return self.__kernels.forward(self.__W.get_values(), x)
         Z = self.__process_forward_propagation(x, self.__W)
         return Z.get_output_layer()
 
+    def process_batch(self, X):
+        """Calculate output of network for batch of inputs.
+
+        X must be 2d-array (or list of lists) [n][k], where n - index of
+        sample. Returns numpy-array [n][k] with outputs.
+        """
+        X = numpy.asarray(X, dtype=self.__W.get_dtype())
+        if self.__frozen_matrices is not None:
+            matrices = self.__frozen_matrices
+        else:
+            matrices = self.__W.get_layer_matrices()
+        return lm.predict(matrices, self.__afunc_names, X)
+
+    def freeze(self):
+        """Switch network to read-only inference mode.
+
+        Current weights are copied to read-only matrices. Frozen network
+        can't be trained, but inference may be called from many threads.
+        """
+        matrices = [None]
+        for M in self.__W.get_layer_matrices()[1:]:
+            M = M.copy()
+            M.flags.writeable = False
+            matrices.append(M)
+        self.__frozen_matrices = matrices
+        self.__frozen_version = self.__W.get_version()
+
+    def unfreeze(self):
+        """Switch network back to usual (trainable) mode."""
+        self.__frozen_matrices = None
+        self.__frozen_version = None
+
+    def enable_prediction_cache(self, max_entries=100000,
+                                max_bytes=64 * 2**20, quantum=1.0e-9):
+        """Cache outputs of process for repeated inputs.
+
+        Inputs are quantized with step quantum, the least recently used
+        entries are evicted (see network.predictioncache). Cache is
+        invalidated automatically when weights change.
+        """
+        from .predictioncache import PredictionCache
+        self.__cache = PredictionCache(max_entries, max_bytes, quantum)
+
+    def disable_prediction_cache(self):
+        """Stop caching of outputs."""
+        self.__cache = None
+
+    def get_prediction_cache(self):
+        """Return PredictionCache or None, if cache is disabled."""
+        return self.__cache
+
+    def __get_model_version(self):
+        """Return version of weights, used for calculation of outputs."""
+        if self.__frozen_matrices is not None:
+            return ('frozen', self.__frozen_version)
+        return ('trainable', self.__W.get_version())
+
+    def compile(self, cache_dir=None, unrolled=None):
+        """Use kernels specialized for configuration of this network.
+
+        Kernels are generated (or taken from cache) by network.codegen and
+        used instead of generic code for forward propagation and
+        backpropagation. See network.codegen for arguments.
+        """
+        from . import codegen
+        self.__kernels = codegen.get_kernels(self.__configuration,
+                                             cache_dir, unrolled)
+
+    def is_compiled(self):
+        """Return True if specialized kernels are used."""
+        return self.__kernels is not None
+
+    def is_frozen(self):
+        """Return True if network is in read-only inference mode."""
+        return self.__frozen_matrices is not None
+
     def get_configure(self):
         """Return information about configuration of network."""
         return self.__configuration
 
+    def get_weights(self):
+        """Return WeightStructure with weights of network (not copy)."""
+        return self.__W
+
+    def save(self, path):
+        """Save configuration and weights of network to json-file.
+
+        File can be loaded by dataloadingutil.load_model or used as
+        configuration file.
+        """
+        model = {'Configuration': self.__configuration,
+                 'Weights': self.__W.get_values().tolist()}
+        with open(path, 'w') as f:
+            json.dump(model, f)
+
     def __get_activation_function(self, func_name):
-        funcs = {'tanh': math.tanh,
-                 'sigmoid': lambda x: 1/(1 + math.exp(-x)),
-                 'linear': lambda x: x}
-        return funcs[func_name]
+        return _AFUNCS[func_name]
 
     def __get_deriv_of_afunc(self, func_name):
-        # for all functions that we have derivatives of activation function
-        # may be calculated through value of the activation function in this
-        # point. This function return derivative as function from itself:
-        funcs = {'tanh': lambda x: 1 - x**2,
-                 'sigmoid': lambda x: x * (1 - x),
-                 'linear': lambda x: 1}
-        return funcs[func_name]
+        return _AFUNC_DERIVS[func_name]
 
     def __process_forward_propagation(self, x, W):
         """Return result as array, argument - array as well."""
@@ -137,8 +263,11 @@ class NeuralNetwork():
     def __error_function(self, sample, W):
         # sample must has from [x=[..], y=[..]]
         x, t = sample[0], sample[1]
-        Z = self.__process_forward_propagation(x, W)
-        y = Z.get_output_layer()
+        if self.__kernels is not None:
+            y = self.__kernels.forward(W.get_values(), x)
+        else:
+            Z = self.__process_forward_propagation(x, W)
+            y = Z.get_output_layer()
         err = 0
         for i, y_val in enumerate(y):
             err += 0.5 * (y_val - t[i])**2
@@ -149,6 +278,12 @@ class NeuralNetwork():
 
         Still without generalization. Now all calucaltion for 1d-output
         """
+        if self.__kernels is not None:
+            D = ws.WeightStructure(self.__configuration)
+            D.set_values(self.__kernels.gradient(self.__W.get_values(),
+                                                 sample[0], sample[1]))
+            return D
+
         # 1. Calculate all activations:
         x = sample[0]
         Z = self.__process_forward_propagation(x, self.__W)
@@ -180,12 +315,19 @@ class NeuralNetwork():
         return D
 
     def _calculate_gradient_numerically(self, sample):
-        """Return gradient calculated numerically."""
+        """Return gradient calculated numerically.
+
+        Calculation is always performed in float64 precision, because small
+        steps are lost in float32.
+        """
         EPSILON = 1.0e-10
-        D = ws.WeightStructure(self.__configuration)
+        config_64 = dict(self.__configuration, Precision='float64')
+        W = ws.WeightStructure(config_64)
+        W.set_values(self.__W.get_values())
+        D = ws.WeightStructure(config_64)
         for _, [i, j, g] in D:
-            w_plus = copy.deepcopy(self.__W)
-            w_minus = copy.deepcopy(self.__W)
+            w_plus = copy.deepcopy(W)
+            w_minus = copy.deepcopy(W)
             w_plus.set_elt(i, j, g, w_plus.get_elt(i, j, g) + EPSILON)
             w_minus.set_elt(i, j, g, w_minus.get_elt(i, j, g) - EPSILON)
             e_plus = self.__error_function(sample, w_plus)
@@ -194,47 +336,194 @@ class NeuralNetwork():
             D.set_elt(i, j, g, derivative)
         return D
 
-    def train(self, train_data):
-        """Train network. train_data must have format [[f,...], [f,...]]."""
-        # The simplest stochastic gradient descent:
-        report = 'Network training by SGD:\n'
-        g_err = self.general_error_function(train_data)
+    def train(self, train_data, optimizer='sgd', batch_size=1, step=0.1,
+              max_iter_num=50000, seed=None, progress=None,
+              validation_data=None, validation_stride=10,
+              memory_budget=None, loss_stride=10, sample_indices=None,
+              masks=None, full_report=True):
+        """Train network. train_data must have format [[f,...], [f,...]].
+
+        optimizer - 'sgd', 'lm' (Levenberg-Marquardt) or 'lbfgs' (see
+        network.optimizers). Second-order optimizers are used only for
+        small networks, otherwise SGD is used.
+        SGD visits samples by epochs in shuffled order (see
+        network.datapipeline), one iteration - one mini-batch of
+        batch_size samples. seed makes order of samples reproducible.
+        Gradient of mini-batch is calculated by compiled kernels, if
+        network is compiled (see compile).
+        General error on all train data is calculated only for each
+        loss_stride-th iteration and on checkpoints, it's written to report
+        and given to progress. progress(iteration, train_loss,
+        validation_loss) is called after such iterations, losses are
+        errors per sample. validation_loss is calculated on validation_data
+        not more often than once per validation_stride iterations (for
+        other calls it's None), it's the most expensive part of call. If
+        progress returns True, training is stopped.
+        If sample_indices (array of indices) is given, only these samples
+        of train_data are used, subset isn't copied.
+        If full_report is False, gradient and weights are written to report
+        only on checkpoints.
+        If memory_budget (bytes) is given and estimated memory of training
+        exceeds it (see network.memory), report is shortened the same way
+        and general error is calculated by chunks of samples.
+        If masks (see network.compression.prune) are given, weights which
+        are not kept by masks are set to zero on each iteration, such
+        training is possible only by SGD.
+        """
+        assert not self.is_frozen()
+        report = ''
+        if masks is not None and optimizer != 'sgd':
+            report += 'Optimizer "{}" doesn\'t support masks.\n'.format(
+                optimizer)
+        elif optimizer != 'sgd':
+            from . import optimizers
+            if optimizers.is_applicable(optimizer, len(self.__W)):
+                if sample_indices is not None:  # whole batch is required
+                    train_data = numpy.take(numpy.asarray(train_data),
+                                            sample_indices, axis=0)
+                return optimizers.train(optimizer, self.__configuration,
+                                        self.__W, train_data)
+            report += 'Network is too large for optimizer "{}".\n'.format(
+                optimizer)
+        # Stochastic gradient descent on shuffled mini-batches:
+        report += 'Network training by SGD:\n'
+        X, T = lm.split_samples(train_data, self.__layers[0],
+                                self.__W.get_dtype())
+        samples_num = len(X)
+        if sample_indices is not None:
+            sample_indices = numpy.asarray(sample_indices)
+            samples_num = len(sample_indices)
+        matrices = self.__W.get_layer_matrices()
+        D = ws.WeightStructure(self.__configuration)
+        grads = D.get_layer_matrices()
+        if masks is not None:
+            pruned = ~numpy.concatenate([mask.reshape(-1)
+                                         for mask in masks[1:]])
+            self.__W.get_values()[pruned] = 0.0
+            self.__W.mark_changed()
+        chunk = None
+        if memory_budget is not None:
+            from . import memory
+            fits, chunk = memory.fit_training(
+                self.__configuration, samples_num, memory_budget,
+                batch_size, max_iter_num, full_report)
+            if full_report and not fits:
+                report += 'Report is shortened to fit memory budget.\n'
+                full_report = False
+        g_err = lm.error(matrices, self.__afunc_names, X, T, chunk,
+                         sample_indices)
         g_err_checkpoint = g_err
-        STEP = 0.1
-        MAX_ITER_NUM = 50000
         CHECKPOINT_NUMBER = 5000
+        X_val = None
+        next_validation = 0  # iteration of next validation loss
+        if validation_data is not None and len(validation_data):
+            X_val, T_val = lm.split_samples(
+                validation_data, self.__layers[0], self.__W.get_dtype())
         report += 'Initial state: g_err={}\n'.format(g_err)
         report += 'Initial weights:\n'
         report += self.__W.get_string()
         report += '\n\n'
 
-        for iteration in range(MAX_ITER_NUM):
-            report += 'Iteration #{}\n'.format(iteration)
-            rand_index = random.randrange(0, len(train_data))
-            sample = train_data[rand_index]
-            gen_sample = [[sample[0]], [sample[1]]]
-            grad = self._calculate_gradient_by_backpropagation(gen_sample)
-            report += 'Gradient:'
-            report += grad.get_string()
-            for weight, [i, j, g] in self.__W:
-                weight -= grad.get_elt(i, j, g) * STEP
-            report += 'Recalculated weights:\n'
-            report += self.__W.get_string()
-            prev_g_err = g_err
-            g_err = self.general_error_function(train_data)
-            sample_impr = 1 - g_err / prev_g_err
-            report += 'General error={:.4f}, improvement={:.6f}\n'.format(
-                g_err, sample_impr)
-            report += '\n\n'
-            if iteration != 0 and iteration % CHECKPOINT_NUMBER == 0:
-                report += ' * * * \n'
-                report += 'Checkpoint on iteration #{}\n'.format(iteration)
-                checkpoint_impr = 1 - g_err / g_err_checkpoint
-                g_err_checkpoint = g_err
-                report += 'Checkpoint improvement={:.6f}\n'.format(
-                    checkpoint_impr)
-                report += '\n\n'
-                if checkpoint_impr < 0.0001:
-                    report += 'Further training is unreasonable. Stop.\n'
-                    break
-        return report
+        parts = [report]  # report is collected by parts, it's long
+        pipeline = dp.BatchPipeline(X, T, batch_size, epochs=None,
+                                    seed=seed, indices=sample_indices)
+        with pipeline, tracing.span('SGD', 'training'):
+            prev_epoch = None
+            for iteration, [epoch, X_batch, T_batch] in zip(
+                    range(max_iter_num), pipeline):
+                if epoch != prev_epoch:
+                    parts.append('Epoch #{}\n'.format(epoch))
+                    prev_epoch = epoch
+                parts.append('Iteration #{}\n'.format(iteration))
+                if self.__kernels is not None:
+                    with tracing.sampled_span('gradient', iteration,
+                                              'training'):
+                        self.__calculate_batch_gradient(X_batch, T_batch, D)
+                else:
+                    with tracing.sampled_span('forward', iteration,
+                                              'training'):
+                        Z = lm.forward(matrices, self.__afunc_names, X_batch)
+                    with tracing.sampled_span('backward', iteration,
+                                              'training'):
+                        lm.backward(matrices, self.__afunc_names, Z, T_batch,
+                                    grads)
+                # mean gradient, so step doesn't depend on batch size:
+                D.get_values()[:] /= len(X_batch)
+                if masks is not None:
+                    D.get_values()[pruned] = 0.0
+                with tracing.sampled_span('update', iteration, 'training'):
+                    values = self.__W.get_values()
+                    values -= D.get_values() * step
+                    self.__W.mark_changed()
+                is_checkpoint = (iteration != 0 and
+                                 iteration % CHECKPOINT_NUMBER == 0)
+                loss_point = iteration % loss_stride == 0 or is_checkpoint
+                if loss_point:
+                    with tracing.sampled_span('loss', iteration, 'training'):
+                        prev_g_err = g_err
+                        g_err = lm.error(matrices, self.__afunc_names, X, T,
+                                         chunk, sample_indices)
+                        impr = 1 - g_err / prev_g_err
+                    tracing.sampled_counter('general error', iteration,
+                                            {'g_err': g_err})
+                if loss_point and progress is not None:
+                    val_loss = None
+                    if X_val is not None and iteration >= next_validation:
+                        with tracing.sampled_span('validation', iteration,
+                                                  'training'):
+                            val_loss = lm.error(matrices, self.__afunc_names,
+                                                X_val, T_val,
+                                                chunk) / len(X_val)
+                        next_validation = iteration + validation_stride
+                    if progress(iteration, g_err / samples_num, val_loss):
+                        parts.append('Training was stopped.\n')
+                        break
+                with tracing.sampled_span('report', iteration, 'training'):
+                    if full_report:
+                        parts.append('Gradient:')
+                        parts.append(D.get_string())
+                        parts.append('Recalculated weights:\n')
+                        parts.append(self.__W.get_string())
+                    if loss_point:
+                        parts.append('General error={:.4f}, '
+                                     'improvement={:.6f}\n'.format(g_err,
+                                                                   impr))
+                    parts.append('\n\n')
+                if is_checkpoint:
+                    with tracing.span('checkpoint', 'training'):
+                        parts.append(' * * * \n')
+                        parts.append('Checkpoint on iteration #{}\n'.format(
+                            iteration))
+                        checkpoint_impr = 1 - g_err / g_err_checkpoint
+                        g_err_checkpoint = g_err
+                        parts.append('Checkpoint improvement={:.6f}\n'.format(
+                            checkpoint_impr))
+                        if not full_report:
+                            parts.append('Weights:\n')
+                            parts.append(self.__W.get_string())
+                        parts.append('\n\n')
+                    if checkpoint_impr < 0.0001:
+                        parts.append(
+                            'Further training is unreasonable. Stop.\n')
+                        break
+        return ''.join(parts)
+
+    def __calculate_batch_gradient(self, X_batch, T_batch, D):
+        """Write sum of gradients of samples to D by compiled kernels."""
+        w = self.__W.get_values()
+        grad = D.get_values()
+        grad[:] = 0.0
+        # unrolled kernels are faster with Python floats:
+        for x, t in zip(X_batch.tolist(), T_batch.tolist()):
+            grad += self.__kernels.gradient(w, x, t)
+
+    def train_parallel(self, train_data, workers=None, asynchronous=False,
+                       epochs=100, step=0.1, batch_size=32, seed=None):
+        """Train network by data-parallel SGD in several processes.
+
+        See network.paralleltraining for details. Returns report.
+        """
+        # multiprocessing is heavy, so it's imported only if required:
+        from . import paralleltraining as pt
+        return pt.train_data_parallel(self, train_data, workers, asynchronous,
+                                      epochs, step, batch_size, seed)
@@ -0,0 +1,183 @@
+"""Second-order optimizers for small networks.
+
+SGD needs tens of thousands of iterations even for tiny networks. Methods
+of this module use information about curvature of error function and
+converge in tens of iterations:
+- 'lm' - Levenberg-Marquardt, uses Jacobian of all outputs by all weights
+  (time - weights^3 per iteration). Jacobian is calculated by chunks of
+  samples and only J^T*J and J^T*e are kept, so memory is limited by
+  weights^2 and JACOBIAN_CHUNK_SIZE, not by number of samples;
+- 'lbfgs' - L-BFGS, uses only gradients and short history of them.
+Both work on whole train data (batch) and change weights in place.
+
+Cost of these methods grows fast with number of weights, so for large
+networks NeuralNetwork.train falls back to SGD (see is_applicable).
+"""
+
+import numpy
+from . import layermath as lm
+from . import weightstructure as ws
+
+# Max number of weights, for which method is used:
+MAX_WEIGHTS_NUM = {'lm': 1000, 'lbfgs': 100000}
+OPTIMIZERS = ('sgd', 'lm', 'lbfgs')
+# Max size (bytes) of Jacobian of one chunk of samples for 'lm':
+JACOBIAN_CHUNK_SIZE = 16 * 2**20
+
+
+def is_applicable(optimizer, weights_num):
+    """Return True if second-order optimizer suits network of such size."""
+    return weights_num <= MAX_WEIGHTS_NUM[optimizer]
+
+
+def train(optimizer, configuration, weights, train_data, max_iter=None,
+          target_error=0.0):
+    """Train weights (WeightStructure) by optimizer. Returns report."""
+    X, T = lm.split_samples(train_data, configuration['NumberOfInputUnits'],
+                            weights.get_dtype())
+    if optimizer == 'lm':
+        return train_levenberg_marquardt(configuration, weights, X, T,
+                                         max_iter or 100, target_error)
+    assert optimizer == 'lbfgs'
+    return train_lbfgs(configuration, weights, X, T, max_iter or 500,
+                       target_error)
+
+
+def train_levenberg_marquardt(configuration, weights, X, T, max_iter=100,
+                              target_error=0.0):
+    """Train weights by Levenberg-Marquardt method. Returns report."""
+    MU_INITIAL = 1.0e-3
+    MU_MIN = 1.0e-12
+    MU_MAX = 1.0e10
+    afunc_names = lm.get_afunc_names(configuration)
+    matrices = weights.get_layer_matrices()
+    values = weights.get_values()
+
+    mu = MU_INITIAL
+    err = lm.error(matrices, afunc_names, X, T)
+    report = 'Network training by Levenberg-Marquardt method:\n'
+    report += 'Initial state: g_err={}\n'.format(err)
+    for iteration in range(max_iter):
+        if err <= target_error:
+            break
+        A, g = __get_normal_equations(matrices, afunc_names, X, T,
+                                      len(values))
+        old_values = values.copy()
+        improved = False
+        while mu < MU_MAX:
+            try:
+                delta = numpy.linalg.solve(
+                    A + mu * numpy.eye(len(values)), -g)
+            except numpy.linalg.LinAlgError:
+                mu *= 10.0
+                continue
+            values[:] = old_values + delta
+            new_err = lm.error(matrices, afunc_names, X, T)
+            if new_err < err:
+                mu = max(mu / 10.0, MU_MIN)
+                improved = True
+                break
+            values[:] = old_values
+            mu *= 10.0
+        if not improved:
+            report += 'Error can not be decreased. Stop.\n'
+            break
+        err = new_err
+        report += 'Iteration #{}: g_err={:.6e}, mu={:.1e}\n'.format(
+            iteration, err, mu)
+    weights.mark_changed()
+    report += 'Final state: g_err={}\n'.format(err)
+    return report
+
+
+def __get_normal_equations(matrices, afunc_names, X, T, weights_num):
+    """Return J^T*J and J^T*e accumulated over chunks of samples."""
+    row_size = T.shape[1] * weights_num * 8  # float64 Jacobian of sample
+    chunk = max(1, JACOBIAN_CHUNK_SIZE // row_size)
+    A = numpy.zeros((weights_num, weights_num))
+    g = numpy.zeros(weights_num)
+    for begin in range(0, len(X), chunk):
+        Y, J = lm.jacobian(matrices, afunc_names, X[begin:begin + chunk])
+        J = J.reshape(-1, weights_num).astype(numpy.float64)
+        r = (Y - T[begin:begin + chunk]).reshape(-1).astype(numpy.float64)
+        A += numpy.matmul(J.T, J)
+        g += numpy.matmul(J.T, r)
+    return A, g
+
+
+def train_lbfgs(configuration, weights, X, T, max_iter=500,
+                target_error=0.0, history_size=10):
+    """Train weights by L-BFGS method. Returns report."""
+    C1 = 1.0e-4  # Armijo condition constant
+    MAX_HALVINGS = 40
+    GRAD_TOLERANCE = 1.0e-10
+    afunc_names = lm.get_afunc_names(configuration)
+    matrices = weights.get_layer_matrices()
+    values = weights.get_values()
+    D = ws.WeightStructure(configuration)
+    grad_matrices = D.get_layer_matrices()
+
+    def evaluate():
+        Z = lm.forward(matrices, afunc_names, X)
+        lm.backward(matrices, afunc_names, Z, T, grad_matrices)
+        err = 0.5 * float(numpy.sum((Z[-1] - T)**2, dtype=numpy.float64))
+        return err, D.get_values().astype(numpy.float64)
+
+    err, grad = evaluate()
+    s_list, y_list = [], []
+    report = 'Network training by L-BFGS method:\n'
+    report += 'Initial state: g_err={}\n'.format(err)
+    for iteration in range(max_iter):
+        if err <= target_error or numpy.abs(grad).max() < GRAD_TOLERANCE:
+            break
+        direction = -__lbfgs_direction(grad, s_list, y_list)
+        slope = float(numpy.dot(grad, direction))
+        if slope >= 0.0:  # not a descent direction, history is reset
+            s_list, y_list = [], []
+            direction = -grad
+            slope = float(numpy.dot(grad, direction))
+
+        old_values = values.astype(numpy.float64)
+        step = 1.0
+        for _ in range(MAX_HALVINGS):
+            values[:] = old_values + step * direction
+            new_err, new_grad = evaluate()
+            if new_err <= err + C1 * step * slope:
+                break
+            step *= 0.5
+        else:
+            values[:] = old_values
+            report += 'Error can not be decreased. Stop.\n'
+            break
+
+        s = values.astype(numpy.float64) - old_values
+        y = new_grad - grad
+        if float(numpy.dot(s, y)) > 1.0e-12:
+            s_list.append(s)
+            y_list.append(y)
+            if len(s_list) > history_size:
+                s_list.pop(0)
+                y_list.pop(0)
+        err, grad = new_err, new_grad
+        report += 'Iteration #{}: g_err={:.6e}, step={:.1e}\n'.format(
+            iteration, err, step)
+    weights.mark_changed()
+    report += 'Final state: g_err={}\n'.format(err)
+    return report
+
+
+def __lbfgs_direction(grad, s_list, y_list):
+    """Return product of inverse Hessian approximation and grad."""
+    q = grad.copy()
+    alphas = []
+    for s, y in zip(reversed(s_list), reversed(y_list)):
+        alpha = numpy.dot(s, q) / numpy.dot(y, s)
+        q -= alpha * y
+        alphas.append(alpha)
+    if s_list:
+        q *= numpy.dot(s_list[-1], y_list[-1]) / numpy.dot(y_list[-1],
+                                                           y_list[-1])
+    for (s, y), alpha in zip(zip(s_list, y_list), reversed(alphas)):
+        beta = numpy.dot(y, q) / numpy.dot(y, s)
+        q += (alpha - beta) * s
+    return q
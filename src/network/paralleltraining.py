@@ -0,0 +1,223 @@
+"""Data-parallel training of multilayer perceptron.
+
+Train data is divided into shards and each worker process calculates
+batched gradients on its own shard. Weights, gradients and train data
+are kept in multiprocessing.shared_memory buffers, so nothing except short
+commands is sent between processes. Weights and gradients buffers have
+the layout of WeightStructure (flat array, see WeightStructure), so each
+process views them as layer matrices without copying.
+
+Two variants are available:
+- synchronous: each worker iterates mini-batches of its shard by itself.
+  On every step it writes gradient of its mini-batch to its own row of
+  gradients buffer, then after barrier each worker sums rows of its own
+  slice of weights and updates this slice. Main process only waits for
+  the end of training;
+- asynchronous (Hogwild): each worker trains on its shard independently
+  and updates shared weights in place without any locks.
+Permutation of shard is calculated once per epoch from seed, worker index
+and epoch, so samples of shard are used without replacement.
+If a worker fails, it breaks barrier, so other workers don't wait for it,
+and the original error is raised in main process.
+"""
+
+import multiprocessing
+import threading
+from multiprocessing import shared_memory
+import numpy
+from . import layermath as lm
+from . import weightstructure as ws
+
+# State of worker process, filled by _init_worker:
+_worker = {}
+# Max time of waiting for other workers on barrier (seconds):
+BARRIER_TIMEOUT = 120
+
+
+def train_data_parallel(net, train_data, workers=None, asynchronous=False,
+                        epochs=100, step=0.1, batch_size=32, seed=None):
+    """Train network on train_data by several processes.
+
+    train_data must have format [[f,...], ...]. Gradient of each mini-batch
+    is averaged over its samples. Returns report (string) like
+    NeuralNetwork.train.
+    """
+    assert not net.is_frozen()
+    if workers is None:
+        workers = multiprocessing.cpu_count()
+    config = net.get_configure()
+    inputs_num = config['NumberOfInputUnits']
+    weights = net.get_weights()
+    dtype = weights.get_dtype()
+    data = numpy.asarray(train_data, dtype=dtype)
+    workers = max(1, min(workers, len(data)))
+    weights_num = len(weights)
+    weights_size = weights_num * dtype.itemsize
+    if seed is None:
+        # all epochs and workers need the same base of seeds:
+        seed = numpy.random.SeedSequence().entropy
+
+    shm_w = shared_memory.SharedMemory(create=True, size=weights_size)
+    shm_g = shared_memory.SharedMemory(create=True,
+                                       size=workers * weights_size)
+    shm_d = shared_memory.SharedMemory(create=True, size=data.nbytes)
+    try:
+        shared_weights = ws.WeightStructure(config, buffer=shm_w.buf)
+        shared_weights.set_values(weights.get_values())
+        shared_data = numpy.ndarray(data.shape, dtype, buffer=shm_d.buf)
+        shared_data[:] = data
+        bounds = numpy.linspace(0, len(data), workers + 1).astype(int)
+        shards = [(bounds[n], bounds[n+1]) for n in range(workers)]
+        barrier = multiprocessing.Barrier(workers, timeout=BARRIER_TIMEOUT)
+        init_args = (config, shm_w.name, shm_g.name, shm_d.name, data.shape,
+                     inputs_num, step, batch_size, seed, barrier)
+
+        report = 'Network training by data-parallel {} SGD ({} workers):\n'
+        report = report.format(
+            'asynchronous' if asynchronous else 'synchronous', workers)
+        X, T = data[:, :inputs_num], data[:, inputs_num:]
+        g_err = lm.error(shared_weights.get_layer_matrices(),
+                         lm.get_afunc_names(config), X, T)
+        report += 'Initial state: g_err={}\n'.format(g_err)
+        with multiprocessing.Pool(workers, initializer=_init_worker,
+                                  initargs=init_args) as pool:
+            tasks = [(n, shards, epochs) for n in range(workers)]
+            # each worker gets exactly one task (workers of synchronous
+            # variant wait for each other on barrier):
+            results = [pool.apply_async(_train_shard_async if asynchronous
+                                        else _train_shard_sync, (task,))
+                       for task in tasks]
+            pool.close()
+            __wait_for(results)
+            pool.join()
+        weights.set_values(shared_weights.get_values())
+        g_err = lm.error(shared_weights.get_layer_matrices(),
+                         lm.get_afunc_names(config), X, T)
+        report += 'Final state: g_err={}\n'.format(g_err)
+        del shared_weights, shared_data
+    finally:
+        for shm in (shm_w, shm_g, shm_d):
+            shm.close()
+            shm.unlink()
+    return report
+
+
+def __wait_for(results):
+    """Wait for all tasks and raise the first error of workers.
+
+    Failed worker breaks barrier, so others fail with BrokenBarrierError,
+    it's raised only if there is no other error.
+    """
+    errors = []
+    for result in results:
+        try:
+            result.get()
+        except Exception as e:
+            errors.append(e)
+    errors.sort(key=lambda e: isinstance(e, threading.BrokenBarrierError))
+    if errors:
+        raise errors[0]
+
+
+def _init_worker(config, w_name, g_name, d_name, data_shape, inputs_num,
+                 step, batch_size, seed, barrier):
+    """Attach worker process to shared buffers."""
+    shm_w = shared_memory.SharedMemory(name=w_name)
+    shm_g = shared_memory.SharedMemory(name=g_name)
+    shm_d = shared_memory.SharedMemory(name=d_name)
+    weights = ws.WeightStructure(config, buffer=shm_w.buf)
+    data = numpy.ndarray(data_shape, weights.get_dtype(), buffer=shm_d.buf)
+    _worker['shm'] = (shm_w, shm_g, shm_d)
+    _worker['config'] = config
+    _worker['weights'] = weights.get_values()
+    _worker['matrices'] = weights.get_layer_matrices()
+    _worker['weights_num'] = len(weights)
+    _worker['itemsize'] = weights.get_dtype().itemsize
+    _worker['afunc_names'] = lm.get_afunc_names(config)
+    _worker['X'] = data[:, :inputs_num]
+    _worker['T'] = data[:, inputs_num:]
+    _worker['step'] = step
+    _worker['batch_size'] = batch_size
+    _worker['seed'] = seed
+    _worker['barrier'] = barrier
+
+
+def __get_permutation(worker_idx, shard, epoch):
+    """Return shuffled indices of shard samples for certain epoch."""
+    begin, end = shard
+    rng = numpy.random.default_rng([_worker['seed'], worker_idx, epoch])
+    return begin + rng.permutation(end - begin)
+
+
+def _train_shard_sync(task):
+    """Train shared weights on the worker's shard in step with others.
+
+    All workers make the same number of steps, a worker with exhausted
+    shard writes zero gradient. Each worker reduces gradients of its own
+    slice of weights, so no data is sent to main process.
+    """
+    worker_idx, shards, epochs = task
+    workers = len(shards)
+    matrices = _worker['matrices']
+    afunc_names = _worker['afunc_names']
+    batch_size = _worker['batch_size']
+    step = _worker['step']
+    barrier = _worker['barrier']
+    weights = _worker['weights']
+    grads_buf = _worker['shm'][1].buf
+    all_grads = numpy.ndarray((workers, len(weights)), weights.dtype,
+                              buffer=grads_buf)
+    weights_size = len(weights) * weights.itemsize
+    grads = ws.WeightStructure(
+        _worker['config'], buffer=grads_buf[worker_idx * weights_size:])
+    grad_matrices = grads.get_layer_matrices()
+    bounds = numpy.linspace(0, len(weights), workers + 1).astype(int)
+    own = slice(bounds[worker_idx], bounds[worker_idx + 1])
+    shard_sizes = numpy.array([end - begin for begin, end in shards])
+    steps_num = (shard_sizes.max() + batch_size - 1) // batch_size
+    try:
+        for epoch in range(epochs):
+            permutation = __get_permutation(worker_idx, shards[worker_idx],
+                                            epoch)
+            for batch_idx in range(steps_num):
+                begin = batch_idx * batch_size
+                indices = permutation[begin:begin + batch_size]
+                if len(indices):
+                    X, T = _worker['X'][indices], _worker['T'][indices]
+                    Z = lm.forward(matrices, afunc_names, X)
+                    lm.backward(matrices, afunc_names, Z, T, grad_matrices)
+                else:
+                    grads.get_values()[:] = 0.0
+                # all gradients are written:
+                barrier.wait()
+                samples_num = numpy.clip(shard_sizes - begin, 0,
+                                         batch_size).sum()
+                grad = all_grads[:, own].sum(axis=0, dtype=numpy.float64)
+                grad *= step / samples_num
+                weights[own] -= grad.astype(weights.dtype)
+                # all weights are updated:
+                barrier.wait()
+    except Exception:
+        # other workers mustn't wait for this one on barrier:
+        barrier.abort()
+        raise
+    del grads, grad_matrices, all_grads
+
+
+def _train_shard_async(task):
+    """Train shared weights on the worker's shard without locks."""
+    worker_idx, shards, epochs = task
+    shard = shards[worker_idx]
+    matrices = _worker['matrices']
+    afunc_names = _worker['afunc_names']
+    batch_size = _worker['batch_size']
+    step = _worker['step']
+    for epoch in range(epochs):
+        permutation = __get_permutation(worker_idx, shard, epoch)
+        for begin in range(0, len(permutation), batch_size):
+            indices = permutation[begin:begin + batch_size]
+            X, T = _worker['X'][indices], _worker['T'][indices]
+            Z = lm.forward(matrices, afunc_names, X)
+            grads = lm.backward(matrices, afunc_names, Z, T)
+            for M, G in zip(matrices[1:], grads[1:]):
+                M -= (G * (step / len(indices))).astype(M.dtype)
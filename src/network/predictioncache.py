@@ -0,0 +1,79 @@
+"""Implementation of prediction cache.
+
+Cache keeps outputs of network for recently used inputs. Inputs are
+quantized (rounded to multiple of quantum), so inputs that differ less
+than quantum share one entry. Each entry belongs to certain version of
+model: when version changes, all entries are dropped. The least recently
+used entries are evicted when number of entries or estimated memory
+exceeds limits. Cache can be used from several threads.
+"""
+
+import collections
+import sys
+import threading
+
+
+class PredictionCache():
+    """LRU-cache of network outputs keyed by model version and input."""
+
+    def __init__(self, max_entries=100000, max_bytes=64 * 2**20,
+                 quantum=1.0e-9):
+        """Create empty cache."""
+        self.__max_entries = max_entries
+        self.__max_bytes = max_bytes
+        self.__quantum = quantum
+        self.__entries = collections.OrderedDict()  # key -> [value, size]
+        self.__version = None
+        self.__bytes = 0
+        self.__hits = 0
+        self.__misses = 0
+        self.__lock = threading.Lock()
+
+    def get_key(self, x):
+        """Return key for input x (list of floats)."""
+        return tuple(round(val / self.__quantum) for val in x)
+
+    def get(self, version, key):
+        """Return cached output or None."""
+        with self.__lock:
+            if version != self.__version:
+                self.__reset(version)
+            entry = self.__entries.get(key)
+            if entry is None:
+                self.__misses += 1
+                return None
+            self.__entries.move_to_end(key)
+            self.__hits += 1
+            return list(entry[0])
+
+    def put(self, version, key, value):
+        """Save output for key. Entries of other versions are dropped."""
+        size = (sys.getsizeof(key) + sys.getsizeof(value) +
+                24 * (len(key) + len(value)) + 100)  # with items and node
+        with self.__lock:
+            if version != self.__version:
+                self.__reset(version)
+            if key in self.__entries:
+                return
+            self.__entries[key] = [list(value), size]
+            self.__bytes += size
+            while (len(self.__entries) > self.__max_entries or
+                   self.__bytes > self.__max_bytes):
+                _, [_, evicted_size] = self.__entries.popitem(last=False)
+                self.__bytes -= evicted_size
+
+    def clear(self):
+        """Drop all entries."""
+        with self.__lock:
+            self.__reset(None)
+
+    def get_stats(self):
+        """Return dict with number of entries, memory, hits and misses."""
+        with self.__lock:
+            return {'entries': len(self.__entries), 'bytes': self.__bytes,
+                    'hits': self.__hits, 'misses': self.__misses}
+
+    def __reset(self, version):
+        self.__entries.clear()
+        self.__bytes = 0
+        self.__version = version
@@ -0,0 +1,510 @@
+"""Multilayer perceptron with sparse connectivity of layers.
+
+In NeuralNetwork each unit is connected with each unit of previous layer.
+For wide layers most of these connections are often useless, so here
+layer may be sparse - key 'Connectivity' of its LayersInfo:
+- {"FanIn": k} - each unit is connected with k random units of previous
+  layer (they are chosen with 'Seed' of configuration);
+- {"Connections": [[g, ...], ...]} - explicit lists of connected units of
+  previous layer for each unit (g starts from 1, as in NeuralNetwork).
+Masks may be given to SparseNetwork as well (see SparseNetwork.__init__).
+Layers without 'Connectivity' are fully connected. Bias is always present
+for each unit.
+
+Weights of sparse layer are stored in compressed sparse rows form: biases
+of units, then weights of connections grouped by units; indptr[j-1] -
+position of the first connection of unit j, indices - numbers of units of
+previous layer (from 0). Fully connected layer is stored as matrix, as in
+WeightStructure. All weights are in one flat array.
+
+Forward propagation gathers inputs of connections and sums their products
+with weights by units, backpropagation sums coefficients by units of
+previous layer with the same kernel over connections sorted by these units
+(see _Segments). So absent connections are never stored or touched:
+memory and compute of sparse layer scale with number of its connections.
+"""
+
+import copy
+import itertools
+import numpy
+from . import datapipeline as dp
+from . import initializers
+from . import layermath as lm
+from . import tracing
+from . import weightstructure as ws
+
+CONNECTIVITY = 'Connectivity'
+FAN_IN = 'FanIn'
+CONNECTIONS = 'Connections'
+
+
+def is_sparse(configuration):
+    """Return True if any layer of configuration has sparse connectivity."""
+    return any(CONNECTIVITY in info for info in configuration['LayersInfo'])
+
+
+class _SparseLayer():
+    """Connections of sparse layer and precalculated orders of them."""
+
+    def __init__(self, indptr, indices, prev_units_num):
+        """Create layer, indptr and indices - compressed sparse rows."""
+        # int32 halves memory of indices for any reasonable layer:
+        itype = numpy.int32 if prev_units_num < 2**31 else numpy.int64
+        self.indptr = numpy.asarray(indptr, dtype=numpy.int64)
+        self.indices = numpy.asarray(indices, dtype=itype)
+        units_num = len(indptr) - 1
+        # unit (row) of each connection:
+        self.rows = numpy.repeat(numpy.arange(units_num, dtype=itype),
+                                 numpy.diff(self.indptr))
+        connections = numpy.arange(len(self.indices))
+        # forward propagation - sums over connections of units:
+        self.row_segments = _Segments(self.indptr, self.indices,
+                                      connections, prev_units_num)
+        # backpropagation - sums over connections of units of previous
+        # layer, connections are sorted by these units:
+        order = numpy.argsort(self.indices, kind='stable')
+        col_ptr = numpy.searchsorted(self.indices[order],
+                                     numpy.arange(prev_units_num + 1))
+        self.col_segments = _Segments(col_ptr, self.rows[order], order,
+                                      units_num)
+
+    def get_connections_num(self):
+        """Return number of connections (without biases)."""
+        return len(self.indices)
+
+
+class _Segments():
+    """Sums of products of values and weights by segments of connections.
+
+    Segment r - connections from ptr[r] to ptr[r+1] in given order, for
+    connection c value is taken from column sources[c] of matrix and
+    weight - from weights[connections[c]]. If segments have similar sizes,
+    they are packed into tables [segments][width] (ELLPACK form), short
+    ones are padded by connections with zero value and weight, and sum is
+    one einsum. Otherwise products are summed by numpy.add.reduceat (it's
+    several times slower).
+    """
+
+    def __init__(self, ptr, sources, connections, sources_num):
+        """Create segments (see class description)."""
+        counts = numpy.diff(ptr)
+        connections_num = len(connections)
+        self.__size = len(counts)
+        width = int(counts.max()) if len(counts) else 0
+        self.__packed = width * self.__size <= 2 * connections_num
+        self.__padded = False
+        self.__identity = False
+        if self.__packed:
+            self.__padded = width * self.__size > connections_num
+            segments = numpy.repeat(numpy.arange(self.__size), counts)
+            positions = numpy.arange(connections_num) - numpy.repeat(
+                ptr[:-1], counts)
+            # padding refers to zero column and zero weight:
+            self.__sources = numpy.full((self.__size, width), sources_num,
+                                        dtype=sources.dtype)
+            self.__sources[segments, positions] = sources
+            self.__connections = numpy.full((self.__size, width),
+                                            connections_num,
+                                            dtype=connections.dtype)
+            self.__connections[segments, positions] = connections
+            self.__real = self.__connections < connections_num
+            # for example, fixed fan-in - table is reshaped weights:
+            self.__identity = not self.__padded and numpy.array_equal(
+                self.__connections.reshape(-1),
+                numpy.arange(connections_num))
+        else:
+            nonempty = ptr[:-1] < ptr[1:]
+            self.__nonempty = nonempty
+            self.__starts = ptr[:-1][nonempty]
+            self.__sources = sources
+            self.__connections = connections
+            self.__segment_ids = numpy.repeat(numpy.arange(self.__size),
+                                              counts)
+
+    def gather(self, S):
+        """Return values of connections for matrix S [n][sources].
+
+        Result may be given to sum and to get_weights_gradient.
+        """
+        if self.__padded:
+            S = numpy.concatenate([S, numpy.zeros((len(S), 1), S.dtype)],
+                                  axis=1)
+        return S[:, self.__sources]
+
+    def sum(self, G, weights):
+        """Return matrix [n][segments] of sums for gathered values G."""
+        if self.__packed:
+            return numpy.einsum('nsw,sw->ns', G, self.__get_table(weights))
+        R = numpy.zeros((len(G), self.__size), dtype=G.dtype)
+        if len(self.__starts):
+            P = G * weights[self.__connections]
+            # segment is summed till the next start, so empty ones are
+            # skipped:
+            R[:, self.__nonempty] = numpy.add.reduceat(P, self.__starts,
+                                                       axis=1)
+        return R
+
+    def get_weights_gradient(self, B, G, out):
+        """Write sums over batch of B[n][segment] * G[n][connection].
+
+        It's gradient of sums by weights of connections, if B - matrix of
+        derivatives by sums [n][segments].
+        """
+        if not self.__packed:
+            out[self.__connections] = numpy.einsum(
+                'nc,nc->c', B[:, self.__segment_ids], G)
+            return
+        table = numpy.einsum('ns,nsw->sw', B, G)
+        if self.__identity:
+            out[:] = table.reshape(-1)
+        else:
+            out[self.__connections[self.__real]] = table[self.__real]
+
+    def __get_table(self, weights):
+        """Return weights of connections packed into table."""
+        if self.__identity:
+            return weights.reshape(self.__connections.shape)
+        if self.__padded:
+            weights = numpy.append(weights, 0.0)
+        return weights[self.__connections]
+
+
+def _get_sparse_layer(info, prev_units_num, units_num, mask, rng):
+    """Return _SparseLayer by mask or 'Connectivity', None if it's dense."""
+    if mask is not None:
+        mask = numpy.asarray(mask, dtype=bool)
+        assert mask.shape == (units_num, prev_units_num + 1)
+        connections = mask[:, 1:]
+        indptr = numpy.zeros(units_num + 1, dtype=numpy.int64)
+        numpy.cumsum(connections.sum(axis=1), out=indptr[1:])
+        return _SparseLayer(indptr, numpy.nonzero(connections)[1],
+                            prev_units_num)
+    if CONNECTIVITY not in info:
+        return None
+    connectivity = info[CONNECTIVITY]
+    if FAN_IN in connectivity:
+        fan_in = min(connectivity[FAN_IN], prev_units_num)
+        indices = numpy.empty(units_num * fan_in, dtype=numpy.int64)
+        for j in range(units_num):
+            indices[j * fan_in:(j + 1) * fan_in] = numpy.sort(rng.choice(
+                prev_units_num, fan_in, replace=False))
+        indptr = numpy.arange(units_num + 1, dtype=numpy.int64) * fan_in
+        return _SparseLayer(indptr, indices, prev_units_num)
+    unit_connections = connectivity[CONNECTIONS]
+    assert len(unit_connections) == units_num
+    indptr = [0]
+    indices = []
+    for connections in unit_connections:
+        unique = sorted(set(connections))
+        assert all(1 <= g <= prev_units_num for g in unique)
+        indices += [g - 1 for g in unique]
+        indptr.append(len(indices))
+    return _SparseLayer(indptr, indices, prev_units_num)
+
+
+class SparseNetwork():
+    """Multilayer perceptron with sparse layers (see module description).
+
+    Interface of inference and training is similar to NeuralNetwork and
+    Ensemble; to_network gives equivalent NeuralNetwork (with zero weights
+    of absent connections), for instance, for saving or export.
+    """
+
+    def __init__(self, configuration, masks=None):
+        """Create network, weights are initialized by initializers.
+
+        masks - list of bool matrices (True - connection exists) with
+        shapes of layer matrices (as given by compression.prune, column 0
+        of biases is ignored) or None for each layer, element with index 0
+        is None. Mask of layer overrides its 'Connectivity'.
+        """
+        self.__configuration = copy.deepcopy(configuration)
+        self.__afunc_names = lm.get_afunc_names(configuration)
+        layers = [configuration['NumberOfInputUnits']]
+        layers += [info['NumberOfUnits']
+                   for info in configuration['LayersInfo']]
+        self.__layers = layers
+        rng = numpy.random.default_rng(configuration.get('Seed'))
+        self.__sparse = [None]
+        offsets = [0, 0]
+        for i, info in enumerate(configuration['LayersInfo'], 1):
+            mask = masks[i] if masks is not None else None
+            layer = _get_sparse_layer(info, layers[i-1], layers[i], mask,
+                                      rng)
+            self.__sparse.append(layer)
+            if layer is None:
+                size = layers[i] * (layers[i-1] + 1)
+            else:
+                size = layers[i] + layer.get_connections_num()
+            offsets.append(offsets[-1] + size)
+        self.__offsets = offsets
+        self.__values = numpy.zeros(offsets[-1],
+                                    dtype=ws.get_dtype(configuration))
+        self.__initialize(rng)
+
+    @classmethod
+    def from_network(cls, net, masks=None):
+        """Create sparse network with weights of net kept by masks.
+
+        masks - as in constructor (for instance, from compression.prune),
+        if they aren't given, connectivity of configuration of net is used
+        (it's explicit in networks given by to_network).
+        """
+        sparse = cls(net.get_configure(), masks)
+        matrices = net.get_weights().get_layer_matrices()
+        for i in range(1, len(matrices)):
+            sparse.__set_layer_from_matrix(i, matrices[i])
+        return sparse
+
+    def to_network(self):
+        """Return equivalent NeuralNetwork (copy of weights).
+
+        Weights of absent connections are zero. Connections of sparse
+        layers are written into its configuration explicitly, so saved
+        network may be loaded back by from_network.
+        """
+        from .neuralnetwork import NeuralNetwork
+        configuration = copy.deepcopy(self.__configuration)
+        for i, info in enumerate(configuration['LayersInfo'], 1):
+            layer = self.__sparse[i]
+            if layer is not None:
+                indptr, indices = layer.indptr, (layer.indices + 1).tolist()
+                info[CONNECTIVITY] = {CONNECTIONS: [
+                    indices[indptr[j]:indptr[j+1]]
+                    for j in range(len(indptr) - 1)]}
+        net = NeuralNetwork(configuration)
+        W = net.get_weights()
+        matrices = W.get_layer_matrices()
+        for i in range(1, len(matrices)):
+            matrices[i][:] = self.__get_dense_matrix(i)
+        W.mark_changed()
+        return net
+
+    def get_configure(self):
+        """Return configuration of network."""
+        return self.__configuration
+
+    def get_values(self):
+        """Return flat array with all weights (view, not copy)."""
+        return self.__values
+
+    def get_weights_num(self):
+        """Return number of stored weights (with biases)."""
+        return len(self.__values)
+
+    def get_layer_weights(self, i):
+        """Return weights of layer i (views of flat array).
+
+        Matrix [j-1][g] (as WeightStructure.get_layer_matrix) for fully
+        connected layer, [biases, weights of connections] for sparse one.
+        """
+        return self.__get_views(self.__values, i)
+
+    def get_connections(self, i):
+        """Return [indptr, indices] of sparse layer i, None if it's dense."""
+        layer = self.__sparse[i]
+        if layer is None:
+            return None
+        return [layer.indptr, layer.indices]
+
+    def get_masks(self):
+        """Return masks of layers (as in constructor).
+
+        Mask of sparse layer is bool matrix with shape of layer matrix,
+        it's None for fully connected layer.
+        """
+        masks = [None]
+        for i in range(1, len(self.__layers)):
+            layer = self.__sparse[i]
+            mask = None
+            if layer is not None:
+                mask = numpy.zeros(
+                    (self.__layers[i], self.__layers[i-1] + 1), dtype=bool)
+                mask[:, 0] = True
+                mask[layer.rows, layer.indices + 1] = True
+            masks.append(mask)
+        return masks
+
+    def process_batch(self, X):
+        """Return outputs [n][k] for batch of inputs X [n][k]."""
+        return self.__forward(self.__as_batch(X))[-1]
+
+    def process(self, x):
+        """Return output (list) for one input x (list)."""
+        return self.process_batch([x])[0].tolist()
+
+    def general_error_function(self, data_set, chunk_size=None):
+        """Return error. Data_set must have form [[f,f],...].
+
+        If chunk_size is given, samples are processed by chunks of such
+        size (as in layermath.error).
+        """
+        X, T = lm.split_samples(data_set, self.__layers[0],
+                                self.__values.dtype)
+        return self.__get_error(X, T, chunk_size)
+
+    def __get_error(self, X, T, chunk_size=None):
+        if chunk_size is None:
+            chunk_size = max(len(X), 1)
+        err = 0.0
+        for begin in range(0, len(X), chunk_size):
+            end = begin + chunk_size
+            Y = self.process_batch(X[begin:end])
+            err += float(numpy.sum((Y - T[begin:end])**2,
+                                   dtype=numpy.float64))
+        return 0.5 * err
+
+    def calculate_gradient(self, X, T):
+        """Return flat gradient of error function summed over batch."""
+        grad = numpy.empty_like(self.__values)
+        self.__calculate_gradient(self.__as_batch(X), self.__as_batch(T),
+                                  grad)
+        return grad
+
+    def train(self, train_data, epochs=100, batch_size=32, step=0.1,
+              seed=None, max_iter_num=None, memory_budget=None):
+        """Train network by SGD on shuffled mini-batches. Returns report.
+
+        Gradient of mini-batch is averaged over its samples (as in
+        NeuralNetwork.train). Training is stopped after epochs or after
+        max_iter_num mini-batches, whichever comes first (None - no
+        limit, but one of them must be given).
+        If memory_budget (bytes) is given, error is calculated by chunks
+        of samples to fit it (see network.memory).
+        """
+        assert epochs is not None or max_iter_num is not None
+        X, T = lm.split_samples(train_data, self.__layers[0],
+                                self.__values.dtype)
+        chunk = None
+        if memory_budget is not None:
+            from . import memory
+            chunk = memory.fit_sparse_training(
+                self.__configuration, len(self.__values), len(X),
+                memory_budget, batch_size)
+        report = 'Sparse network training by SGD ({} weights):\n'.format(
+            self.get_weights_num())
+        report += 'Initial error: {}\n'.format(
+            self.__get_error(X, T, chunk))
+        grad = numpy.empty_like(self.__values)
+        iterations = itertools.count()
+        if max_iter_num is not None:
+            iterations = range(max_iter_num)
+        pipeline = dp.BatchPipeline(X, T, batch_size, epochs, seed)
+        with pipeline, tracing.span('SGD', 'training'):
+            for iteration, [_, X_batch, T_batch] in zip(iterations,
+                                                        pipeline):
+                with tracing.sampled_span('gradient', iteration,
+                                          'training'):
+                    self.__calculate_gradient(X_batch, T_batch, grad)
+                with tracing.sampled_span('update', iteration, 'training'):
+                    grad *= step / len(X_batch)
+                    self.__values -= grad
+        report += 'Final error: {}\n'.format(
+            self.__get_error(X, T, chunk))
+        return report
+
+    def __initialize(self, rng):
+        """Initialize weights by initializers of layers."""
+        fan_in = self.__layers[0]
+        for i, info in enumerate(self.__configuration['LayersInfo'], 1):
+            fan_out = info['NumberOfUnits']
+            layer = self.__sparse[i]
+            if layer is None:
+                M = self.get_layer_weights(i)
+                M[:] = initializers.generate(rng, info, fan_in, fan_out,
+                                             M.shape)
+                biases = M[:, 0]
+            else:
+                biases, weights = self.get_layer_weights(i)
+                # real fan-in - mean number of connections of unit:
+                weights[:] = initializers.generate(
+                    rng, info, max(len(weights) / fan_out, 1.0), fan_out,
+                    weights.shape)
+                biases[:] = initializers.generate(rng, info, fan_in, fan_out,
+                                                  biases.shape)
+            if info.get('ZeroBiases', False):
+                biases[:] = 0.0
+            fan_in = fan_out
+
+    def __get_views(self, values, i):
+        """Return views of layer i in flat array with layout of weights."""
+        assert 0 < i < len(self.__layers)
+        block = values[self.__offsets[i]:self.__offsets[i+1]]
+        units_num = self.__layers[i]
+        if self.__sparse[i] is None:
+            return block.reshape(units_num, self.__layers[i-1] + 1)
+        return [block[:units_num], block[units_num:]]
+
+    def __get_dense_matrix(self, i):
+        layer = self.__sparse[i]
+        if layer is None:
+            return self.get_layer_weights(i)
+        biases, weights = self.get_layer_weights(i)
+        M = numpy.zeros((self.__layers[i], self.__layers[i-1] + 1),
+                        dtype=self.__values.dtype)
+        M[:, 0] = biases
+        M[layer.rows, layer.indices + 1] = weights
+        return M
+
+    def __set_layer_from_matrix(self, i, M):
+        layer = self.__sparse[i]
+        if layer is None:
+            self.get_layer_weights(i)[:] = M
+            return
+        biases, weights = self.get_layer_weights(i)
+        biases[:] = M[:, 0]
+        weights[:] = M[layer.rows, layer.indices + 1]
+
+    def __as_batch(self, X):
+        return numpy.asarray(X, dtype=self.__values.dtype)
+
+    def __forward(self, X, gathered=None):
+        """Return list of activations Z[i] [n][units], Z[0] is X.
+
+        If list gathered is given, gathered inputs of connections of sparse
+        layers (None for dense ones) are appended to it for backward.
+        """
+        Z = [X]
+        for i in range(1, len(self.__layers)):
+            layer = self.__sparse[i]
+            G = None
+            if layer is None:
+                M = self.get_layer_weights(i)
+                A = numpy.matmul(Z[-1], M[:, 1:].T)
+                A += M[:, 0]
+            else:
+                biases, weights = self.get_layer_weights(i)
+                G = layer.row_segments.gather(Z[-1])
+                A = layer.row_segments.sum(G, weights)
+                A += biases
+            if gathered is not None:
+                gathered.append(G)
+            Z.append(lm.AFUNCS[self.__afunc_names[i]](A))
+        return Z
+
+    def __calculate_gradient(self, X, T, grad):
+        """Write gradient summed over batch into flat array grad."""
+        gathered = [None]
+        Z = self.__forward(X, gathered)
+        N = len(self.__layers) - 1
+        names = self.__afunc_names
+        B = (Z[N] - T) * lm.AFUNC_DERIVS[names[N]](Z[N])
+        for i in range(N, 0, -1):
+            layer = self.__sparse[i]
+            if layer is None:
+                G = self.__get_views(grad, i)
+                G[:, 0] = B.sum(axis=0, dtype=numpy.float64)
+                numpy.matmul(B.T, Z[i-1], out=G[:, 1:])
+                if i > 1:
+                    B = numpy.matmul(B, self.get_layer_weights(i)[:, 1:])
+            else:
+                grad_biases, grad_weights = self.__get_views(grad, i)
+                grad_biases[:] = B.sum(axis=0, dtype=numpy.float64)
+                layer.row_segments.get_weights_gradient(B, gathered[i],
+                                                        grad_weights)
+                if i > 1:
+                    segments = layer.col_segments
+                    B = segments.sum(segments.gather(B),
+                                     self.get_layer_weights(i)[1])
+            if i > 1:
+                B *= lm.AFUNC_DERIVS[names[i-1]](Z[i-1])
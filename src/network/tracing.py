@@ -0,0 +1,162 @@
+"""Opt-in tracer of execution phases in Chrome trace-event format.
+
+Tracing is disabled by default, then span() returns shared dummy object
+and costs one check of global variable. After start() spans are recorded
+as complete events ('X') with time of begin and duration; nested spans of
+one thread are shown as nested bars. Trace is saved by Tracer.save as
+JSON, which can be opened in Perfetto (ui.perfetto.dev) or
+chrome://tracing.
+
+Hot loops should use sampled_span(name, iteration): span is recorded only
+for each stride-th iteration, so tracing of long runs stays cheap and
+trace stays small.
+
+This module doesn't import heavy modules, so it may be used everywhere.
+"""
+
+import json
+import os
+import threading
+import time
+
+DEFAULT_STRIDE = 100
+
+_tracer = None  # active Tracer
+
+
+class _NullSpan():
+    """Span which records nothing (when tracing is disabled)."""
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+
+_NULL_SPAN = _NullSpan()
+
+
+class _Span():
+    """Span which adds complete event to tracer on exit."""
+
+    __slots__ = ('tracer', 'name', 'category', 'args', 'begin')
+
+    def __init__(self, tracer, name, category, args):
+        self.tracer = tracer
+        self.name = name
+        self.category = category
+        self.args = args
+
+    def __enter__(self):
+        self.begin = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.tracer.add_complete_event(self.name, self.category, self.begin,
+                                       time.perf_counter_ns(), self.args)
+        return False
+
+
+class Tracer():
+    """Collector of trace events."""
+
+    def __init__(self, stride=DEFAULT_STRIDE):
+        """Create tracer, stride - sampling interval for hot loops."""
+        assert stride > 0
+        self.stride = stride
+        self.__events = []
+        self.__origin = time.perf_counter_ns()
+        self.__pid = os.getpid()
+        self.__thread_ids = {}  # thread ident -> small number
+        self.__lock = threading.Lock()
+
+    def span(self, name, category='', args=None):
+        """Return context manager, which records span."""
+        return _Span(self, name, category, args)
+
+    def add_complete_event(self, name, category, begin_ns, end_ns,
+                           args=None):
+        """Add span with given bounds (time.perf_counter_ns)."""
+        event = {'name': name, 'cat': category, 'ph': 'X',
+                 'ts': (begin_ns - self.__origin) / 1000.0,
+                 'dur': (end_ns - begin_ns) / 1000.0,
+                 'pid': self.__pid, 'tid': self.__get_tid()}
+        if args:
+            event['args'] = args
+        self.__events.append(event)  # append is atomic
+
+    def add_counter(self, name, values):
+        """Add counter event, values - dict {series: number}."""
+        self.__events.append({
+            'name': name, 'ph': 'C', 'pid': self.__pid,
+            'ts': (time.perf_counter_ns() - self.__origin) / 1000.0,
+            'args': values})
+
+    def get_events(self):
+        """Return list of recorded events (not copy)."""
+        return self.__events
+
+    def save(self, path):
+        """Write trace to JSON-file in Chrome trace-event format."""
+        events = list(self.__events)
+        with self.__lock:
+            thread_ids = dict(self.__thread_ids)
+        names = {thread.ident: thread.name for thread in threading.enumerate()}
+        for ident, tid in thread_ids.items():
+            events.append({'name': 'thread_name', 'ph': 'M',
+                           'pid': self.__pid, 'tid': tid,
+                           'args': {'name': names.get(ident, str(ident))}})
+        with open(path, 'w') as f:
+            json.dump({'traceEvents': events, 'displayTimeUnit': 'ms'}, f)
+
+    def __get_tid(self):
+        ident = threading.get_ident()
+        tid = self.__thread_ids.get(ident)
+        if tid is None:
+            with self.__lock:
+                tid = self.__thread_ids.setdefault(ident,
+                                                   len(self.__thread_ids))
+        return tid
+
+
+def start(stride=DEFAULT_STRIDE):
+    """Enable tracing, returns new active Tracer."""
+    global _tracer
+    _tracer = Tracer(stride)
+    return _tracer
+
+
+def stop():
+    """Disable tracing, returns Tracer which was active (or None)."""
+    global _tracer
+    tracer, _tracer = _tracer, None
+    return tracer
+
+
+def get_tracer():
+    """Return active Tracer or None."""
+    return _tracer
+
+
+def span(name, category='', **args):
+    """Return context manager, which records span if tracing is enabled."""
+    tracer = _tracer
+    if tracer is None:
+        return _NULL_SPAN
+    return tracer.span(name, category, args)
+
+
+def sampled_span(name, iteration, category=''):
+    """Like span, but records only each stride-th iteration."""
+    tracer = _tracer
+    if tracer is None or iteration % tracer.stride:
+        return _NULL_SPAN
+    return tracer.span(name, category, {'iteration': iteration})
+
+
+def sampled_counter(name, iteration, values):
+    """Add counter event for each stride-th iteration (if enabled)."""
+    tracer = _tracer
+    if tracer is not None and iteration % tracer.stride == 0:
+        tracer.add_counter(name, values)
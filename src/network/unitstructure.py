@@ -9,18 +9,16 @@ j - index of unit (starts from 0)
 and it provides methods for forward and reverse iteration.
 """
 
-import random
+import bisect
 
 
 class UnitIterator():
     """Iterator for WeightSturcture."""
 
-    __internal_array = []
-    __counter = -1
-
-    def __init__(self, internal_array):
+    def __init__(self, structure):
         """Create iterator."""
-        self.__internal_array = internal_array
+        self.__structure = structure
+        self.__counter = -1
 
     def __iter__(self):
         """Return oneself."""
@@ -28,22 +26,19 @@ class UnitIterator():
 
     def __next__(self):
         """Return next element - [value, [i, j]]."""
-        result = []
         self.__counter += 1
-        try:
-            result = self.__internal_array[self.__counter]
-        except IndexError:
+        if self.__counter >= len(self.__structure):
             raise StopIteration
-        else:
-            return result
+        return self.__structure[self.__counter]
 
 
 class UnitStructure():
-    """Structure for management of values that corresponding with units."""
+    """Structure for management of values that corresponding with units.
 
-    __index_map = []
-    __internal_array = []
-    __layers = []
+    All values are stored in one flat sequence grouped by layers. Position
+    of value in this sequence is calculated arithmetically. Output layer
+    has no imagine unit, so it is not stored.
+    """
 
     def __init__(self, configuration):
         """Create structure without initialization of weights."""
@@ -56,20 +51,15 @@ class UnitStructure():
         for info in configuration['LayersInfo']:
             layers.append(info['NumberOfUnits'] + 1)
 
-        index_map = []
-        internal_array = []
-        idx = 0
-        for i, units_num in enumerate(layers):
-            index_map.append([None]*(units_num))
-            for j in range(units_num):
-                if i == (len(layers) - 1) and j == 0:
-                    continue
-                internal_array.append([None, [i, j]])
-                index_map[i][j] = idx
-                idx += 1
-        self.__index_map = index_map
-        self.__internal_array = internal_array
+        # offsets[i] - position of unit [i, 0] in flat sequence. For output
+        # layer it is shifted by one, because its imagine unit is skipped:
+        offsets = [0]
+        for units_num in layers[:-1]:
+            offsets.append(offsets[-1] + units_num)
+        offsets[-1] -= 1
         self.__layers = layers
+        self.__offsets = offsets
+        self.__values = [None] * (offsets[-1] + layers[-1])
 
     def get_layers(self):
         """Return list with numbers of units on each layer.
@@ -83,36 +73,39 @@ class UnitStructure():
         """Return num of layers. Includes input and output layers."""
         return len(self.__layers)
 
+    def __get_idx(self, i, j):
+        """Return position of unit [i, j] in flat sequence."""
+        if not (0 <= i < len(self.__layers) and 0 <= j < self.__layers[i]):
+            raise AssertionError
+        return self.__offsets[i] + j
+
+    def __get_ij(self, idx):
+        """Return indices [i, j] of unit by its position."""
+        i = bisect.bisect_right(self.__offsets, idx) - 1
+        if i == len(self.__layers) - 1 and idx == self.__offsets[i]:
+            i -= 1  # it is the last unit of previous layer
+        return [i, idx - self.__offsets[i]]
+
     def init_imagine_units(self):
         """Initilize imagine units (zero unit on layer with value = 1)."""
-        for i, layer in enumerate(self.__index_map):
-            if i == (len(self.__index_map) - 1):
-                continue
-            idx = layer[0]
-            _, ij = self.__internal_array[idx]
-            self.__internal_array[idx] = [1, ij]
+        for i in range(len(self.__layers) - 1):
+            self.__values[self.__offsets[i]] = 1
 
     def get_elt(self, i, j):
         """Get element by index."""
-        idx = None
-        try:
-            idx = self.__index_map[i][j]
-        except IndexError:
-            raise AssertionError
-        if idx is None:
+        if i == len(self.__layers) - 1 and j == 0:
+            self.__get_idx(i, j)  # check of indices
             return None
-        value, _ = self.__internal_array[idx]
-        return value
+        return self.__values[self.__get_idx(i, j)]
 
     def set_elt(self, i, j, value):
         """Set element by index."""
         assert j != 0
-        idx = self.__index_map[i][j]
-        self.__internal_array[idx] = [value, [i, j]]
+        self.__values[self.__get_idx(i, j)] = value
 
     def __iter__(self):
         """Return inerator. It provides all units as one sequence."""
-        return UnitIterator(self.__internal_array)
+        return UnitIterator(self)
 
     def get_string(self, colored=False):
         """Return graceful string representation of unit structure.
@@ -121,11 +114,11 @@ class UnitStructure():
         corresponding argument set to True.
         """
         res = ''
-        for i, layer in enumerate(self.__index_map):
-            for j, idx in enumerate(layer):
-                if idx is None:
+        for i, units_num in enumerate(self.__layers):
+            for j in range(units_num):
+                if i == len(self.__layers) - 1 and j == 0:
                     continue
-                value, _ = self.__internal_array[idx]
+                value = self.get_elt(i, j)
                 if value:
                     str_val = '{:<10.5f}'.format(value)
                 else:
@@ -142,38 +135,29 @@ class UnitStructure():
 
     def __len__(self):
         """Return length of weights sequence."""
-        return len(self.__internal_array)
+        return len(self.__values)
 
     def __getitem__(self, idx):
         """Return tuple [value, [i, j, g]]."""
-        return self.__internal_array[idx]
+        if idx < 0:
+            idx += len(self.__values)
+        value = self.__values[idx]
+        return [value, self.__get_ij(idx)]
 
     def get_input_layer(self):
         """Return all values for input layer (without imagine unit)."""
-        indices = self.__index_map[0]
-        indices.pop(0)
-        return list(map(lambda idx: self.__internal_array[idx][0], indices))
+        return self.__values[1:self.__layers[0]]
 
     def set_input_layer(self, input_arr):
         """Set values for input layer (input - without imagine unit)."""
-        unit_indices = self.__index_map[0]
-        assert len(input_arr) == (len(unit_indices) - 1)
-        for j, idx in enumerate(unit_indices):
-            if j == 0:
-                continue
-            self.__internal_array[idx] = input_arr[j-1]
+        assert len(input_arr) == (self.__layers[0] - 1)
+        self.__values[1:self.__layers[0]] = input_arr
 
     def get_output_layer(self):
         """Return all values for output layer (without imagine unit)."""
-        indices = self.__index_map[-1]
-        indices.pop(0)
-        return list(map(lambda idx: self.__internal_array[idx][0], indices))
+        return self.__values[self.__offsets[-1] + 1:]
 
     def set_output_layer(self, output_arr):
         """Set values for ouput layer (output - without imagine unit)."""
-        unit_indices = self.__index_map[-1]
-        assert len(output_arr) == (len(unit_indices) - 1)
-        for j, idx in enumerate(unit_indices):
-            if j == 0:
-                continue
-            self.__internal_array[idx] = output_arr[j-1]
+        assert len(output_arr) == (self.__layers[-1] - 1)
+        self.__values[self.__offsets[-1] + 1:] = output_arr
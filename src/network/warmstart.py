@@ -0,0 +1,149 @@
+"""Warm start of training from weights of previous model.
+
+If topology of new network is the same as of the previous model, weights
+are simply copied. Otherwise the network may be grown from the previous
+one (Net2Net): new network starts from the same function as previous
+one, so training continues instead of starting from scratch.
+Allowed changes:
+- hidden layer is widened: new units are copies of random units of the
+  layer, outgoing weights of copied unit are split between it and its
+  copies. Split is random (but sum is the same), so copies get different
+  gradients and become different during training;
+- hidden layer is inserted: it has at least as many units as previous
+  layer and 'linear' or 'tanh' activation function. It's initialized as
+  identity (then widened, if required). tanh is not identity, so inserted
+  tanh-layer calculates tanh(s * z) / s (weights of its next layer are
+  divided by s), which is identity up to (s * z)^2 / 3 for small s.
+Number of inputs, number of outputs and activation functions of existing
+layers can't be changed.
+"""
+
+import numpy
+
+INSERTED_AFUNCS = ('linear', 'tanh')
+TANH_INSERT_SCALE = 0.01  # s for inserted tanh-layers (see above)
+
+
+def is_same_topology(configuration, other):
+    """Return True if networks have the same layers."""
+    return __get_layers(configuration) == __get_layers(other)
+
+
+def warm_start(net, configuration, weights, seed=None):
+    """Initialize net by weights (flat sequence) of previous model.
+
+    configuration - configuration of previous model. Returns None or
+    error-string, if net can't be grown from previous model.
+    """
+    new_config = net.get_configure()
+    W = net.get_weights()
+    if is_same_topology(new_config, configuration):
+        W.set_values(weights)
+        return None
+
+    old_layers = __get_layers(configuration)
+    new_layers = __get_layers(new_config)
+    error, mapping = __get_mapping(old_layers, new_layers)
+    if error:
+        return error
+    matrices = __split_weights(old_layers, weights)
+    rng = numpy.random.default_rng(seed)
+    # 1. insert identity layers, so numbers of layers become the same:
+    for i in range(1, len(new_layers)):
+        if mapping[i] is None:
+            __insert_layer(matrices, i, new_layers[i][1])
+    # 2. widen layers to required number of units:
+    for i in range(1, len(new_layers) - 1):
+        units = new_layers[i][0]
+        if len(matrices[i]) < units:
+            __widen_layer(matrices, i, units, rng)
+    for M, M_new in zip(W.get_layer_matrices()[1:], matrices[1:]):
+        M[:] = M_new
+    W.mark_changed()
+    return None
+
+
+def __get_layers(configuration):
+    """Return list of [units, activation function] for all layers."""
+    layers = [[configuration['NumberOfInputUnits'], None]]
+    for info in configuration['LayersInfo']:
+        layers.append([info['NumberOfUnits'], info['ActivationFunction']])
+    return layers
+
+
+def __get_mapping(old_layers, new_layers):
+    """Match layers of new network to old ones.
+
+    Returns error-string and list with index of old layer for each new
+    layer (None for inserted layers).
+    """
+    if old_layers[0] != new_layers[0]:
+        return 'Number of inputs is changed', []
+    if old_layers[-1] != new_layers[-1]:
+        return 'Output layer is changed', []
+    mapping = [0]
+    p = 1
+    for i in range(1, len(new_layers) - 1):
+        units, afunc = new_layers[i]
+        old_left = len(old_layers) - 1 - p
+        new_left = len(new_layers) - 1 - i
+        if (old_left > 0 and afunc == old_layers[p][1] and
+                units >= old_layers[p][0]):
+            mapping.append(p)
+            p += 1
+        elif new_left > old_left and afunc in INSERTED_AFUNCS:
+            mapping.append(None)
+        else:
+            return 'Layer #{} can\'t be grown from previous model'.format(
+                i), []
+        prev_units = new_layers[i-1][0]
+        if mapping[-1] is None and units < prev_units:
+            return 'Inserted layer #{} is narrower than previous'.format(
+                i), []
+    if p != len(old_layers) - 1:
+        return 'Hidden layers of previous model are removed', []
+    mapping.append(p)
+    return None, mapping
+
+
+def __split_weights(layers, weights):
+    """Return list of layer matrices (float64 copies) from flat weights."""
+    values = numpy.asarray(weights, dtype=numpy.float64)
+    matrices = [None]
+    offset = 0
+    for i in range(1, len(layers)):
+        shape = (layers[i][0], layers[i-1][0] + 1)
+        size = shape[0] * shape[1]
+        matrices.append(values[offset:offset + size].reshape(shape).copy())
+        offset += size
+    assert offset == len(values)
+    return matrices
+
+
+def __insert_layer(matrices, i, afunc):
+    """Insert identity layer before matrices[i]."""
+    units = matrices[i].shape[1] - 1  # units of layer i-1
+    scale = TANH_INSERT_SCALE if afunc == 'tanh' else 1.0
+    M = numpy.zeros((units, units + 1))
+    M[:, 1:] = numpy.eye(units) * scale
+    matrices[i][:, 1:] /= scale
+    matrices.insert(i, M)
+
+
+def __widen_layer(matrices, i, units, rng):
+    """Add copies of random units to layer i (see module description)."""
+    M, M_next = matrices[i], matrices[i+1]
+    old_units = len(M)
+    sources = numpy.concatenate([numpy.arange(old_units),
+                                 rng.integers(0, old_units,
+                                              units - old_units)])
+    # random shares of outgoing weights, their sum for each source is 1:
+    shares = rng.uniform(0.5, 1.5, units)
+    totals = numpy.zeros(old_units)
+    numpy.add.at(totals, sources, shares)
+    shares /= totals[sources]
+    matrices[i] = M[sources]
+    M_new_next = numpy.empty((len(M_next), units + 1))
+    M_new_next[:, 0] = M_next[:, 0]
+    M_new_next[:, 1:] = M_next[:, 1:][:, sources] * shares
+    matrices[i+1] = M_new_next
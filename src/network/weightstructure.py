@@ -12,18 +12,35 @@ g - index of weight (starts from 0)
 and it provides methods for forward and reverse iteration.
 """
 
-import random
+import bisect
+import numpy
+
+
+def get_weights_num(configuration):
+    """Return number of weights for network with certain configuration."""
+    num = 0
+    prev_units_num = configuration['NumberOfInputUnits']
+    for info in configuration['LayersInfo']:
+        num += info['NumberOfUnits'] * (prev_units_num + 1)
+        prev_units_num = info['NumberOfUnits']
+    return num
+
+
+def get_dtype(configuration):
+    """Return numpy dtype of weights for certain configuration.
+
+    Precision is set by optional key 'Precision' ('float64' by default).
+    """
+    return numpy.dtype(configuration.get('Precision', 'float64'))
 
 
 class WeightIterator():
     """Iterator for WeightSturcture."""
 
-    __internal_array = []
-    __counter = -1
-
-    def __init__(self, internal_array):
+    def __init__(self, structure):
         """Create iterator."""
-        self.__internal_array = internal_array
+        self.__structure = structure
+        self.__counter = -1
 
     def __iter__(self):
         """Return oneself."""
@@ -31,14 +48,10 @@ class WeightIterator():
 
     def __next__(self):
         """Return next element - [value, [i, j, g]]."""
-        result = []
         self.__counter += 1
-        try:
-            result = self.__internal_array[self.__counter]
-        except IndexError:
+        if self.__counter >= len(self.__structure):
             raise StopIteration
-        else:
-            return result
+        return self.__structure[self.__counter]
 
 
 class WeightStructure():
@@ -47,13 +60,28 @@ class WeightStructure():
     Weights structure is pretty complex and if we use standard list for it
     - iteration will be very long and complex. On the other hand - sometimes
     access by index is also required. This class provides both ways of access.
+
+    All weights are stored in one flat numpy-array grouped by layers, units
+    and connections ([i, j, g] with g changing fastest). Position of weight
+    in this array is calculated arithmetically, so construction doesn't
+    require building of any index tables. Weights of each layer occupy
+    contiguous block of array, that can be viewed as matrix for vectorized
+    calculations (see get_layer_matrix).
+
+    Structure counts changes of weights (see get_version). Changes made
+    through views (get_values, get_layer_matrix) must be reported by
+    mark_changed.
     """
 
-    __index_map = []
-    __internal_array = []
+    def __init__(self, configuration, buffer=None):
+        """Create structure without initialization of weights.
 
-    def __init__(self, configuration):
-        """Create structure without initialization of weights."""
+        If buffer is given (object with buffer protocol, for instance -
+        multiprocessing.shared_memory.SharedMemory.buf), weights are stored
+        in it and it's not copied. Its size must be at least
+        get_weights_num(configuration) * get_dtype(configuration).itemsize
+        bytes.
+        """
         # This structure can be used for another purposes, for instance - for
         # error function derivatives with regard of weights. That's why
         # initialization in constructor is redundant.
@@ -63,57 +91,105 @@ class WeightStructure():
         for info in configuration['LayersInfo']:
             layers.append(info['NumberOfUnits'])
 
-        idx = 0
-        index_map = []
-        internal_array = []
-        for _, units_num in enumerate(layers):
-            index_map.append([None]*(units_num + 1))
-        for i in range(1, len(index_map)):
-            for j in range(1, len(index_map[i])):
-                unit_indices = []
-                for g in range(len(index_map[i-1])):
-                    unit_indices.append(idx)
-                    internal_array.append([None, [i, j, g]])
-                    idx += 1
-                index_map[i][j] = unit_indices
-        self.__index_map = index_map
-        self.__internal_array = internal_array
-
-    def random_initialization(self):
-        """Init all weights randomly."""
-        COEFF = 1.0
-        for idx, [_, ijg] in enumerate(self.__internal_array):
-            self.__internal_array[idx] = [random.random() * COEFF, ijg]
+        # offsets[i] - position of first weight of layer i in flat sequence,
+        # offsets[0] is unused because input layer has no weights:
+        offsets = [0, 0]
+        for i in range(1, len(layers)):
+            offsets.append(offsets[-1] + layers[i] * (layers[i-1] + 1))
+        self.__layers = layers
+        self.__offsets = offsets
+        self.__version = 0
+        dtype = get_dtype(configuration)
+        if buffer is None:
+            self.__values = numpy.zeros(offsets[-1], dtype=dtype)
+        else:
+            self.__values = numpy.ndarray(offsets[-1], dtype=dtype,
+                                          buffer=buffer)
+
+    def __get_idx(self, i, j, g):
+        """Return position of weight [i, j, g] in flat sequence."""
+        layers = self.__layers
+        if not (0 < i < len(layers) and 0 < j <= layers[i]
+                and 0 <= g <= layers[i-1]):
+            raise AssertionError
+        return self.__offsets[i] + (j - 1) * (layers[i-1] + 1) + g
+
+    def __get_ijg(self, idx):
+        """Return indices [i, j, g] of weight by its position."""
+        i = bisect.bisect_right(self.__offsets, idx, 1) - 1
+        j, g = divmod(idx - self.__offsets[i], self.__layers[i-1] + 1)
+        return [i, j + 1, g]
+
+    def get_layers(self):
+        """Return list with numbers of units on each layer.
+
+        Imagine units are not included.
+        """
+        return self.__layers
 
     def get_elt(self, i, j, g):
         """Get element by index."""
-        idx = None
-        try:
-            idx = self.__index_map[i][j][g]
-        except IndexError:
-            raise AssertionError
-        value, _ = self.__internal_array[idx]
-        return value
+        return float(self.__values[self.__get_idx(i, j, g)])
 
     def get_unit_elts(self, i, j):
         """Return list of weights for corresponding unit."""
-        unit_indices = self.__index_map[i][j]
-        result = []
-        for idx in unit_indices:
-            result.append(self.__internal_array[idx])
-        return result
+        begin = self.__get_idx(i, j, 0)
+        values = self.__values[begin:begin + self.__layers[i-1] + 1].tolist()
+        return [[w, [i, j, g]] for g, w in enumerate(values)]
 
     def set_elt(self, i, j, g, value):
         """Set element by index."""
-        idx = self.__index_map[i][j][g]
-        self.__internal_array[idx] = [value, [i, j, g]]
+        self.__values[self.__get_idx(i, j, g)] = value
+        self.__version += 1
+
+    def get_layer_matrix(self, i):
+        """Return weights of layer i as matrix [j-1][g].
+
+        Matrix is a view of internal array, so changes of matrix change
+        structure. Column 0 contains weights of imagine unit (bias).
+        """
+        assert 0 < i < len(self.__layers)
+        block = self.__values[self.__offsets[i]:self.__offsets[i+1]]
+        return block.reshape(self.__layers[i], self.__layers[i-1] + 1)
+
+    def get_layer_matrices(self):
+        """Return list of matrices for all layers (see get_layer_matrix).
+
+        Element with index 0 is None, because input layer has no weights.
+        """
+        matrices = [None]
+        for i in range(1, len(self.__layers)):
+            matrices.append(self.get_layer_matrix(i))
+        return matrices
+
+    def get_dtype(self):
+        """Return numpy dtype of weights."""
+        return self.__values.dtype
+
+    def get_values(self):
+        """Return flat array with all weights (view, not copy)."""
+        return self.__values
+
+    def set_values(self, values):
+        """Set all weights from flat sequence in order of iteration."""
+        assert len(values) == len(self.__values)
+        self.__values[:] = values
+        self.mark_changed()
+
+    def mark_changed(self):
+        """Report that weights were changed (for instance, through views)."""
+        self.__version += 1
+
+    def get_version(self):
+        """Return counter of changes of weights."""
+        return self.__version
 
     def __iter__(self):
         """Return inerator.
 
         It provides all weights in structure as one sequence.
         """
-        return WeightIterator(self.__internal_array)
+        return WeightIterator(self)
 
     def get_string(self, colored=False):
         """Return graceful string representation of weights structure.
@@ -122,13 +198,12 @@ class WeightStructure():
         corresponding argument set to True.
         """
         res = ''
-        imap = self.__index_map
-        for i in range(1, len(imap)):
-            for j in range(1, len(imap[i])):
+        layers = self.__layers
+        for i in range(1, len(layers)):
+            for j in range(1, layers[i] + 1):
                 res += 'U#{}-{}:  '.format(i, j)
-                for g in range(len(imap[i][j])):
-                    idx = imap[i][j][g]
-                    value, _ = self.__internal_array[idx]
+                for g in range(layers[i-1] + 1):
+                    value = self.get_elt(i, j, g)
                     if value:
                         str_val = '{:<10.5f}'.format(value)
                     else:
@@ -145,8 +220,11 @@ class WeightStructure():
 
     def __len__(self):
         """Return length of weights sequence."""
-        return len(self.__internal_array)
+        return len(self.__values)
 
     def __getitem__(self, idx):
         """Return tuple [value, [i, j, g]]."""
-        return self.__internal_array[idx]
+        if idx < 0:
+            idx += len(self.__values)
+        value = float(self.__values[idx])
+        return [value, self.__get_ijg(idx)]
@@ -0,0 +1,64 @@
+"""Some tests for backgroundloader."""
+
+import time
+from backgroundloader import BackgroundLoader
+
+
+class __FakeRoot():
+    """Root, which runs callbacks of after by explicit call of run."""
+
+    def __init__(self):
+        self.callbacks = []
+
+    def after(self, ms, callback):
+        self.callbacks.append(callback)
+
+    def run(self):
+        while self.callbacks:
+            time.sleep(0.01)
+            self.callbacks.pop(0)()
+
+
+class __FakeControls():
+    """Controls, which only remember their state."""
+
+    def __init__(self):
+        self.busy = False
+        self.labels = set()
+
+    def set_cancel_button_callback(self, callback):
+        pass
+
+    def set_busy(self, busy):
+        self.busy = busy
+
+    def set_progress(self, fraction, label='Loading'):
+        self.labels.add(label)
+
+
+def __load(value, progress=None, cancel_event=None):
+    return None, value
+
+
+def __fail(value, progress=None, cancel_event=None):
+    raise ValueError('wrong value ' + str(value))
+
+
+def test_failed_job():
+    """Check that exception of job is reported and loader is reusable."""
+    root, controls = __FakeRoot(), __FakeControls()
+    results, errors = [], []
+    loader = BackgroundLoader(root, controls, errors.append)
+    try:
+        loader.load([[__load, [1]], [__fail, [2]]], results.append)
+        assert controls.busy
+        root.run()
+        assert errors == ['Background job failed: ValueError: wrong value 2']
+        assert results == [] and not loader.is_busy() and not controls.busy
+
+        loader.load([[__load, [3]]], results.append, 'Training')
+        root.run()
+        assert results == [[(None, 3)]] and len(errors) == 1
+        assert controls.labels == {'Loading', 'Training'}
+    finally:
+        loader.shutdown()
@@ -0,0 +1,85 @@
+"""Some tests for codegen."""
+
+import json
+import pathlib
+import subprocess
+import sys
+import numpy
+from network import codegen
+from network.neuralnetwork import NeuralNetwork
+
+
+def __get_config():
+    config = {}
+    config['NumberOfInputUnits'] = 2
+    config['LayersInfo'] = [
+        {"NumberOfUnits": 3, "ActivationFunction": "tanh"},
+        {"NumberOfUnits": 2, "ActivationFunction": "sigmoid"},
+        {"NumberOfUnits": 2, "ActivationFunction": "linear"}]
+    return config
+
+
+def __check_kernels(unrolled):
+    net = NeuralNetwork(__get_config())
+    sample = [[0.5, -0.2], [0.3, 0.1]]
+    y = net.process(sample[0])
+    D = net._calculate_gradient_by_backpropagation(sample)
+    net.compile(unrolled=unrolled)
+    assert net.is_compiled()
+    assert numpy.allclose(net.process(sample[0]), y)
+    D_compiled = net._calculate_gradient_by_backpropagation(sample)
+    assert numpy.allclose(D_compiled.get_values(), D.get_values())
+
+
+def test_unrolled_kernels():
+    """Check that unrolled kernels give the same results as generic code."""
+    __check_kernels(True)
+
+
+def test_fused_kernels():
+    """Check that layer-fused kernels give the same results."""
+    __check_kernels(False)
+
+
+def test_disk_cache(tmp_path):
+    """Check that compiled kernels are saved, checked and reused."""
+    config = __get_config()
+    kernels = codegen.get_kernels(config, tmp_path)
+    [path] = tmp_path.glob('kernels_*.bin')
+    assert path.with_suffix('.py').read_text() == kernels.source
+    assert codegen.get_kernels(config, tmp_path) is kernels
+    content = path.read_bytes()
+
+    # wrong files are not used and are rewritten:
+    wrong = [content[:-1] + bytes([content[-1] ^ 1]),
+             b'\0\0\0\0' + content[4:], content[:20]]
+    for data in wrong:
+        path.write_bytes(data)
+        codegen._kernels_cache.clear()
+        loaded = codegen.get_kernels(config, tmp_path)
+        assert loaded is not kernels
+        assert loaded.source == kernels.source
+        assert path.read_bytes()[:36] == content[:36]
+    assert list(tmp_path.glob('*.tmp')) == []
+
+    # other process loads kernels without generation and compilation:
+    code = ('import sys, json, numpy; from network import codegen; '
+            'vars(codegen)["__generate_unrolled"] = None; '
+            'vars(codegen)["__generate_fused"] = None; '
+            'codegen.compile = None; '
+            'k = codegen.get_kernels(json.loads(sys.argv[1]), sys.argv[2]); '
+            'print(k.forward(numpy.linspace(-1.0, 1.0, 23), [0.5, -0.2])[0])')
+    content = path.read_bytes()
+    result = subprocess.run(
+        [sys.executable, '-c', code, json.dumps(config), str(tmp_path)],
+        cwd=pathlib.Path(codegen.__file__).parents[1], capture_output=True,
+        text=True, check=True)
+    w = numpy.linspace(-1.0, 1.0, 23)
+    assert float(result.stdout) == kernels.forward(w, [0.5, -0.2])[0]
+    assert path.read_bytes() == content
+
+    config['Precision'] = 'float32'
+    assert codegen.get_kernels(config, tmp_path).key != kernels.key
+    del config['Precision']
+    config['LayersInfo'][0]['ActivationFunction'] = 'sigmoid'
+    assert codegen.get_kernels(config, tmp_path).key != kernels.key
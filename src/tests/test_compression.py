@@ -0,0 +1,87 @@
+"""Some tests for compression."""
+
+import numpy
+from network import compression
+from network.neuralnetwork import NeuralNetwork
+
+
+def __get_config():
+    config = {}
+    config['NumberOfInputUnits'] = 2
+    config['LayersInfo'] = [
+        {"NumberOfUnits": 8, "ActivationFunction": "tanh"},
+        {"NumberOfUnits": 6, "ActivationFunction": "sigmoid"},
+        {"NumberOfUnits": 2, "ActivationFunction": "linear"}]
+    config['Seed'] = 1
+    return config
+
+
+def __get_data(n=200):
+    X = numpy.random.default_rng(0).uniform(-1.0, 1.0, (n, 2))
+    T = numpy.stack([X[:, 0] * X[:, 1], numpy.sin(X[:, 0])], axis=1)
+    return numpy.concatenate([X, T], axis=1)
+
+
+def test_prune_and_fine_tune():
+    """Check sparsity of pruned weights and keeping of masks."""
+    net = NeuralNetwork(__get_config())
+    masks = compression.prune(net, 0.5)
+    for M, mask in zip(net.get_weights().get_layer_matrices()[1:],
+                       masks[1:]):
+        assert (~mask[:, 1:]).sum() == M[:, 1:].size // 2
+        assert not M[~mask].any()
+        assert mask[:, 0].all()
+    compression.fine_tune(net, masks, __get_data(), max_iter_num=200,
+                          batch_size=8, seed=0)
+    for M, mask in zip(net.get_weights().get_layer_matrices()[1:],
+                       masks[1:]):
+        assert not M[~mask].any()
+
+
+def test_fine_tuning_error():
+    """Check that fine-tuning restores error of unpruned network."""
+    config = {'NumberOfInputUnits': 1, 'Seed': 1, 'LayersInfo': [
+        {"NumberOfUnits": 16, "ActivationFunction": "tanh"},
+        {"NumberOfUnits": 1, "ActivationFunction": "linear"}]}
+    xs = numpy.linspace(-1.0, 1.0, 50)
+    data = numpy.stack([xs, numpy.sin(2.0 * xs)], axis=1)
+    net = NeuralNetwork(config)
+    net.train(data, batch_size=10, max_iter_num=3000, seed=0)
+    error = net.general_error_function(data)
+    masks = compression.prune(net, 0.6)
+    assert net.general_error_function(data) > 50 * error
+    compression.fine_tune(net, masks, data, max_iter_num=3000,
+                          batch_size=10, seed=0)
+    assert net.general_error_function(data) < 3 * error
+
+
+def test_shrink():
+    """Check that removal of useless units doesn't change outputs."""
+    net = NeuralNetwork(__get_config())
+    W = net.get_weights()
+    W.get_layer_matrix(1)[2, 1:] = 0.0  # constant unit
+    W.get_layer_matrix(2)[:, 4] = 0.0  # unit without outgoing connections
+    W.get_layer_matrix(3)[:, 3] = 0.0
+    W.mark_changed()
+    shrunk = compression.shrink(net)
+    units = [info['NumberOfUnits']
+             for info in shrunk.get_configure()['LayersInfo']]
+    assert units == [6, 5, 2]
+    X = __get_data()[:, :2]
+    assert numpy.allclose(shrunk.process_batch(X), net.process_batch(X))
+
+
+def test_quantization(tmp_path):
+    """Check accuracy, size and saving of quantized network."""
+    net = NeuralNetwork(__get_config())
+    quantized = compression.quantize(net)
+    data = __get_data()
+    result = compression.compare(net, quantized, data)
+    assert result['max_output_delta'] < 0.05
+    assert abs(result['error_delta']) < 0.01 * result['original_error']
+    assert quantized.get_size() * 4 < net.get_weights().get_values().nbytes
+    path = tmp_path / 'quantized.npz'
+    quantized.save(path)
+    loaded = compression.load_quantized(path)
+    assert numpy.array_equal(loaded.process_batch(data[:, :2]),
+                             quantized.process_batch(data[:, :2]))
@@ -0,0 +1,34 @@
+"""Some tests for crossvalidation."""
+
+from network import crossvalidation
+
+
+def __get_config():
+    config = {}
+    config['NumberOfInputUnits'] = 1
+    config['LayersInfo'] = [
+        {"NumberOfUnits": 4, "ActivationFunction": "tanh"},
+        {"NumberOfUnits": 1, "ActivationFunction": "linear"}]
+    config['Seed'] = 2
+    return config
+
+
+def __get_data():
+    return [[x / 50.0 - 1.0, 0.5 * (x / 50.0 - 1.0)**3] for x in range(101)]
+
+
+def test_cross_validation():
+    """Check folds of cross-validation and reproducibility of results."""
+    results = [crossvalidation.cross_validate(
+        __get_config(), __get_data(), folds=4, workers=2, seed=1,
+        batch_size=4, max_iter_num=300) for _ in range(2)]
+    result = results[0]
+    assert [fold['fold'] for fold in result['folds']] == [0, 1, 2, 3]
+    sizes = [fold['validation_size'] for fold in result['folds']]
+    assert sum(sizes) == 101
+    for fold in result['folds']:
+        assert fold['train_size'] + fold['validation_size'] == 101
+        assert fold['validation_error'] >= 0.0
+    assert (result['mean_validation_error'] ==
+            results[1]['mean_validation_error'])
+    assert 'Validation error' in crossvalidation.get_report(result)
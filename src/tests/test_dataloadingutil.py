@@ -0,0 +1,83 @@
+"""Some tests for dataloadingutil."""
+
+import json
+import threading
+import numpy
+import dataloadingutil
+
+
+def test_load_train_data(tmp_path):
+    """Check loading of data with integer values and certain precision."""
+    path = tmp_path / 'data.json'
+    path.write_text(json.dumps({'Data': [[-1, 0.5], [0.25, 1]]}))
+    err, data = dataloadingutil.load_train_data(str(path))
+    assert err is None
+    assert data == [[-1.0, 0.5], [0.25, 1.0]]
+    err, data = dataloadingutil.load_train_data(str(path), 'float32')
+    assert err is None
+    assert data.dtype == numpy.float32
+    assert data.shape == (2, 2)
+
+
+def test_load_configuration(tmp_path):
+    """Check validation of precision and layers info."""
+    path = tmp_path / 'config.json'
+    config = {'NumberOfInputUnits': 1, 'Precision': 'float32',
+              'LayersInfo': [{'NumberOfUnits': 1,
+                              'ActivationFunction': 'linear'}]}
+    path.write_text(json.dumps({'Configuration': config}))
+    err, loaded = dataloadingutil.load_configuration(str(path))
+    assert err is None
+    assert loaded == config
+
+    config['Precision'] = 'float16'
+    path.write_text(json.dumps({'Configuration': config}))
+    err, _ = dataloadingutil.load_configuration(str(path))
+    assert err is not None
+
+    config['Precision'] = 'float64'
+    config['LayersInfo'][0]['NumberOfUnits'] = 0
+    path.write_text(json.dumps({'Configuration': config}))
+    err, _ = dataloadingutil.load_configuration(str(path))
+    assert err is not None
+
+
+def test_progress_and_cancel(tmp_path):
+    """Check progress reports and cancellation of loading."""
+    path = tmp_path / 'data.json'
+    path.write_text(json.dumps({'Data': [[0.1, 0.2]] * 100}))
+    reports = []
+    err, data = dataloadingutil.load_train_data(str(path),
+                                                progress=reports.append)
+    assert err is None
+    assert len(data) == 100
+    assert reports == sorted(reports)
+    assert reports[-1] == 1.0
+
+    cancel_event = threading.Event()
+    cancel_event.set()
+    err, data = dataloadingutil.load_train_data(str(path),
+                                                cancel_event=cancel_event)
+    assert err == dataloadingutil.CANCELLED_ERROR
+    assert data == []
+
+
+def test_decoy_data_key(tmp_path, monkeypatch):
+    """Check that streaming finds only top-level key "Data"."""
+    path = tmp_path / 'data.json'
+    data = [[0.1, 0.2], [0.3, 0.4], [0.5, 0.6]]
+    path.write_text(json.dumps({
+        'Description': 'list "Data": [[0.9, 0.9]] is below, \\"Data":[',
+        'Other': {'Data': [[0.7, 0.7]]}, 'Data': data}))
+    err, estimate = dataloadingutil.estimate_train_data(str(path))
+    assert err is None and estimate['samples_num'] == 3
+    for chunk_size in (dataloadingutil.CHUNK_SIZE, 5):
+        monkeypatch.setattr(dataloadingutil, 'CHUNK_SIZE', chunk_size)
+        err, loaded = dataloadingutil.load_train_data(str(path),
+                                                      memory_budget=1)
+        assert err is None
+        assert loaded.tolist() == data
+
+    path.write_text(json.dumps({'Description': '"Data": [[0.1, 0.2]]'}))
+    err, _ = dataloadingutil.load_train_data(str(path), memory_budget=1)
+    assert err == 'The file has no "Data"'
@@ -0,0 +1,71 @@
+"""Some tests for datapipeline."""
+
+import numpy
+import pytest
+from network.datapipeline import BatchPipeline
+
+
+def __get_data(n):
+    X = numpy.arange(n, dtype=float).reshape(-1, 1)
+    return X, X * 2.0
+
+
+def test_epoch_coverage():
+    """Check that each sample is used once per epoch."""
+    X, T = __get_data(23)
+    pipeline = BatchPipeline(X, T, batch_size=5, epochs=3, seed=1)
+    assert pipeline.get_batches_per_epoch() == 5
+    seen = {0: [], 1: [], 2: []}
+    for epoch, X_batch, T_batch in pipeline:
+        assert X_batch.flags['C_CONTIGUOUS']
+        assert len(X_batch) <= 5
+        assert numpy.array_equal(T_batch, X_batch * 2.0)
+        seen[epoch] += X_batch[:, 0].tolist()
+    for samples in seen.values():
+        assert sorted(samples) == X[:, 0].tolist()
+    # orders of epochs are different:
+    assert seen[0] != seen[1]
+
+
+def test_indices():
+    """Check that only samples with given indices are visited."""
+    X, T = __get_data(23)
+    indices = numpy.array([0, 1, 2, 10, 11, 20, 22])
+    pipeline = BatchPipeline(X, T, batch_size=3, epochs=2, seed=1,
+                             indices=indices)
+    assert pipeline.get_batches_per_epoch() == 3
+    seen = {0: [], 1: []}
+    for epoch, X_batch, _ in pipeline:
+        seen[epoch] += X_batch[:, 0].tolist()
+    for samples in seen.values():
+        assert sorted(samples) == indices.tolist()
+
+
+def test_infinite_and_memmap(tmp_path):
+    """Check endless pipeline over memory-mapped file and its closing."""
+    X, T = __get_data(10)
+    path = tmp_path / 'data.npy'
+    numpy.save(path, X)
+    X_map = numpy.load(path, mmap_mode='r')
+    with BatchPipeline(X_map, T, batch_size=4, epochs=None,
+                       prefetch=1) as pipeline:
+        epochs = [epoch for _, [epoch, _, _] in zip(range(30), pipeline)]
+    assert epochs[-1] == 9
+
+
+def test_error_propagation():
+    """Check that error of background thread is raised to consumer."""
+    class BrokenSource():
+        def __len__(self):
+            return 10
+
+        def __array__(self, dtype=None, copy=None):
+            raise OSError('read error')
+
+    X, _ = __get_data(10)
+    pipeline = BatchPipeline(X, BrokenSource(), batch_size=4)
+    with pytest.raises(OSError):
+        next(pipeline)
+    with pytest.raises(StopIteration):
+        next(pipeline)
+    pipeline.close()
@@ -0,0 +1,60 @@
+"""Some tests for ensemble."""
+
+import numpy
+from network import layermath as lm
+from network.ensemble import Ensemble
+
+
+def __get_config():
+    config = {}
+    config['NumberOfInputUnits'] = 2
+    config['LayersInfo'] = [
+        {"NumberOfUnits": 5, "ActivationFunction": "tanh",
+         "Initializer": "xavier_uniform"},
+        {"NumberOfUnits": 3, "ActivationFunction": "sigmoid",
+         "Initializer": "xavier_uniform"},
+        {"NumberOfUnits": 2, "ActivationFunction": "linear",
+         "Initializer": "xavier_uniform"}]
+    return config
+
+
+def __get_data(n=64):
+    X = numpy.random.default_rng(0).uniform(-1.0, 1.0, (n, 2))
+    T = numpy.stack([X[:, 0] * X[:, 1], 0.5 * X[:, 0]], axis=1)
+    return numpy.concatenate([X, T], axis=1)
+
+
+def test_inference():
+    """Check that stacked inference agrees with separate members."""
+    ensemble = Ensemble(__get_config(), 4, seed=1)
+    X = __get_data()[:, :2]
+    outputs = [ensemble.get_member(k).process_batch(X) for k in range(4)]
+    mean, spread = ensemble.predict_with_spread(X)
+    assert numpy.allclose(mean, numpy.mean(outputs, axis=0))
+    assert numpy.allclose(spread, numpy.std(outputs, axis=0))
+    assert spread.min() > 0.0  # members are different
+    assert numpy.allclose(ensemble.process(X[0].tolist()), mean[0])
+
+    copy = Ensemble.from_networks(
+        [ensemble.get_member(k) for k in range(4)])
+    assert numpy.array_equal(copy.process_batch(X), mean)
+
+
+def test_training():
+    """Check that one ensemble step equals steps of separate members."""
+    data = __get_data()
+    ensemble = Ensemble(__get_config(), 3, seed=2)
+    members = [ensemble.get_member(k) for k in range(3)]
+    ensemble.train(data, epochs=1, batch_size=len(data), step=0.1)
+    X, T = data[:, :2], data[:, 2:]
+    names = lm.get_afunc_names(__get_config())
+    for k, net in enumerate(members):
+        matrices = net.get_weights().get_layer_matrices()
+        grads = lm.backward(matrices, names, lm.forward(matrices, names, X), T)
+        for M, G, M_ens in zip(matrices[1:], grads[1:],
+                               ensemble.get_layer_tensors()[1:]):
+            assert numpy.allclose(M - G * 0.1 / len(data), M_ens[k])
+
+    errors_before = ensemble.get_errors(data)
+    ensemble.train(data, epochs=50, batch_size=8, seed=0)
+    assert (ensemble.get_errors(data) < errors_before).all()
@@ -0,0 +1,77 @@
+"""Some tests for export."""
+
+import importlib.util
+import subprocess
+import sys
+import numpy
+import pytest
+from network import export
+from network.neuralnetwork import NeuralNetwork
+
+
+def __get_config():
+    config = {}
+    config['NumberOfInputUnits'] = 2
+    config['LayersInfo'] = [
+        {"NumberOfUnits": 5, "ActivationFunction": "tanh"},
+        {"NumberOfUnits": 3, "ActivationFunction": "sigmoid"},
+        {"NumberOfUnits": 2, "ActivationFunction": "linear"}]
+    return config
+
+
+def __import(module_path):
+    spec = importlib.util.spec_from_file_location(module_path.stem,
+                                                  module_path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def test_predict(tmp_path):
+    """Check that exported modules give the same outputs as network."""
+    net = NeuralNetwork(__get_config())
+    X = numpy.random.default_rng(0).uniform(-1.0, 1.0, (20, 2))
+    Y = net.process_batch(X)
+    for backend in export.BACKENDS:
+        module_path, weights_path = export.export(
+            net, tmp_path / backend, 'scorer', backend)
+        assert weights_path.stat().st_size == 8 * 41
+        scorer = __import(module_path)
+        assert numpy.allclose(scorer.predict(X.tolist()), Y, atol=1e-12)
+        assert len(scorer.predict([])) == 0
+        with pytest.raises(ValueError):
+            scorer.predict([[0.1, 0.2, 0.3]])
+
+
+def test_float32(tmp_path):
+    """Check export of network with single precision."""
+    config = __get_config()
+    config['Precision'] = 'float32'
+    net = NeuralNetwork(config)
+    module_path, weights_path = export.export(net, tmp_path)
+    assert weights_path.stat().st_size == 4 * 41
+    scorer = __import(module_path)
+    X = [[0.5, -0.5], [0.1, 0.9]]
+    Y = scorer.predict(X)
+    assert Y.dtype == numpy.float32
+    assert numpy.allclose(Y, net.process_batch(X), atol=1e-6)
+
+
+def test_standalone(tmp_path):
+    """Check that stdlib module is imported without numpy and project."""
+    net = NeuralNetwork(__get_config())
+    module_path, weights_path = export.export(net, tmp_path, 'scorer',
+                                              'stdlib')
+    code = ('import sys, scorer; y = scorer.predict([[0.1, 0.2]]); '
+            'assert "numpy" not in sys.modules; print(y[0][0])')
+    result = subprocess.run([sys.executable, '-c', code], cwd=tmp_path,
+                            capture_output=True, text=True, check=True)
+    y = net.process_batch([[0.1, 0.2]])[0][0]
+    assert abs(float(result.stdout) - y) < 1e-12
+
+    # weights of other network don't match module:
+    other = NeuralNetwork(__get_config())
+    weights_path.write_bytes(other.get_weights().get_values().tobytes())
+    scorer = __import(module_path)
+    with pytest.raises(ValueError):
+        scorer.predict([[0.1, 0.2]])
@@ -0,0 +1,34 @@
+"""Some tests for graphwindow."""
+
+import math
+import graphwindow
+
+
+def test_density_grid():
+    """Check density grid of small set of points."""
+    points = [[-0.5, 0.5], [0.5, 0.5], [0.5, 0.7], [0.5, -0.5]]
+    grid = graphwindow._get_density_grid(points, 2)
+    # row 0 is top of screen, counts are [[1, 2], [0, 1]]:
+    expected = [[math.log(2) / math.log(3), 1.0],
+                [0.0, math.log(2) / math.log(3)]]
+    assert grid.shape == (2, 2)
+    for row, expected_row in zip(grid.tolist(), expected):
+        for value, expected_value in zip(row, expected_row):
+            assert abs(value - expected_value) < 1e-12
+
+
+def test_density_ppm():
+    """Check pixels of image stretched from density grid."""
+    density = graphwindow._get_density_grid(
+        [[-0.5, 0.5], [0.5, 0.5], [0.5, 0.7], [0.5, -0.5]], 2)
+    ppm = graphwindow._get_density_ppm(density, 4, 2)
+    header = b'P6 4 2 255\n'
+    assert ppm.startswith(header)
+    pixels = list(ppm[len(header):])
+    assert len(pixels) == 4 * 2 * 3
+    # 0.5 + 0.5 * log(2) / log(3) of green, the densest cell is green:
+    light = [47, 151, 47]
+    green = [0, 128, 0]
+    white = [255, 255, 255]
+    assert pixels == (light + light + green + green +
+                      white + white + light + light)
@@ -0,0 +1,143 @@
+"""Some tests for inferenceserver."""
+
+import asyncio
+import json
+import numpy
+import inferenceserver
+from network.neuralnetwork import NeuralNetwork
+
+
+def __get_config():
+    config = {}
+    config['NumberOfInputUnits'] = 2
+    config['LayersInfo'] = [
+        {"NumberOfUnits": 4, "ActivationFunction": "tanh"},
+        {"NumberOfUnits": 1, "ActivationFunction": "linear"}]
+    return config
+
+
+async def __request(port, method, path, obj=None):
+    reader, writer = await asyncio.open_connection('127.0.0.1', port)
+    body = b'' if obj is None else json.dumps(obj).encode('utf-8')
+    writer.write('{} {} HTTP/1.1\r\nContent-Length: {}\r\n'
+                 'Connection: close\r\n\r\n'.format(
+                     method, path, len(body)).encode('latin-1') + body)
+    await writer.drain()
+    response = await reader.read()
+    writer.close()
+    head, _, body = response.partition(b'\r\n\r\n')
+    return int(head.split()[1]), json.loads(body)
+
+
+def test_micro_batching():
+    """Check outputs of concurrent requests and their coalescing."""
+    net = NeuralNetwork(__get_config())
+    X = numpy.random.uniform(-1.0, 1.0, (50, 2)).tolist()
+    expected = [net.process(x) for x in X]
+
+    async def run():
+        server = inferenceserver.InferenceServer(
+            {'net': net}, max_batch_size=16, max_latency_ms=50.0)
+        _, port = await server.start()
+        try:
+            responses = await asyncio.gather(
+                *[__request(port, 'POST', '/predict/net', {'x': x})
+                  for x in X])
+            bad = await asyncio.gather(
+                __request(port, 'POST', '/predict/other', {'x': X[0]}),
+                __request(port, 'POST', '/predict/net', {'x': [1.0]}),
+                __request(port, 'GET', '/models'))
+            stats = await __request(port, 'GET', '/stats')
+        finally:
+            await server.stop()
+        return responses, bad, stats
+
+    responses, bad, stats = asyncio.run(run())
+    for [status, obj], y in zip(responses, expected):
+        assert status == 200
+        assert numpy.allclose(obj['y'], y)
+    assert [status for status, _ in bad] == [404, 400, 200]
+    assert bad[2][1] == ['net']
+    status, obj = stats
+    assert obj['requests'] == len(X)
+    assert obj['batches'] < len(X)
+    assert 'p99' in obj['latency_ms']
+
+
+def test_save_load_models(tmp_path):
+    """Check that saved network is loaded with the same outputs."""
+    net = NeuralNetwork(__get_config())
+    path = tmp_path / 'model.json'
+    net.save(path)
+    error, models = inferenceserver.load_models([str(path)])
+    assert error is None
+    assert list(models) == ['model']
+    x = [0.3, -0.7]
+    assert numpy.allclose(models['model'].process(x), net.process(x))
+
+    path.write_text('{"NumberOfInputUnits": 2}')
+    error, models = inferenceserver.load_models([str(path)])
+    assert error is not None
+
+
+def test_wrong_body_size():
+    """Check responses for wrong and too large Content-Length."""
+    net = NeuralNetwork(__get_config())
+
+    async def send(port, content_length):
+        reader, writer = await asyncio.open_connection('127.0.0.1', port)
+        writer.write('POST /predict/net HTTP/1.1\r\nContent-Length: {}\r\n'
+                     '\r\n'.format(content_length).encode('latin-1'))
+        await writer.drain()
+        response = await reader.read()  # connection is closed by server
+        writer.close()
+        return int(response.split()[1])
+
+    async def run():
+        server = inferenceserver.InferenceServer({'net': net},
+                                                 max_body_size=100)
+        _, port = await server.start()
+        try:
+            statuses = [await send(port, length)
+                        for length in ('abc', '-1', '101')]
+            status, obj = await __request(port, 'POST', '/predict/net',
+                                          {'x': [0.1, 0.2]})
+            await __request(port, 'POST', '/predict/net', {'x': [0.1]})
+        finally:
+            await server.stop()
+        return statuses, status, server
+
+    statuses, status, server = asyncio.run(run())
+    assert statuses == [400, 400, 413]
+    assert status == 200
+    # latency of rejected requests isn't counted:
+    assert len(server._InferenceServer__latencies) == 1
+
+
+def test_long_lines():
+    """Check responses for too long request line and header."""
+    net = NeuralNetwork(__get_config())
+    long_text = 'a' * 100000
+
+    async def send(port, request):
+        reader, writer = await asyncio.open_connection('127.0.0.1', port)
+        writer.write(request.encode('latin-1'))
+        await writer.drain()
+        response = await reader.read()
+        writer.close()
+        return int(response.split()[1])
+
+    async def run():
+        server = inferenceserver.InferenceServer({'net': net})
+        _, port = await server.start()
+        try:
+            statuses = [
+                await send(port, 'GET /{} HTTP/1.1\r\n\r\n'.format(
+                    long_text)),
+                await send(port, 'GET /models HTTP/1.1\r\nX: {}\r\n'
+                           '\r\n'.format(long_text))]
+        finally:
+            await server.stop()
+        return statuses
+
+    assert asyncio.run(run()) == [400, 431]
@@ -0,0 +1,53 @@
+"""Some tests for initializers."""
+
+import numpy
+from network import initializers
+from network.neuralnetwork import NeuralNetwork
+from network.weightstructure import WeightStructure
+
+
+def __get_config(initializer):
+    config = {}
+    config['NumberOfInputUnits'] = 100
+    config['LayersInfo'] = [
+        {"NumberOfUnits": 300, "ActivationFunction": "tanh",
+         "Initializer": initializer, "ZeroBiases": True},
+        {"NumberOfUnits": 1, "ActivationFunction": "linear"}]
+    return config
+
+
+def test_seeded_initialization():
+    """Check that seed makes initialization reproducible."""
+    config = __get_config('xavier_uniform')
+    config['Seed'] = 42
+    w1 = NeuralNetwork(config).get_weights().get_values()
+    w2 = NeuralNetwork(config).get_weights().get_values()
+    assert numpy.array_equal(w1, w2)
+    config['Seed'] = 43
+    w3 = NeuralNetwork(config).get_weights().get_values()
+    assert not numpy.array_equal(w1, w3)
+
+
+def test_scales():
+    """Check variance of weights and zero biases."""
+    expected_std = {'xavier_uniform': (2.0 / 400)**0.5,
+                    'xavier_normal': (2.0 / 400)**0.5,
+                    'he_uniform': (2.0 / 100)**0.5,
+                    'he_normal': (2.0 / 100)**0.5,
+                    'normal': 1.0}
+    for name, std in expected_std.items():
+        config = __get_config(name)
+        w = WeightStructure(config)
+        initializers.initialize(w, config, seed=1)
+        M = w.get_layer_matrix(1)
+        assert numpy.all(M[:, 0] == 0.0)
+        assert abs(M[:, 1:].std() / std - 1.0) < 0.05
+
+
+def test_legacy():
+    """Check that legacy initialization is uniform in [0; 1)."""
+    config = __get_config('legacy')
+    w = WeightStructure(config)
+    initializers.initialize(w, config, seed=1)
+    values = w.get_layer_matrix(2)
+    assert values.min() >= 0.0 and values.max() < 1.0
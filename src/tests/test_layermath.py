@@ -0,0 +1,57 @@
+"""Some tests for layermath."""
+
+import numpy
+from network import layermath as lm
+from network.neuralnetwork import NeuralNetwork
+
+
+def __get_config():
+    config = {}
+    config['NumberOfInputUnits'] = 1
+    config['LayersInfo'] = [
+        {"NumberOfUnits": 2, "ActivationFunction": "tanh"},
+        {"NumberOfUnits": 2, "ActivationFunction": "sigmoid"},
+        {"NumberOfUnits": 1, "ActivationFunction": "linear"}]
+    return config
+
+
+def test_forward():
+    """Check that vectorized forward propagation is the same as usual."""
+    config = __get_config()
+    net = NeuralNetwork(config)
+    matrices = net.get_weights().get_layer_matrices()
+    X = numpy.array([[-0.5], [0.1], [0.7]])
+    Y = lm.predict(matrices, lm.get_afunc_names(config), X)
+    for x, y in zip(X, Y):
+        assert abs(net.process(list(x))[0] - y[0]) < 1e-12
+
+
+def test_backward():
+    """Check vectorized backpropagation on batch of samples."""
+    config = __get_config()
+    net = NeuralNetwork(config)
+    matrices = net.get_weights().get_layer_matrices()
+    names = lm.get_afunc_names(config)
+    X = numpy.array([[-0.5], [0.7]])
+    T = numpy.array([[0.2], [-0.3]])
+    grads = lm.backward(matrices, names, lm.forward(matrices, names, X), T)
+    D1 = net._calculate_gradient_by_backpropagation([[-0.5], [0.2]])
+    D2 = net._calculate_gradient_by_backpropagation([[0.7], [-0.3]])
+    for i in range(1, len(matrices)):
+        expected = D1.get_layer_matrix(i) + D2.get_layer_matrix(i)
+        assert numpy.allclose(grads[i], expected)
+
+
+def test_jacobian():
+    """Check that Jacobian gives gradient of error function."""
+    config = __get_config()
+    net = NeuralNetwork(config)
+    matrices = net.get_weights().get_layer_matrices()
+    names = lm.get_afunc_names(config)
+    X = numpy.array([[-0.5], [0.1], [0.7]])
+    T = numpy.array([[0.2], [0.0], [-0.3]])
+    Y, J = lm.jacobian(matrices, names, X)
+    assert J.shape == (3, 1, len(net.get_weights()))
+    grads = lm.backward(matrices, names, lm.forward(matrices, names, X), T)
+    expected = numpy.concatenate([G.ravel() for G in grads[1:]])
+    assert numpy.allclose(numpy.einsum('nkp,nk->p', J, Y - T), expected)
@@ -0,0 +1,52 @@
+"""Some tests for lookuptable."""
+
+import numpy
+import pytest
+import cli
+from network import lookuptable
+from network.neuralnetwork import NeuralNetwork
+
+
+def __get_config():
+    config = {}
+    config['NumberOfInputUnits'] = 1
+    config['LayersInfo'] = [
+        {"NumberOfUnits": 3, "ActivationFunction": "tanh"},
+        {"NumberOfUnits": 2, "ActivationFunction": "linear"}]
+    return config
+
+
+def test_approximation():
+    """Check that table approximates network within reported error."""
+    net = NeuralNetwork(__get_config())
+    table = lookuptable.tabulate(net, points_num=513)
+    assert 0.0 < table.get_max_error() < 1e-4
+    X = numpy.random.uniform(-1.0, 1.0, (1000, 1))
+    error = numpy.abs(table.predict(X) - net.process_batch(X)).max()
+    assert error <= table.get_max_error() * 1.01 + 1e-12
+    assert numpy.allclose(table.process([1.0]), net.process([1.0]))
+    # inputs outside of domain are clipped:
+    assert numpy.allclose(table.process([5.0]), net.process([1.0]))
+
+
+def test_save_load(tmp_path):
+    """Check saving and loading of table."""
+    net = NeuralNetwork(__get_config())
+    table = lookuptable.tabulate(net, points_num=65)
+    path = tmp_path / 'table.npz'
+    table.save(path)
+    loaded = lookuptable.load_lookup_table(path)
+    X = numpy.linspace(-1.0, 1.0, 101)
+    assert numpy.array_equal(loaded.predict(X), table.predict(X))
+    assert loaded.get_max_error() == table.get_max_error()
+
+
+def test_wrong_points_num():
+    """Check that table with less than 2 points is rejected."""
+    net = NeuralNetwork(__get_config())
+    for points_num in (0, 1):
+        with pytest.raises(ValueError):
+            lookuptable.tabulate(net, points_num)
+        with pytest.raises(SystemExit):
+            cli.main(['train', '--lut', 'table.npz',
+                      '--lut-points', str(points_num)])
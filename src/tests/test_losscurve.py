@@ -0,0 +1,28 @@
+"""Some tests for losscurve."""
+
+import random
+from losscurve import DecimatedSeries
+
+
+def test_decimation():
+    """Check bounded number of buckets and kept extremes."""
+    series = DecimatedSeries(max_buckets=64)
+    values = [random.random() for _ in range(100000)]
+    values[54321] = 5.0  # spike must stay visible
+    for x, y in enumerate(values):
+        series.add(x, y)
+    buckets = series.get_buckets()
+    assert 32 <= len(buckets) <= 64
+    assert series.get_version() == len(values)
+    # buckets cover all points in order and keep min/max:
+    assert buckets[0][0] == 0 and buckets[-1][1] == len(values) - 1
+    for prev, bucket in zip(buckets, buckets[1:]):
+        assert bucket[0] == prev[1] + 1
+    for first_x, last_x, low, high in buckets:
+        assert low == min(values[first_x:last_x + 1])
+        assert high == max(values[first_x:last_x + 1])
+    sizes = [last_x - first_x + 1 for first_x, last_x, _, _ in buckets]
+    assert len(set(sizes[:-1])) == 1 and sizes[-1] <= sizes[0]
+
+    series.clear()
+    assert series.get_buckets() == []
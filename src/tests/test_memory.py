@@ -0,0 +1,139 @@
+"""Some tests for memory."""
+
+import json
+import numpy
+import dataloadingutil
+from network import layermath as lm
+from network import memory
+from network.neuralnetwork import NeuralNetwork
+
+
+def __get_config():
+    config = {}
+    config['NumberOfInputUnits'] = 1
+    config['LayersInfo'] = [
+        {"NumberOfUnits": 8, "ActivationFunction": "tanh"},
+        {"NumberOfUnits": 1, "ActivationFunction": "linear"}]
+    return config
+
+
+def __get_data(samples_num):
+    xs = numpy.linspace(-1.0, 1.0, samples_num)
+    return [[float(x), float(0.5 * x)] for x in xs]
+
+
+def test_estimate_training():
+    """Check that estimate grows with size and report is the largest."""
+    config = __get_config()
+    small = memory.estimate_training(config, 100)
+    large = memory.estimate_training(config, 10000)
+    assert large['total'] > small['total']
+    assert small['total'] == sum(v for k, v in small.items()
+                                 if k != 'total')
+    assert small['report'] > small['error']
+    short = memory.estimate_training(config, 100, full_report=False)
+    assert short['report'] < small['report']
+    assert memory.get_error_chunk_size(config, 100, 10**12) is None
+    chunk = memory.get_error_chunk_size(config, 10**6, 10**6,
+                                        full_report=False)
+    assert chunk == memory.MIN_ERROR_CHUNK
+    assert memory.format_bytes(3 * memory.MB) == '3.0 MB'
+    loaded = memory.estimate_training(config, 100, copy_data=False)
+    assert loaded['data'] == 0
+    assert loaded['total'] == small['total'] - small['data']
+
+
+def test_fit_training():
+    """Check fallbacks of training for different budgets."""
+    config = __get_config()
+    assert memory.fit_training(config, 1000, 10**12) == (True, None)
+    assert memory.fit_training(config, 10**6, 10**9) == (True, None)
+    full_report, chunk = memory.fit_training(config, 10**6, 10**8)
+    assert not full_report and memory.MIN_ERROR_CHUNK < chunk < 10**6
+    assert memory.estimate_training(config, 10**6, error_chunk=chunk,
+                                    full_report=False)['total'] <= 10**8
+    # budget can't be reached, but all fallbacks are used:
+    assert memory.fit_training(config, 10**6, 10**7) == (
+        False, memory.MIN_ERROR_CHUNK)
+
+
+def test_chunked_error():
+    """Check that error by chunks equals error of all samples."""
+    net = NeuralNetwork(__get_config())
+    data = __get_data(1000)
+    X, T = lm.split_samples(data, 1)
+    matrices = net.get_weights().get_layer_matrices()
+    names = lm.get_afunc_names(__get_config())
+    full = lm.error(matrices, names, X, T)
+    for chunk in (1, 7, 256, 5000):
+        assert abs(lm.error(matrices, names, X, T, chunk) - full) < 1e-9
+    assert abs(full - net.general_error_function(data)) < 1e-9
+
+
+def test_shortened_report():
+    """Check that report is shortened if it doesn't fit budget."""
+    data = __get_data(50)
+    net = NeuralNetwork(__get_config())
+    full = net.train(data, max_iter_num=100, seed=1)
+    net = NeuralNetwork(__get_config())
+    short = net.train(data, max_iter_num=100, seed=1, memory_budget=10**5)
+    assert short.startswith('Network training by SGD:\n'
+                            'Report is shortened to fit memory budget.')
+    assert 'Gradient:' in full and 'Gradient:' not in short
+    assert len(short) < len(full) / 5
+    net = NeuralNetwork(__get_config())
+    quiet = net.train(data, max_iter_num=100, seed=1, full_report=False)
+    assert 'Gradient:' not in quiet and 'memory budget' not in quiet
+    assert quiet.count('General error=') == short.count('General error=')
+
+
+def test_monitor():
+    """Check that monitor measures peak of allocation in phase."""
+    monitor = memory.MemoryMonitor()
+    try:
+        with monitor.phase('allocate', 8 * memory.MB):
+            array = numpy.ones(memory.MB)  # 8 MB
+            del array
+        with monitor.phase('nothing'):
+            pass
+    finally:
+        monitor.stop()
+    [name, estimate, peak], [_, _, small_peak] = monitor.get_phases()
+    assert name == 'allocate' and estimate == 8 * memory.MB
+    assert 8 * memory.MB <= peak < 9 * memory.MB
+    assert small_peak < memory.MB
+    assert 'allocate' in monitor.get_report()
+
+
+def test_streaming_loading(tmp_path):
+    """Check fallback of loading to array and memmap."""
+    data = __get_data(3000)
+    path = str(tmp_path / 'data.json')
+    with open(path, 'w') as f:
+        json.dump({'Data': data}, f, indent=1)
+
+    error, estimate = dataloadingutil.estimate_train_data(path)
+    assert error is None
+    assert abs(estimate['samples_num'] - 3000) < 30
+    assert estimate['memmap'] < estimate['array'] < estimate['list']
+    modes = {'list': 10**9, 'array': estimate['array'], 'memmap': 1}
+    for mode, budget in modes.items():
+        assert dataloadingutil.choose_loading_mode(estimate, budget) == mode
+        error, loaded = dataloadingutil.load_train_data(
+            path, memory_budget=budget)
+        assert error is None
+        assert numpy.array_equal(numpy.asarray(loaded), numpy.array(data))
+    assert type(loaded) is numpy.memmap
+
+    error, loaded = dataloadingutil.load_train_data(path, 'float32',
+                                                    memory_budget=1)
+    assert error is None and loaded.dtype == numpy.float32
+
+    with open(path, 'w') as f:
+        f.write('{"Data": [[0.1, 0.2], [0.3, 2.0]]}')
+    error, _ = dataloadingutil.load_train_data(path, memory_budget=1)
+    assert error == 'Wrong range of element in sample 1'
+    with open(path, 'w') as f:
+        f.write('{"Data": [[0.1, 0.2], [0.3, ')
+    error, _ = dataloadingutil.load_train_data(path, memory_budget=1)
+    assert error == 'The file is corrupted'
@@ -1,5 +1,7 @@
 """Some tests for neuralnetrowk."""
 
+import threading
+import numpy
 from network.neuralnetwork import NeuralNetwork
 
 
@@ -42,3 +44,162 @@ def test_backpropagation():
         deriv_2 = D2.get_elt(i, j, g)
         error = abs((deriv_2 - deriv_1) / deriv_2)
         assert error < 0.02
+
+
+def test_independent_networks():
+    """Check that networks with different configurations don't interfere."""
+    config = __get_config()
+    small_config = {'NumberOfInputUnits': 2,
+                    'LayersInfo': [{"NumberOfUnits": 3,
+                                    "ActivationFunction": "sigmoid"}]}
+    net = NeuralNetwork(config)
+    y = net.process([0.1])
+    small_net = NeuralNetwork(small_config)
+    assert len(small_net.process([0.1, 0.2])) == 3
+    assert net.process([0.1]) == y
+
+
+def test_concurrent_construction():
+    """Check creation of networks from several threads."""
+    config = __get_config()
+    nets = []
+
+    def create():
+        for _ in range(20):
+            nets.append(NeuralNetwork(config))
+
+    threads = [threading.Thread(target=create) for _ in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert len(nets) == 80
+    for net in nets:
+        assert len(net.process([0.3])) == 1
+
+
+def test_frozen_inference():
+    """Check that frozen network gives the same results from many threads."""
+    config = __get_config()
+    net = NeuralNetwork(config)
+    xs = [i / 50.0 - 1.0 for i in range(101)]
+    expected = [net.process([x])[0] for x in xs]
+    net.freeze()
+    assert net.is_frozen()
+    results = {}
+
+    def score(thread_idx):
+        results[thread_idx] = [net.process([x])[0] for x in xs]
+
+    threads = [threading.Thread(target=score, args=(n,)) for n in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    for ys in results.values():
+        for y, y_exp in zip(ys, expected):
+            assert abs(y - y_exp) < 1e-12
+    batch = net.process_batch([[x] for x in xs])
+    assert batch.shape == (101, 1)
+    assert abs(batch[:, 0] - expected).max() < 1e-12
+
+
+def test_float32_precision():
+    """Check that float32 network stays close to float64 one."""
+    config = __get_config()
+    net_64 = NeuralNetwork(config)
+    config['Precision'] = 'float32'
+    net_32 = NeuralNetwork(config)
+    net_32.get_weights().set_values(net_64.get_weights().get_values())
+    assert net_32.get_weights().get_dtype() == numpy.float32
+
+    X = numpy.linspace(-1.0, 1.0, 41).reshape(-1, 1)
+    Y_64 = net_64.process_batch(X)
+    Y_32 = net_32.process_batch(X)
+    assert Y_32.dtype == numpy.float32
+    assert numpy.allclose(Y_32, Y_64, rtol=1e-5, atol=1e-5)
+
+    sample = [[0.5], [0.3]]
+    D_64 = net_64._calculate_gradient_by_backpropagation(sample)
+    D_32 = net_32._calculate_gradient_by_backpropagation(sample)
+    D_num = net_32._calculate_gradient_numerically(sample)
+    for deriv_64, [i, j, g] in D_64:
+        assert abs(D_32.get_elt(i, j, g) - deriv_64) < 1e-5
+        assert abs(D_num.get_elt(i, j, g) - D_32.get_elt(i, j, g)) < 1e-4
+
+
+def test_minibatch_training():
+    """Check that SGD on mini-batches decreases error reproducibly."""
+    xs = numpy.linspace(-1.0, 1.0, 64)
+    data = [[x, 0.5 * x * x] for x in xs]
+    reports = []
+    errors = []
+    for _ in range(2):
+        config = __get_config()
+        config['Seed'] = 3
+        net = NeuralNetwork(config)
+        initial_error = net.general_error_function(data)
+        reports.append(net.train(data, batch_size=8, max_iter_num=400,
+                                 seed=5))
+        errors.append(net.general_error_function(data))
+    assert errors[0] < initial_error
+    assert errors[0] == errors[1]
+    assert 'Epoch #49' in reports[0]
+
+
+def test_compiled_training():
+    """Check that compiled network is trained the same way."""
+    xs = numpy.linspace(-1.0, 1.0, 30)
+    data = [[x, 0.5 * x * x] for x in xs]
+    values = []
+    for compiled in (False, True):
+        config = __get_config()
+        config['Seed'] = 3
+        net = NeuralNetwork(config)
+        if compiled:
+            net.compile()
+        net.train(data, batch_size=4, max_iter_num=50, seed=1)
+        values.append(net.get_weights().get_values())
+    assert numpy.allclose(values[0], values[1], rtol=1e-10, atol=1e-12)
+
+
+def test_training_on_indices():
+    """Check that training on indices equals training on copy of subset."""
+    xs = numpy.linspace(-1.0, 1.0, 40)
+    data = numpy.array([[x, 0.5 * x * x] for x in xs])
+    indices = numpy.arange(10, 40, 2)
+    reports = []
+    values = []
+    for subset, sample_indices in ((data[indices], None), (data, indices)):
+        config = __get_config()
+        config['Seed'] = 3
+        net = NeuralNetwork(config)
+        reports.append(net.train(subset, batch_size=4, max_iter_num=30,
+                                 seed=1, sample_indices=sample_indices))
+        values.append(net.get_weights().get_values())
+    assert numpy.array_equal(values[0], values[1])
+    assert reports[0] == reports[1]
+
+
+def test_training_progress():
+    """Check progress callback with validation loss and stopping."""
+    xs = numpy.linspace(-1.0, 1.0, 20)
+    data = [[x, 0.5 * x] for x in xs]
+    calls = []
+
+    def progress(iteration, train_loss, validation_loss):
+        calls.append([iteration, train_loss, validation_loss])
+        return iteration == 40
+
+    net = NeuralNetwork(__get_config())
+    report = net.train(data[::2], progress=progress,
+                       validation_data=data[1::2], validation_stride=12,
+                       loss_stride=5)
+    assert [call[0] for call in calls] == list(range(0, 41, 5))
+    assert report.endswith('Training was stopped.\n')
+    assert report.count('General error=') == 8
+    assert all(call[1] > 0.0 for call in calls)
+    # not more often than once per 12 iterations:
+    assert [call[0] for call in calls if call[2] is not None] == [0, 15, 30]
+    assert abs(calls[-1][1] -
+               net.general_error_function(data[::2]) / 10) < 1e-12
@@ -0,0 +1,56 @@
+"""Some tests for optimizers."""
+
+from network import optimizers
+from network.neuralnetwork import NeuralNetwork
+
+
+def __get_config():
+    config = {}
+    config['NumberOfInputUnits'] = 1
+    config['LayersInfo'] = [
+        {"NumberOfUnits": 4, "ActivationFunction": "tanh"},
+        {"NumberOfUnits": 1, "ActivationFunction": "linear"}]
+    config['Seed'] = 1
+    return config
+
+
+def __get_data():
+    return [[x / 20.0 - 1.0, 0.5 * (x / 20.0 - 1.0)**3] for x in range(41)]
+
+
+def test_levenberg_marquardt():
+    """Check that Levenberg-Marquardt method fits data in few iterations."""
+    net = NeuralNetwork(__get_config())
+    data = __get_data()
+    report = optimizers.train('lm', net.get_configure(), net.get_weights(),
+                              data, max_iter=50)
+    assert 'Iteration #' in report
+    assert net.general_error_function(data) < 1e-3
+
+
+def test_chunked_jacobian(monkeypatch):
+    """Check that chunks of Jacobian don't change result."""
+    errors = []
+    for chunk_size in (10**9, 4 * 13 * 8):  # all samples, 4 samples
+        monkeypatch.setattr(optimizers, 'JACOBIAN_CHUNK_SIZE', chunk_size)
+        net = NeuralNetwork(__get_config())
+        report = optimizers.train('lm', net.get_configure(),
+                                  net.get_weights(), __get_data(), max_iter=5)
+        assert report.count('Iteration #') == 5
+        errors.append(net.general_error_function(__get_data()))
+    assert abs(errors[0] - errors[1]) < 1e-9 * errors[0]
+
+
+def test_lbfgs():
+    """Check that L-BFGS method fits data."""
+    net = NeuralNetwork(__get_config())
+    data = __get_data()
+    net.train(data, optimizer='lbfgs')
+    assert net.general_error_function(data) < 1e-3
+
+
+def test_applicability():
+    """Check threshold of number of weights."""
+    assert optimizers.is_applicable('lm', 13)
+    assert not optimizers.is_applicable('lm', 10**6)
+    assert optimizers.is_applicable('lbfgs', 10**4)
@@ -0,0 +1,68 @@
+"""Some tests for paralleltraining."""
+
+import multiprocessing
+import pytest
+from network import layermath as lm
+from network.neuralnetwork import NeuralNetwork
+
+
+def __get_config():
+    config = {}
+    config['NumberOfInputUnits'] = 1
+    config['LayersInfo'] = [
+        {"NumberOfUnits": 4, "ActivationFunction": "tanh"},
+        {"NumberOfUnits": 1, "ActivationFunction": "linear"}]
+    return config
+
+
+def __get_data():
+    return [[x / 50.0 - 1.0, 0.5 * (x / 50.0 - 1.0)**3] for x in range(101)]
+
+
+def test_sync_training():
+    """Check that synchronous data-parallel training decreases error."""
+    net = NeuralNetwork(__get_config())
+    data = __get_data()
+    err_before = net.general_error_function(data)
+    net.train_parallel(data, workers=2, epochs=30, batch_size=8, seed=1)
+    assert net.general_error_function(data) < err_before
+
+
+def test_async_training():
+    """Check that asynchronous (Hogwild) training decreases error."""
+    net = NeuralNetwork(__get_config())
+    data = __get_data()
+    err_before = net.general_error_function(data)
+    net.train_parallel(data, workers=2, asynchronous=True, epochs=30,
+                       batch_size=8, seed=1)
+    assert net.general_error_function(data) < err_before
+
+
+def test_sync_reproducibility():
+    """Check that synchronous training with seed gives the same weights."""
+    data = __get_data()
+    values = []
+    for _ in range(2):
+        config = __get_config()
+        config['Seed'] = 3
+        net = NeuralNetwork(config)
+        net.train_parallel(data, workers=2, epochs=3, batch_size=8, seed=5)
+        values.append(net.get_weights().get_values().tolist())
+    assert values[0] == values[1]
+
+
+@pytest.mark.skipif(multiprocessing.get_start_method() != 'fork',
+                    reason='patch of workers requires fork')
+def test_worker_error(monkeypatch):
+    """Check that error of one worker is raised and others don't hang."""
+    forward = lm.forward
+
+    def broken_forward(matrices, afunc_names, X):
+        if X.min() > 0.0:  # only shard of the second worker
+            raise ValueError('broken worker')
+        return forward(matrices, afunc_names, X)
+
+    monkeypatch.setattr(lm, 'forward', broken_forward)
+    net = NeuralNetwork(__get_config())
+    with pytest.raises(ValueError, match='broken worker'):
+        net.train_parallel(__get_data(), workers=2, epochs=3, batch_size=8)
@@ -0,0 +1,54 @@
+"""Some tests for predictioncache."""
+
+from network.neuralnetwork import NeuralNetwork
+from network.predictioncache import PredictionCache
+
+
+def __get_config():
+    config = {}
+    config['NumberOfInputUnits'] = 1
+    config['LayersInfo'] = [
+        {"NumberOfUnits": 2, "ActivationFunction": "tanh"},
+        {"NumberOfUnits": 1, "ActivationFunction": "linear"}]
+    return config
+
+
+def test_hits_and_invalidation():
+    """Check that repeated inputs are taken from cache until weights change."""
+    net = NeuralNetwork(__get_config())
+    net.enable_prediction_cache()
+    cache = net.get_prediction_cache()
+    y = net.process([0.25])
+    assert net.process([0.25]) == y
+    assert cache.get_stats()['hits'] == 1
+
+    weights = net.get_weights()
+    weights.set_elt(2, 1, 0, weights.get_elt(2, 1, 0) + 1.0)
+    y_new = net.process([0.25])
+    assert abs(y_new[0] - y[0] - 1.0) < 1e-12
+    assert cache.get_stats()['hits'] == 1
+    assert cache.get_stats()['entries'] == 1
+
+
+def test_lru_eviction():
+    """Check that the least recently used entries are evicted."""
+    cache = PredictionCache(max_entries=2)
+    keys = [cache.get_key([x]) for x in [0.1, 0.2, 0.3]]
+    cache.put(0, keys[0], [1.0])
+    cache.put(0, keys[1], [2.0])
+    assert cache.get(0, keys[0]) == [1.0]
+    cache.put(0, keys[2], [3.0])
+    assert cache.get(0, keys[1]) is None
+    assert cache.get(0, keys[0]) == [1.0]
+    assert cache.get(0, keys[2]) == [3.0]
+    assert cache.get(1, keys[2]) is None  # other version
+
+
+def test_memory_cap():
+    """Check that estimated memory doesn't exceed limit."""
+    cache = PredictionCache(max_bytes=2000)
+    for n in range(100):
+        cache.put(0, cache.get_key([n / 100.0]), [float(n)])
+    stats = cache.get_stats()
+    assert 0 < stats['entries'] < 100
+    assert stats['bytes'] <= 2000
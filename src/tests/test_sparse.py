@@ -0,0 +1,133 @@
+"""Some tests for sparse."""
+
+import json
+import numpy
+import dataloadingutil
+from network import compression
+from network import layermath as lm
+from network.neuralnetwork import NeuralNetwork
+from network.sparse import SparseNetwork
+
+
+def __get_config():
+    config = {}
+    config['NumberOfInputUnits'] = 6
+    config['LayersInfo'] = [
+        {"NumberOfUnits": 7, "ActivationFunction": "tanh",
+         "Connectivity": {"FanIn": 3}},
+        {"NumberOfUnits": 4, "ActivationFunction": "sigmoid",
+         "Connectivity": {"Connections": [[1, 2], [], [7], [1, 3, 5, 7]]}},
+        {"NumberOfUnits": 3, "ActivationFunction": "tanh",
+         "Connectivity": {"Connections": [[1, 2, 3, 4], [1], []]}},
+        {"NumberOfUnits": 2, "ActivationFunction": "linear"}]
+    config['Seed'] = 1
+    return config
+
+
+def __get_data(n=50):
+    rng = numpy.random.default_rng(0)
+    X = rng.uniform(-1.0, 1.0, (n, 6))
+    T = numpy.stack([X[:, 0] * X[:, 1], numpy.sin(X[:, 2])], axis=1)
+    return X, T
+
+
+def test_structure():
+    """Check that only real connections are stored."""
+    net = SparseNetwork(__get_config())
+    # biases of all units, connections of sparse layers and dense layer:
+    assert net.get_weights_num() == 16 + 7 * 3 + 7 + 5 + 2 * 3
+    indptr, indices = net.get_connections(1)
+    assert list(indptr) == [0, 3, 6, 9, 12, 15, 18, 21]
+    for j in range(7):
+        unit = indices[indptr[j]:indptr[j+1]]
+        assert len(set(unit)) == 3 and list(unit) == sorted(unit)
+    assert list(net.get_connections(2)[1]) == [0, 1, 6, 0, 2, 4, 6]
+    assert net.get_connections(4) is None
+    masks = net.get_masks()
+    assert masks[4] is None
+    assert masks[2].sum() == 4 + 7 and masks[2][:, 0].all()
+    assert SparseNetwork(__get_config()).get_values().tolist() == \
+        net.get_values().tolist()  # the same seed
+
+
+def test_forward_and_gradient():
+    """Check outputs and gradient against equivalent dense network."""
+    net = SparseNetwork(__get_config())
+    dense = net.to_network()
+    X, T = __get_data(5)
+    assert numpy.allclose(net.process_batch(X), dense.process_batch(X))
+    assert numpy.allclose(net.process(X[0].tolist()), dense.process(X[0]))
+
+    matrices = dense.get_weights().get_layer_matrices()
+    names = lm.get_afunc_names(dense.get_configure())
+    dense_grads = lm.backward(matrices, names,
+                              lm.forward(matrices, names, X), T)
+    grad_net = NeuralNetwork(dense.get_configure())
+    grad_net.get_weights().set_values(numpy.concatenate(
+        [G.reshape(-1) for G in dense_grads[1:]]))
+    # gradient of sparse network is gradient of dense one on connections:
+    expected = SparseNetwork.from_network(grad_net, net.get_masks())
+    assert numpy.allclose(net.calculate_gradient(X, T),
+                          expected.get_values())
+
+
+def test_pruned_network():
+    """Check conversion of pruned network and back."""
+    config = __get_config()
+    for info in config['LayersInfo']:
+        info.pop('Connectivity', None)
+    dense = NeuralNetwork(config)
+    masks = compression.prune(dense, 0.7)
+    net = SparseNetwork.from_network(dense, masks)
+    X, _ = __get_data(10)
+    assert numpy.allclose(net.process_batch(X), dense.process_batch(X))
+    weights_num = sum(mask[:, 1:].sum() + len(mask) for mask in masks[1:])
+    assert net.get_weights_num() == weights_num
+    restored = SparseNetwork.from_network(net.to_network())
+    assert numpy.array_equal(restored.get_values(), net.get_values())
+
+
+def test_training():
+    """Check that training decreases error."""
+    X, T = __get_data()
+    data = numpy.concatenate([X, T], axis=1)
+    net = SparseNetwork(__get_config())
+    error = net.general_error_function(data)
+    report = net.train(data, epochs=200, batch_size=5, step=0.1, seed=0)
+    assert report.startswith('Sparse network training by SGD')
+    assert net.general_error_function(data) < 0.5 * error
+
+
+def test_training_limits():
+    """Check limit of iterations and chunks of error for memory budget."""
+    X, T = __get_data(100)
+    data = numpy.concatenate([X, T], axis=1)
+    net = SparseNetwork(__get_config())
+    values = net.get_values().copy()
+    net.train(data, epochs=None, batch_size=10, max_iter_num=0)
+    assert numpy.array_equal(net.get_values(), values)
+    assert abs(net.general_error_function(data, 7) -
+               net.general_error_function(data)) < 1e-9
+    report = net.train(data, batch_size=10, max_iter_num=3,
+                       memory_budget=10**4)
+    assert not numpy.array_equal(net.get_values(), values)
+    assert report.count('error') == 2
+
+
+def test_configuration_check(tmp_path):
+    """Check validation of connectivity in configuration file."""
+    path = str(tmp_path / 'config.json')
+    config = __get_config()
+    with open(path, 'w') as f:
+        json.dump({'Configuration': config}, f)
+    error, loaded = dataloadingutil.load_configuration(path)
+    assert error is None and loaded == config
+
+    wrong = [{"FanIn": 0}, {"FanIn": 2, "Connections": []},
+             {"Connections": [[1]] * 6}, {"Connections": [[7]] * 7}]
+    for connectivity in wrong:
+        config['LayersInfo'][0]['Connectivity'] = connectivity
+        with open(path, 'w') as f:
+            json.dump({'Configuration': config}, f)
+        error, _ = dataloadingutil.load_configuration(path)
+        assert error == 'Layer info is not valid for layer with index 0'
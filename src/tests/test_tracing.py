@@ -0,0 +1,59 @@
+"""Some tests for tracing."""
+
+import json
+import threading
+from network import tracing
+from network.neuralnetwork import NeuralNetwork
+
+
+def __get_config():
+    config = {}
+    config['NumberOfInputUnits'] = 1
+    config['LayersInfo'] = [
+        {"NumberOfUnits": 2, "ActivationFunction": "tanh"},
+        {"NumberOfUnits": 1, "ActivationFunction": "linear"}]
+    return config
+
+
+def test_disabled():
+    """Check that nothing is recorded without tracer."""
+    assert tracing.get_tracer() is None
+    with tracing.span('phase'):
+        pass
+    assert tracing.sampled_span('step', 0) is tracing.span('other')
+
+
+def test_trace_file(tmp_path):
+    """Check nested spans, sampling, threads and written file."""
+    tracer = tracing.start(stride=10)
+    try:
+        with tracing.span('outer', 'test', size=3):
+            for iteration in range(25):
+                with tracing.sampled_span('inner', iteration, 'test'):
+                    pass
+
+        def work():
+            with tracing.span('work', 'test'):
+                pass
+        thread = threading.Thread(target=work)
+        thread.start()
+        thread.join()
+        net = NeuralNetwork(__get_config())
+        net.train([[0.5, 0.2], [-0.5, -0.2]], max_iter_num=30)
+    finally:
+        assert tracing.stop() is tracer
+    path = tmp_path / 'trace.json'
+    tracer.save(path)
+    events = json.loads(path.read_text())['traceEvents']
+    spans = [e for e in events if e['ph'] == 'X']
+    inner = [e for e in spans if e['name'] == 'inner']
+    assert [e['args']['iteration'] for e in inner] == [0, 10, 20]
+    outer = [e for e in spans if e['name'] == 'outer'][0]
+    assert outer['args'] == {'size': 3}
+    for e in inner:
+        assert outer['ts'] <= e['ts']
+        assert e['ts'] + e['dur'] <= outer['ts'] + outer['dur']
+    assert len({e['tid'] for e in spans}) == 2
+    names = {e['name'] for e in spans}
+    assert {'SGD', 'forward', 'backward', 'loss'} <= names
+    assert any(e['ph'] == 'C' for e in events)
@@ -74,3 +74,13 @@ def test_imagine_init():
             assert U.get_elt(i, 0) is None
         else:
             assert U.get_elt(i, 0) == 1
+
+
+def test_output_layer():
+    """Check that reading of output layer doesn't change structure."""
+    config = __get_config()
+    U = UnitStructure(config)
+    U.set_elt(3, 1, 42)
+    assert U.get_output_layer() == [42]
+    assert U.get_output_layer() == [42]
+    assert len(U) == 9
@@ -0,0 +1,68 @@
+"""Some tests for warmstart."""
+
+import copy
+import numpy
+from network import warmstart
+from network.neuralnetwork import NeuralNetwork
+
+
+def __get_config():
+    config = {}
+    config['NumberOfInputUnits'] = 2
+    config['LayersInfo'] = [
+        {"NumberOfUnits": 3, "ActivationFunction": "tanh"},
+        {"NumberOfUnits": 2, "ActivationFunction": "linear"}]
+    config['Seed'] = 4
+    return config
+
+
+def __get_inputs():
+    return numpy.random.default_rng(0).uniform(-1.0, 1.0, (50, 2))
+
+
+def test_same_topology():
+    """Check that weights are copied for the same topology."""
+    old = NeuralNetwork(__get_config())
+    config = __get_config()
+    config['Seed'] = 5
+    net = NeuralNetwork(config)
+    assert warmstart.warm_start(net, old.get_configure(),
+                                old.get_weights().get_values()) is None
+    assert numpy.array_equal(net.get_weights().get_values(),
+                             old.get_weights().get_values())
+
+
+def test_growth():
+    """Check that widened and deepened network keeps the function."""
+    old = NeuralNetwork(__get_config())
+    config = copy.deepcopy(__get_config())
+    config['LayersInfo'] = [
+        {"NumberOfUnits": 6, "ActivationFunction": "tanh"},
+        {"NumberOfUnits": 7, "ActivationFunction": "linear"},
+        {"NumberOfUnits": 8, "ActivationFunction": "tanh"},
+        {"NumberOfUnits": 2, "ActivationFunction": "linear"}]
+    net = NeuralNetwork(config)
+    error = warmstart.warm_start(net, old.get_configure(),
+                                 old.get_weights().get_values(), seed=1)
+    assert error is None
+    X = __get_inputs()
+    assert numpy.allclose(net.process_batch(X), old.process_batch(X),
+                          atol=1e-3)
+    # copies of units are not identical:
+    M = net.get_weights().get_layer_matrix(4)
+    assert numpy.unique(M[:, 1:].round(12), axis=1).shape[1] == 8
+
+
+def test_wrong_growth():
+    """Check errors for changes which can't be grown."""
+    old = NeuralNetwork(__get_config())
+    config = __get_config()
+    config['NumberOfInputUnits'] = 3
+    net = NeuralNetwork(config)
+    assert warmstart.warm_start(net, old.get_configure(),
+                                old.get_weights().get_values())
+    config = __get_config()
+    config['LayersInfo'][0]['ActivationFunction'] = 'sigmoid'
+    net = NeuralNetwork(config)
+    assert warmstart.warm_start(net, old.get_configure(),
+                                old.get_weights().get_values())
@@ -52,11 +52,25 @@ def test_iteration():
     assert reverse_counter == -1
 
 
-def test_random_init():
-    """Check that all values were assigned."""
+def test_wrong_index():
+    """Check that access by wrong index is detected."""
     config = __get_config()
     w = WeightStructure(config)
-    w.random_initialization()
-    assert len(w) == 13
-    for weight, _ in w:
-        assert type(weight) == float
+    for ijg in [[0, 1, 0], [1, 0, 0], [1, 3, 0], [2, 1, 3], [4, 1, 0]]:
+        try:
+            w.get_elt(*ijg)
+        except AssertionError:
+            continue
+        assert False
+
+
+def test_layer_matrix():
+    """Check that layer matrix is a view of structure."""
+    config = __get_config()
+    w = WeightStructure(config)
+    M = w.get_layer_matrix(2)
+    assert M.shape == (2, 3)
+    M[1, 2] = 42
+    assert w.get_elt(2, 2, 2) == 42
+    w.set_elt(3, 1, 0, 7)
+    assert w.get_layer_matrix(3)[0, 0] == 7